@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the .mat file loaders.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import os
+import shutil
+import tempfile
+
+# Custom libraries
+from sylseq_paper.file_utils import loadmat, loadmat_fast
+from synthetic import nested_mat
+
+
+class Loadmat:
+    params = [[256, 2048], [100, 1000]]
+    param_names = ['n_electrodes', 'n_iterations']
+
+    def setup(self, n_electrodes, n_iterations):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'gc_data.mat')
+        nested_mat(self.path, n_electrodes=n_electrodes,
+                   n_iterations=n_iterations)
+
+    def teardown(self, n_electrodes, n_iterations):
+        shutil.rmtree(self.tmp_dir)
+
+    def time_loadmat(self, n_electrodes, n_iterations):
+        loadmat(self.path)
+
+    def time_loadmat_fast(self, n_electrodes, n_iterations):
+        loadmat_fast(self.path)
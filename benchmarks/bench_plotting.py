@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the plotting computations.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Third party libraries
+import numpy as np
+
+# Custom libraries
+from sylseq_paper.plotting import (smoothed_weighted_histogram,
+                                   smoothed_weighted_histograms)
+from synthetic import electrode_table
+
+
+class SmoothedWeightedHistogram:
+    params = [[500, 5000], [50, 200]]
+    param_names = ['n_electrodes', 'bins']
+
+    def setup(self, n_electrodes, bins):
+        df = electrode_table(n_electrodes)
+        df = df.loc[df.alignment == 'speech']
+        self.x, self.y = df.x.values, df.y.values
+        self.weights = np.random.default_rng(0).random((20, df.shape[0]))
+        self.kwargs = dict(xlim=(0, 1000), ylim=(0, 800), bins=bins,
+                           smooth=10)
+
+    def time_smoothed_weighted_histogram(self, n_electrodes, bins):
+        smoothed_weighted_histogram(x=self.x, y=self.y,
+                                    weights=self.weights[0], **self.kwargs)
+
+    def time_smoothed_weighted_histogram_x20(self, n_electrodes, bins):
+        for weights in self.weights:
+            smoothed_weighted_histogram(x=self.x, y=self.y, weights=weights,
+                                        **self.kwargs)
+
+    def time_smoothed_weighted_histograms_x20(self, n_electrodes, bins):
+        smoothed_weighted_histograms(self.weights, x=self.x, y=self.y,
+                                     **self.kwargs)
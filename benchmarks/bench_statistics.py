@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the statistics functions.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Third party libraries
+import numpy as np
+
+# Custom libraries
+from sylseq_paper.statistics import (correlation_permutation,
+                                     correlation_permutation_matrix,
+                                     fdr_correction, fdr_grouped,
+                                     fdr_omitnans, p_value_calc)
+from synthetic import electrode_table
+
+
+class CorrelationPermutation:
+    params = [[10, 100, 1000], ['loop', 'batch']]
+    param_names = ['n_permute', 'engine']
+
+    def setup(self, n_permute, engine):
+        rng = np.random.default_rng(0)
+        self.group1 = rng.standard_normal(40)
+        self.group2 = self.group1 + rng.standard_normal(40)
+
+    def time_correlation_permutation(self, n_permute, engine):
+        correlation_permutation(self.group1, self.group2,
+                                n_permute=n_permute, random_seed=0,
+                                engine=engine)
+
+
+class CorrelationPermutationMatrix:
+    params = [[100, 1000], [1000]]
+    param_names = ['n_electrodes', 'n_permute']
+
+    def setup(self, n_electrodes, n_permute):
+        rng = np.random.default_rng(0)
+        self.groups = rng.standard_normal((n_electrodes, 40))
+        self.target = rng.standard_normal(40)
+
+    def time_correlation_permutation_matrix(self, n_electrodes, n_permute):
+        correlation_permutation_matrix(self.groups, self.target,
+                                       n_permute=n_permute, random_seed=0)
+
+
+class PValueCalc:
+    params = [[1000, 10000], [100, 10000]]
+    param_names = ['n_permute', 'n_tests']
+
+    def setup(self, n_permute, n_tests):
+        rng = np.random.default_rng(0)
+        self.dist = rng.standard_normal((n_permute, n_tests))
+        self.statistic = rng.standard_normal(n_tests)
+
+    def time_p_value_calc(self, n_permute, n_tests):
+        p_value_calc(self.dist, self.statistic, axis=0)
+
+
+class FDR:
+    params = [[1000, 10000, 100000]]
+    param_names = ['n_electrodes']
+
+    def setup(self, n_electrodes):
+        self.df = electrode_table(n_electrodes)
+        self.df.loc[self.df.index[::50], 'pval'] = np.nan
+        self.pvals = self.df.pval.values
+
+    def time_fdr_omitnans(self, n_electrodes):
+        fdr_omitnans(self.pvals)
+
+    def time_fdr_omitnans_per_group(self, n_electrodes):
+        for _, group in self.df.groupby(['alignment', 'fancy_location']):
+            fdr_omitnans(group.pval.values)
+
+    def time_fdr_correction(self, n_electrodes):
+        fdr_correction(self.pvals)
+
+    def time_fdr_grouped(self, n_electrodes):
+        fdr_grouped(self.df.pval, [self.df.alignment,
+                                   self.df.fancy_location])
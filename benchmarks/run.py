@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Run the benchmarks and save the timings as JSON.
+
+Benchmarks are classes in the bench_*.py modules of this directory, in the
+style of asv: the params and param_names attributes list the sizes to run,
+setup (and teardown) prepare the data for each combination of parameters,
+and every time_* method is timed. For example:
+
+    python benchmarks/run.py -o results.json
+    python benchmarks/run.py --bench FDR --compare results.json
+
+All the data is synthetic (see synthetic.py), so the benchmarks run
+offline. The sylseq_paper package of this checkout is benchmarked, so it
+does not need to be installed.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import argparse
+import datetime
+import glob
+import importlib.util
+import inspect
+import itertools
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import timeit
+
+# Third party libraries
+import numpy as np
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(bench_dir)
+
+
+def load_benchmarks(pattern=None):
+    """
+    Import the bench_*.py modules and collect their benchmark classes.
+
+    Parameters
+    ----------
+    pattern : str or None
+        A regular expression the benchmark names (module.Class.method) must
+        match.
+
+    Returns
+    -------
+    benchmarks : list of tuples
+        The name, class and method name of each benchmark.
+    """
+    # Benchmark the sylseq_paper of this checkout, whether or not it is
+    # installed.
+    for path in [repo_dir, bench_dir]:
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    benchmarks = []
+    for path in sorted(glob.glob(os.path.join(bench_dir, 'bench_*.py'))):
+        module_name = os.path.splitext(os.path.basename(path))[0]
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+        for class_name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module_name:
+                continue
+            for method in sorted(m for m in vars(cls)
+                                 if m.startswith('time_')):
+                name = f'{module_name}.{class_name}.{method}'
+                if pattern is None or re.search(pattern, name):
+                    benchmarks.append((name, cls, method))
+
+    return benchmarks
+
+
+def parameter_sets(cls, quick=False):
+    """
+    Get the combinations of parameters of a benchmark class, as
+    dictionaries. quick keeps only the first value of each numeric (size)
+    parameter.
+    """
+    params = getattr(cls, 'params', [])
+    names = getattr(cls, 'param_names', [])
+    if params and not isinstance(params[0], (list, tuple)):
+        params = [params]
+    if quick:
+        params = [values[:1] if all(isinstance(v, (int, float))
+                                    for v in values) else values
+                  for values in params]
+
+    return [dict(zip(names, values)) for values in itertools.product(*params)]
+
+
+def time_benchmark(cls, method, params, repeat=5, min_time=0.1):
+    """
+    Time a benchmark method for a set of parameters. The number of calls
+    per repeat is increased until a repeat takes at least min_time.
+
+    Returns
+    -------
+    result : dictionary
+        The number of calls per repeat and the minimum, median, mean and
+        standard deviation of the time per call, in seconds.
+    """
+    instance = cls()
+    args = list(params.values())
+    if hasattr(instance, 'setup'):
+        instance.setup(*args)
+
+    try:
+        timer = timeit.Timer(lambda: getattr(instance, method)(*args))
+        number = 1
+        while timer.timeit(number) < min_time:
+            number *= 2
+        times = [t / number for t in timer.repeat(repeat=repeat,
+                                                  number=number)]
+    finally:
+        if hasattr(instance, 'teardown'):
+            instance.teardown(*args)
+
+    return {
+        'number': number,
+        'min'   : min(times),
+        'median': statistics.median(times),
+        'mean'  : statistics.mean(times),
+        'std'   : statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+def _git_commit():
+    """
+    Get the current git commit of the repository, if available.
+    """
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=bench_dir,
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(pattern=None, repeat=5, min_time=0.1, quick=False, log=print):
+    """
+    Run the benchmarks.
+
+    Parameters
+    ----------
+    pattern : str or None
+        A regular expression selecting the benchmarks to run.
+    repeat : int
+        The number of timed repeats.
+    min_time : float
+        The minimum duration of a repeat, in seconds.
+    quick : bool, default False
+        Whether to run only the first (smallest) size of each benchmark.
+    log : function
+        Called with progress messages.
+
+    Returns
+    -------
+    results : dictionary
+        The machine and version information and the timings of each
+        benchmark and set of parameters.
+    """
+    results = {
+        'date'    : datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit'  : _git_commit(),
+        'machine' : platform.node(),
+        'platform': platform.platform(),
+        'python'  : platform.python_version(),
+        'numpy'   : np.__version__,
+        'cpus'    : os.cpu_count(),
+        'results' : [],
+    }
+
+    for name, cls, method in load_benchmarks(pattern):
+        for params in parameter_sets(cls, quick=quick):
+            timing = time_benchmark(cls, method, params, repeat=repeat,
+                                    min_time=min_time)
+            results['results'].append({'name': name, 'params': params,
+                                       **timing})
+            log(f'{name} {params}: {format_time(timing["median"])}')
+
+    return results
+
+
+def format_time(seconds):
+    """
+    Format a duration with a readable unit.
+    """
+    for unit, scale in [('s', 1), ('ms', 1e-3), ('us', 1e-6)]:
+        if seconds >= scale:
+            return f'{seconds / scale:0.3g} {unit}'
+    return f'{seconds / 1e-9:0.3g} ns'
+
+
+def compare(results, baseline, log=print):
+    """
+    Compare the median timings of two runs, logging the ratio of each
+    benchmark run in both (above 1 is slower than the baseline).
+
+    Returns
+    -------
+    ratios : dictionary
+        The ratio for each (name, parameters) key.
+    """
+    def _key(result):
+        return result['name'], json.dumps(result['params'], sort_keys=True)
+
+    baseline = {_key(r): r['median'] for r in baseline['results']}
+
+    ratios = {}
+    for result in results['results']:
+        key = _key(result)
+        if key in baseline:
+            ratios[key] = result['median'] / baseline[key]
+            log(f'{key[0]} {key[1]}: {format_time(baseline[key])} -> '
+                f'{format_time(result["median"])} ({ratios[key]:0.2f}x)')
+    return ratios
+
+
+def main(argv=None):
+    """
+    Command line entry point for run.
+    """
+    parser = argparse.ArgumentParser(
+        description='Run the sylseq_paper benchmarks.'
+    )
+    parser.add_argument('-o', '--output', default='benchmark_results.json',
+                        help='The JSON file to save the results to.')
+    parser.add_argument('-b', '--bench', default=None,
+                        help='A regular expression selecting the benchmarks '
+                             '(module.Class.method) to run.')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='The number of timed repeats.')
+    parser.add_argument('--min-time', type=float, default=0.1,
+                        help='The minimum duration of a repeat, in seconds.')
+    parser.add_argument('--quick', action='store_true',
+                        help='Run only the smallest size of each benchmark.')
+    parser.add_argument('--compare', default=None,
+                        help='A previous results file to compare against.')
+    args = parser.parse_args(argv)
+
+    results = run(pattern=args.bench, repeat=args.repeat,
+                  min_time=args.min_time, quick=args.quick)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic data shaped like the real inputs of the analyses, so that the
+benchmarks run offline without the Zenodo data.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Third party libraries
+import numpy as np
+import pandas as pd
+import scipy.io as spio
+
+subjects = ['EC217', 'EC219', 'EC221', 'EC222', 'EC235', 'EC237', 'EC239',
+            'EC240', 'EC242', 'EC282']
+alignments = ['target_presentation', 'go_cue', 'pre_exec', 'speech']
+locations = {
+    'precentral'        : 'mPrCG',
+    'caudalmiddlefrontal': 'cMFG',
+    'supramarginal'     : 'SMG',
+    'superiortemporal'  : 'STG',
+    'supplementarymotor': 'SMA',
+    'postcentral'       : 'PoCG',
+}
+
+
+def electrode_table(n_electrodes=2000, random_seed=0):
+    """
+    Generate an electrode table with the columns of the anatomical and
+    significance tables (subject, electrode, location, image coordinates,
+    p-values and correlations), one row per electrode and alignment.
+
+    Parameters
+    ----------
+    n_electrodes : int
+        The number of electrodes.
+    random_seed : int
+        Random seed.
+
+    Returns
+    -------
+    df : pd.DataFrame
+        The table, with n_electrodes x len(alignments) rows.
+    """
+    rng = np.random.default_rng(random_seed)
+
+    subject = rng.choice(subjects, size=n_electrodes)
+    electrode = rng.integers(0, 256, size=n_electrodes)
+    location = rng.choice(list(locations), size=n_electrodes)
+
+    df = pd.DataFrame({
+        'subject'          : subject,
+        'electrode'        : electrode,
+        'subject_electrode': [f'{s}_{e}' for s, e in zip(subject, electrode)],
+        'hemisphere'       : rng.choice(['lh', 'rh'], size=n_electrodes),
+        'view'             : rng.choice(['lateral', 'medial'],
+                                        size=n_electrodes),
+        'location'         : location,
+        'fancy_location'   : [locations[loc] for loc in location],
+        'x'                : rng.uniform(100, 900, size=n_electrodes),
+        'y'                : rng.uniform(100, 700, size=n_electrodes),
+    })
+
+    df = df.loc[df.index.repeat(len(alignments))].reset_index(drop=True)
+    df['alignment'] = np.tile(alignments, n_electrodes)
+    df['pval'] = rng.random(df.shape[0]) ** 2
+    df['correlation'] = rng.uniform(-1, 1, size=df.shape[0])
+    return df
+
+
+def high_gamma(n_trials=100, n_times=375, n_electrodes=256, random_seed=0):
+    """
+    Generate z-scored high-gamma trials (trials x time x electrodes) with a
+    smooth evoked response on a subset of electrodes.
+
+    Returns
+    -------
+    trials : 3d array
+        The trials, of shape (n_trials, n_times, n_electrodes).
+    """
+    rng = np.random.default_rng(random_seed)
+
+    t = np.linspace(-0.5, 3.25, n_times)
+    evoked = np.exp(-(t - 1) ** 2 / 0.1)[:, None] * \
+        (rng.random(n_electrodes) < 0.3)
+    trials = rng.standard_normal((n_trials, n_times, n_electrodes))
+    return (trials + 2 * evoked).astype(np.float64)
+
+
+def nested_mat(path, n_electrodes=256, n_iterations=100, n_sizes=20,
+               random_seed=0):
+    """
+    Write a .mat file of nested structs and cell arrays shaped like the
+    growth-curve and decoding results (a struct per condition, each with
+    numeric arrays, a cell array of labels and a nested struct).
+
+    Parameters
+    ----------
+    path : str
+        Path to the .mat file to write.
+    n_electrodes : int
+        The number of electrodes in the per-electrode arrays.
+    n_iterations : int
+        The number of iterations in the per-iteration arrays.
+    n_sizes : int
+        The number of electrode subset sizes.
+    random_seed : int
+        Random seed.
+    """
+    rng = np.random.default_rng(random_seed)
+
+    conditions = {}
+    for condition in ['syllable', 'sequence', 'position']:
+        conditions[condition] = {
+            'N_ch_actual'     : np.arange(1, n_sizes + 1) * 5,
+            'c_rate_iter'     : rng.random((n_sizes, n_iterations)),
+            'c_rate_iter_mean': rng.random(n_sizes),
+            'c_rate_iter_std' : rng.random(n_sizes),
+            'legend_str'      : np.array([f'{condition} {i}'
+                                          for i in range(n_sizes)],
+                                         dtype=object),
+            'electrodes'      : {
+                'subject_electrode': np.array(
+                    [f'EC{i % 10}_{i}' for i in range(n_electrodes)],
+                    dtype=object
+                ),
+                'weights'          : rng.random((n_electrodes,
+                                                 n_iterations)),
+            },
+        }
+
+    spio.savemat(path, {'gc_data': conditions})
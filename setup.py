@@ -7,17 +7,22 @@ setuptools.setup(
     description="Code to recreate figure analyses for Liu 2025 sequencing paper.",
     packages=setuptools.find_packages(),
     install_requires=[
+        'h5py==3.7.0',
         'matplotlib==3.5.1',
         'matplotlib_venn==0.11.7',
         'mne==0.20.7',
         'numpy==1.23.5',
         'pandas==1.3.5',
+        'pyarrow==6.0.1',
         'scikit_learn==1.2.1',
         'scipy==1.8.0',
         'seaborn==0.12.2',
         'statannot==0.2.3',
         'statsmodels==0.13.1',
     ],
+    entry_points={
+        'console_scripts': ['sylseq-build = sylseq_paper.build:main'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3.8"
     ]
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+Cache of the decoded brain images and ROI masks used by the recon panels.
+
+Each image is decoded once into a read-only array shared by every panel,
+kept in a least recently used cache and optionally saved decoded to disk
+so that other processes can memory-map it instead of decoding the PNG.
+ROI masks are also converted to boolean masks and label images, so that
+finding the electrodes within an ROI is a single array lookup.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import glob
+import hashlib
+import os
+import re
+from collections import OrderedDict
+
+# Third party libraries
+import matplotlib.pyplot as plt
+import numpy as np
+
+default_img_dir = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'imaging')
+)
+
+brain_img_name = '{}_{}_brain_2D.png'
+mni_img_name = 'MNI_{}_{}_brain_2D.png'
+mni_mask_name = os.path.join('masks_and_rois', 'MNI_{}_{}_brain_2D_{}_mask.png')
+
+
+class AssetCache:
+    """
+    A least recently used cache of decoded images and ROI masks.
+
+    Parameters
+    ----------
+    img_dir : str or None
+        The imaging directory. Defaults to the imaging directory of this
+        repository.
+    maxsize : int
+        The maximum number of decoded arrays kept in memory.
+    mmap_dir : str or None
+        If given, a directory where decoded images are saved as .npy files
+        and memory-mapped from, instead of decoding the PNG again in every
+        process.
+    """
+
+    def __init__(self, img_dir=None, maxsize=64, mmap_dir=None):
+        self.img_dir = default_img_dir if img_dir is None else img_dir
+        self.maxsize = maxsize
+        self.mmap_dir = mmap_dir
+        self._arrays = OrderedDict()
+
+        if mmap_dir is not None:
+            os.makedirs(mmap_dir, exist_ok=True)
+
+    def _cached(self, key, compute):
+        """
+        Get an array from the cache, computing (and storing) it if needed.
+        """
+        if key in self._arrays:
+            self._arrays.move_to_end(key)
+            return self._arrays[key]
+
+        array = compute()
+        array.flags.writeable = False
+        self._arrays[key] = array
+
+        if len(self._arrays) > self.maxsize:
+            self._arrays.popitem(last=False)
+        return array
+
+    def _decode(self, path):
+        """
+        Decode an image, through its memory-mapped decoded copy if enabled.
+        """
+        if self.mmap_dir is None:
+            return plt.imread(path)
+
+        # Key the decoded copy on the path, size and modification time.
+        stat = os.stat(path)
+        key = hashlib.sha256(
+            f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}'
+            .encode()
+        ).hexdigest()
+        npy_path = os.path.join(self.mmap_dir, f'{key}.npy')
+
+        if not os.path.exists(npy_path):
+            tmp_path = f'{npy_path}.{os.getpid()}.tmp.npy'
+            np.save(tmp_path, plt.imread(path))
+            os.replace(tmp_path, npy_path)
+
+        return np.load(npy_path, mmap_mode='r')
+
+    def clear(self):
+        """
+        Empty the in-memory cache.
+        """
+        self._arrays.clear()
+
+    def imread(self, path):
+        """
+        Read an image, decoding it only the first time.
+
+        Parameters
+        ----------
+        path : str
+            Path to the image, absolute or relative to the imaging
+            directory.
+
+        Returns
+        -------
+        img : nd-array
+            The read-only decoded image, as from plt.imread.
+        """
+        path = os.path.join(self.img_dir, path)
+        return self._cached(('image', path), lambda: self._decode(path))
+
+    def brain_image(self, hemi, view, subject=None):
+        """
+        Get a 2D brain image, of the MNI brain or of a subject.
+
+        Parameters
+        ----------
+        hemi : str
+            The hemisphere ('lh' or 'rh'). Ignored for subjects.
+        view : str
+            The view ('lateral' or 'medial').
+        subject : str or None
+            The subject (e.g. 'EC217'). None gets the MNI brain.
+
+        Returns
+        -------
+        img : nd-array
+            The read-only decoded image.
+        """
+        if subject is None:
+            return self.imread(mni_img_name.format(hemi, view))
+        return self.imread(brain_img_name.format(subject, view))
+
+    def available_rois(self, hemi, view):
+        """
+        List the ROIs with a mask for an MNI hemisphere and view.
+        """
+        pattern = os.path.join(self.img_dir, mni_mask_name.format(hemi, view,
+                                                                  '*'))
+        name = re.escape(mni_mask_name.format(hemi, view, '@')).replace(
+            '@', '(.+)'
+        )
+        return sorted(re.search(name + '$', path).group(1)
+                      for path in glob.glob(pattern))
+
+    def roi_mask(self, hemi, view, roi):
+        """
+        Get the boolean mask of an ROI on the MNI brain, True within the
+        ROI (where the mask image is not white).
+
+        Parameters
+        ----------
+        hemi : str
+            The hemisphere ('lh' or 'rh').
+        view : str
+            The view ('lateral' or 'medial').
+        roi : str
+            The ROI (e.g. 'mprcg' or 'sma').
+
+        Returns
+        -------
+        mask : 2d array of bools
+            The read-only mask, of shape (rows, columns) of the image.
+        """
+        return self._cached(
+            ('mask', hemi, view, roi),
+            lambda: self.imread(mni_mask_name.format(hemi, view, roi))[
+                :, :, 0] != 1
+        )
+
+    def roi_pixels(self, hemi, view, roi):
+        """
+        Get the flat (row-major) indices of the pixels within an ROI.
+        """
+        return self._cached(
+            ('pixels', hemi, view, roi),
+            lambda: np.flatnonzero(self.roi_mask(hemi, view, roi))
+        )
+
+    def roi_label_image(self, hemi, view, rois=None):
+        """
+        Get an image labeling each pixel with the index of the ROI it is in
+        (the first of rois, for overlapping masks), or -1 for no ROI.
+
+        Parameters
+        ----------
+        hemi : str
+            The hemisphere ('lh' or 'rh').
+        view : str
+            The view ('lateral' or 'medial').
+        rois : list of str or None
+            The ROIs to label. Defaults to all available ROIs.
+
+        Returns
+        -------
+        labels : 2d array of ints
+            The read-only label image.
+        rois : list of str
+            The ROI of each label.
+        """
+        rois = self.available_rois(hemi, view) if rois is None else \
+            list(rois)
+
+        def _labels():
+            labels = None
+            for i, roi in reversed(list(enumerate(rois))):
+                mask = self.roi_mask(hemi, view, roi)
+                if labels is None:
+                    labels = np.full(mask.shape, -1, dtype=np.int16)
+                labels[mask] = i
+            return labels
+
+        return self._cached(('labels', hemi, view, tuple(rois)),
+                            _labels), rois
+
+    def electrode_rois(self, x, y, hemi, view, rois=None):
+        """
+        Find the ROI each electrode falls in from its image coordinates, in
+        a single lookup into the ROI label image.
+
+        Parameters
+        ----------
+        x : 1d array
+            The electrodes' x (column) image coordinates.
+        y : 1d array
+            The electrodes' y (row) image coordinates.
+        hemi : str
+            The hemisphere ('lh' or 'rh').
+        view : str
+            The view ('lateral' or 'medial').
+        rois : list of str or None
+            The ROIs to test. Defaults to all available ROIs.
+
+        Returns
+        -------
+        electrode_rois : 1d array of objects
+            The ROI of each electrode, or None if it is in no ROI (or
+            outside the image).
+        """
+        labels, rois = self.roi_label_image(hemi, view, rois=rois)
+
+        rows = np.rint(np.asarray(y, dtype=float))
+        cols = np.rint(np.asarray(x, dtype=float))
+        in_image = (rows >= 0) & (rows < labels.shape[0]) & \
+                   (cols >= 0) & (cols < labels.shape[1])
+
+        label = np.full(len(rows), -1)
+        label[in_image] = labels[rows[in_image].astype(int),
+                                 cols[in_image].astype(int)]
+
+        # The label -1 selects the None appended last.
+        return np.array(list(rois) + [None], dtype=object)[label]
+
+    def in_roi(self, x, y, hemi, view, roi):
+        """
+        Whether each electrode falls within an ROI, from its image
+        coordinates.
+
+        Returns
+        -------
+        in_roi : 1d array of bools
+            Whether each electrode is in the ROI.
+        """
+        return self.electrode_rois(x, y, hemi, view, rois=[roi]) == roi
+
+
+_default_assets = None
+
+
+def get_assets():
+    """
+    Get the process-wide default AssetCache.
+    """
+    global _default_assets
+    if _default_assets is None:
+        _default_assets = AssetCache()
+    return _default_assets
@@ -0,0 +1,468 @@
+# -*- coding: utf-8 -*-
+"""
+Headless, parallel figure builds.
+
+Figure panel functions are registered as tasks with the panel decorator,
+declaring the data files they read and the tasks they depend on. The build
+runs independent panels in parallel on a process pool with the Agg backend
+and skips panels whose code, inputs and dependencies have not changed since
+their last build. A panel's code is its whole module, the sylseq_paper
+package and any other source files it declares. For example, in a panel
+module:
+
+>>> from sylseq_paper.build import panel
+>>> @panel(inputs=['fig2_growth_curves.mat'])
+... def growth_curve(data_dir):
+...     fig, ax = plt.subplots()
+...     ...
+...     return fig
+
+which is then built with:
+
+    python -m sylseq_paper.build panels.py --data-dir data --out-dir build -j 8
+
+The panels of sylseq_paper.panels are built when no modules are given.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import argparse
+import functools
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Custom libraries
+from sylseq_paper.cache import file_hash
+from sylseq_paper.parallel import resolve_n_jobs
+
+# Registered tasks, by name.
+registry = {}
+
+manifest_name = '.build_manifest.json'
+
+package_dir = os.path.dirname(os.path.abspath(__file__))
+
+default_modules = ['sylseq_paper.panels']
+
+
+def _update_with_file(sha, path):
+    """
+    Add a file's path and contents (or that it is missing) to a hash.
+    """
+    sha.update(path.encode())
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            sha.update(f.read())
+    else:
+        sha.update(b'missing')
+
+
+@functools.lru_cache(maxsize=None)
+def package_hash():
+    """
+    Hash the source files of the sylseq_paper package, which any panel may
+    call into.
+    """
+    sha = hashlib.sha256()
+    for root, dirs, files in os.walk(package_dir):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        for file in sorted(files):
+            if file.endswith('.py'):
+                path = os.path.join(root, file)
+                sha.update(os.path.relpath(path, package_dir).encode())
+                with open(path, 'rb') as f:
+                    sha.update(f.read())
+    return sha.hexdigest()
+
+
+class Task:
+    """
+    A registered figure panel.
+
+    Parameters
+    ----------
+    func : function
+        The panel function. It may accept the keyword arguments data_dir,
+        img_dir and out_dir, and should return the matplotlib Figure to
+        save (the current figure is saved if it returns None), or save its
+        own outputs when formats is empty.
+    name : str
+        The task name, also the output file name.
+    inputs : list of str
+        The data files the panel reads, relative to the data directory.
+    requires : list of str
+        The names of the tasks that must run first (e.g. tasks writing
+        intermediate data files listed in inputs).
+    depends : list of str
+        Source files the panel uses outside its own module and the
+        sylseq_paper package (e.g. a shared helper script).
+    formats : list of str
+        The file formats to save the figure in.
+    savefig_kwargs : dictionary
+        Keyword arguments for Figure.savefig.
+    """
+
+    def __init__(self, func, name, inputs=(), requires=(), depends=(),
+                 formats=('pdf',), savefig_kwargs=None):
+        self.func = func
+        self.name = name
+        self.inputs = list(inputs)
+        self.requires = list(requires)
+        self.depends = list(depends)
+        self.formats = list(formats)
+        self.savefig_kwargs = savefig_kwargs or {}
+
+    def __repr__(self):
+        return (f'Task({self.name}, inputs={self.inputs}, '
+                f'requires={self.requires})')
+
+    def outputs(self, out_dir):
+        """
+        The paths of the figure files the task saves.
+        """
+        return [os.path.join(out_dir, f'{self.name}.{fmt}')
+                for fmt in self.formats]
+
+    def code_hash(self):
+        """
+        Hash the source code of the panel's module, of the sylseq_paper
+        package and of the declared dependencies, so that a change to any
+        helper the panel calls rebuilds it.
+        """
+        sha = hashlib.sha256(package_hash().encode())
+        sha.update(self.func.__qualname__.encode())
+
+        try:
+            module_path = inspect.getsourcefile(self.func)
+        except TypeError:
+            module_path = None
+        if module_path is not None:
+            _update_with_file(sha, module_path)
+
+        for path in self.depends:
+            _update_with_file(sha, path)
+
+        return sha.hexdigest()
+
+
+def panel(func=None, name=None, inputs=(), requires=(), depends=(),
+          formats=('pdf',), savefig_kwargs=None):
+    """
+    Decorator registering a figure panel function as a build task (see
+    Task). Can be used with or without arguments.
+
+    Parameters
+    ----------
+    func : function
+        The panel function.
+    name : str or None
+        The task name. Defaults to the function name.
+    inputs : list of str
+        The data files the panel reads, relative to the data directory.
+    requires : list of str
+        The names of the tasks that must run first.
+    depends : list of str
+        Source files the panel uses outside its own module and the
+        sylseq_paper package.
+    formats : list of str
+        The file formats to save the figure in.
+    savefig_kwargs : dictionary
+        Keyword arguments for Figure.savefig.
+
+    Returns
+    -------
+    func : function
+        The function, unchanged.
+    """
+    if func is None:
+        return lambda f: panel(f, name=name, inputs=inputs,
+                               requires=requires, depends=depends,
+                               formats=formats,
+                               savefig_kwargs=savefig_kwargs)
+
+    task_name = func.__name__ if name is None else name
+    registry[task_name] = Task(func, task_name, inputs=inputs,
+                               requires=requires, depends=depends,
+                               formats=formats,
+                               savefig_kwargs=savefig_kwargs)
+    return func
+
+
+def load_panel_modules(paths):
+    """
+    Import panel modules (by file path or module name), registering their
+    tasks.
+    """
+    for path in paths:
+        if os.path.isfile(path):
+            module_name = os.path.splitext(os.path.basename(path))[0]
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            spec.loader.exec_module(module)
+        else:
+            importlib.import_module(path)
+
+
+def task_order(names=None):
+    """
+    Sort tasks so that every task comes after the tasks it requires.
+
+    Parameters
+    ----------
+    names : list of str or None
+        The tasks to build (their requirements are added). None builds all
+        registered tasks.
+
+    Returns
+    -------
+    order : list of str
+        The task names in dependency order.
+    """
+    names = list(registry) if names is None else list(names)
+
+    order, visiting, visited = [], set(), set()
+
+    def _visit(name):
+        if name in visited:
+            return
+        if name in visiting:
+            raise ValueError(f'The task {name} depends on itself.')
+        if name not in registry:
+            raise KeyError(f'Unknown task {name}.')
+
+        visiting.add(name)
+        for required in registry[name].requires:
+            _visit(required)
+        visiting.remove(name)
+        visited.add(name)
+        order.append(name)
+
+    for name in names:
+        _visit(name)
+    return order
+
+
+def task_signature(name, data_dir, signatures):
+    """
+    Compute a task's signature from its code, the current contents of its
+    input files and the signatures of the tasks it requires, so that a
+    change anywhere upstream changes it.
+
+    Parameters
+    ----------
+    name : str
+        The task name.
+    data_dir : str
+        The data directory.
+    signatures : dictionary
+        The signatures of the tasks it requires.
+
+    Returns
+    -------
+    signature : str
+        The hexadecimal signature.
+    """
+    task = registry[name]
+    sha = hashlib.sha256(task.code_hash().encode())
+
+    for path in task.inputs:
+        full_path = os.path.join(data_dir, path)
+        sha.update(path.encode())
+        sha.update(file_hash(full_path).encode()
+                   if os.path.exists(full_path) else b'missing')
+
+    for required in task.requires:
+        sha.update(signatures[required].encode())
+
+    return sha.hexdigest()
+
+
+def _init_worker(module_paths):
+    """
+    Set up a worker process: use the Agg backend and register the tasks.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    if not registry:
+        load_panel_modules(module_paths)
+
+
+def run_task(name, data_dir, img_dir, out_dir):
+    """
+    Run a single task and save its figure.
+
+    Returns
+    -------
+    duration : float
+        The run time, in seconds.
+    """
+    import matplotlib.pyplot as plt
+
+    task = registry[name]
+    start = time.time()
+
+    available = {'data_dir': data_dir, 'img_dir': img_dir,
+                 'out_dir': out_dir}
+    parameters = inspect.signature(task.func).parameters
+    fig = task.func(**{key: val for key, val in available.items()
+                       if key in parameters})
+
+    if task.formats:
+        fig = plt.gcf() if fig is None else getattr(fig, 'figure', fig)
+        for path in task.outputs(out_dir):
+            fig.savefig(path, **task.savefig_kwargs)
+    plt.close('all')
+
+    return time.time() - start
+
+
+def build(module_paths, data_dir, out_dir, img_dir=None, names=None,
+          n_jobs=None, force=False, log=print):
+    """
+    Build figure panels, running independent panels in parallel and
+    skipping panels whose signature (see task_signature) matches their
+    last successful build and whose outputs exist.
+
+    Parameters
+    ----------
+    module_paths : list of str
+        The panel modules (file paths or module names) registering tasks.
+    data_dir : str
+        The data directory.
+    out_dir : str
+        The directory to save the figures (and the build manifest) to.
+    img_dir : str or None
+        The imaging directory, passed to panels accepting img_dir.
+    names : list of str or None
+        The tasks to build (with their requirements). None builds all.
+    n_jobs : int or None
+        The number of worker processes (see parallel.resolve_n_jobs).
+    force : bool, default False
+        Whether to rebuild every task, even if unchanged.
+    log : function
+        Called with progress messages.
+
+    Returns
+    -------
+    status : dictionary
+        For each task, 'built', 'skipped' or 'failed'.
+    """
+    load_panel_modules(module_paths)
+    os.makedirs(out_dir, exist_ok=True)
+
+    manifest_path = os.path.join(out_dir, manifest_name)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    status, signatures = {}, {}
+
+    def _finish(name, result, message):
+        status[name] = result
+        if result == 'built':
+            manifest[name] = signatures[name]
+        elif result == 'failed':
+            manifest.pop(name, None)
+        log(f'{name}: {message}')
+
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    pending = task_order(names)
+    n_jobs = resolve_n_jobs(n_jobs)
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                             initargs=(list(module_paths),)) as executor:
+        running = {}
+        while pending or running:
+            ready = [n for n in pending
+                     if all(r in status for r in registry[n].requires)]
+            for name in ready:
+                pending.remove(name)
+                task = registry[name]
+
+                if any(status[r] == 'failed' for r in task.requires):
+                    _finish(name, 'failed', 'a required task failed')
+                    continue
+
+                # The signature is computed once the requirements have run,
+                # so that it covers the inputs they wrote.
+                signatures[name] = task_signature(name, data_dir, signatures)
+                if not force and manifest.get(name) == signatures[name] and \
+                        all(os.path.exists(p) for p in task.outputs(out_dir)):
+                    _finish(name, 'skipped', 'up to date')
+                    continue
+
+                running[executor.submit(run_task, name, data_dir, img_dir,
+                                        out_dir)] = name
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    duration = future.result()
+                except Exception as e:
+                    _finish(name, 'failed', f'failed ({e!r})')
+                else:
+                    _finish(name, 'built', f'built in {duration:0.1f} s')
+
+    return status
+
+
+def main(argv=None):
+    """
+    Command line entry point for build.
+    """
+    parser = argparse.ArgumentParser(
+        description='Build the figure panels registered in panel modules.'
+    )
+    parser.add_argument('modules', nargs='*', default=default_modules,
+                        help='Panel modules (file paths or module names). '
+                             'Defaults to sylseq_paper.panels.')
+    parser.add_argument('--data-dir', default='data',
+                        help='The data directory.')
+    parser.add_argument('--img-dir', default=None,
+                        help='The imaging directory.')
+    parser.add_argument('--out-dir', default='build',
+                        help='The output directory.')
+    parser.add_argument('--only', nargs='+', default=None,
+                        help='Build only these tasks (and their '
+                             'requirements).')
+    parser.add_argument('-j', '--jobs', type=int, default=-1,
+                        help='The number of worker processes (-1 for all '
+                             'CPUs).')
+    parser.add_argument('--force', action='store_true',
+                        help='Rebuild every task, even if unchanged.')
+    parser.add_argument('--list', action='store_true',
+                        help='List the tasks in dependency order and exit.')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        load_panel_modules(args.modules)
+        for name in task_order(args.only):
+            print(registry[name])
+        return 0
+
+    status = build(args.modules, args.data_dir, args.out_dir,
+                   img_dir=args.img_dir, names=args.only, n_jobs=args.jobs,
+                   force=args.force)
+    return int(any(s == 'failed' for s in status.values()))
+
+
+if __name__ == '__main__':
+    # Run through the importable module, so that panel modules register
+    # their tasks in the same registry.
+    from sylseq_paper import build as _build
+    sys.exit(_build.main())
@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent, content-hashed disk cache for loaded and derived data.
+
+Results are keyed by the function (its name, its source code, the source of
+its module and of any helpers it declares in depends_on), the content hash of
+its input files and its other arguments, so a cached result is reused until
+the data, the code or the arguments change. The cache is bounded in size and
+evicts the least recently used entries.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import tempfile
+
+# Third party libraries
+import pandas as pd
+
+# Custom libraries
+from sylseq_paper.profiling import profiled
+
+default_cache_dir = os.environ.get(
+    'SYLSEQ_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'sylseq_paper')
+)
+
+# In-process memo of file hashes, keyed by (path, size, modification time).
+_file_hashes = {}
+
+
+def file_hash(path, block_size=2 ** 20):
+    """
+    Compute the SHA-256 hash of a file's contents. Hashes are remembered
+    for the lifetime of the process until the file's size or modification
+    time changes.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file.
+    block_size : int
+        The number of bytes read at a time.
+
+    Returns
+    -------
+    digest : str
+        The hexadecimal hash.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    memo_key = (path, stat.st_size, stat.st_mtime_ns)
+
+    if memo_key not in _file_hashes:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                sha.update(block)
+        _file_hashes[memo_key] = sha.hexdigest()
+
+    return _file_hashes[memo_key]
+
+
+def _source(obj):
+    """
+    Get the source code of a function or module, or '' when unavailable.
+    """
+    try:
+        return inspect.getsource(inspect.unwrap(obj))
+    except (OSError, TypeError):
+        return ''
+
+
+def _function_id(func, depends_on=()):
+    """
+    Identify a function by its qualified name and, when available, its
+    source code and the source of its module, along with the sources of
+    the helpers it depends on, so that editing the function, its module or
+    a declared helper invalidates its entries. Edits elsewhere in the
+    package do not.
+    """
+    func = inspect.unwrap(func)
+    try:
+        module_hash = file_hash(inspect.getsourcefile(func))
+    except (OSError, TypeError):
+        module_hash = ''
+    return (f'{func.__module__}.{func.__qualname__}', _source(func),
+            module_hash, [_source(helper) for helper in depends_on])
+
+
+class DiskCache:
+    """
+    A size-bounded, least recently used cache of pickled values on disk.
+
+    Parameters
+    ----------
+    cache_dir : str or None
+        The directory holding the cache entries. Defaults to the
+        SYLSEQ_CACHE_DIR environment variable, or ~/.cache/sylseq_paper.
+    max_bytes : int
+        The maximum total size of the entries. The least recently used
+        entries are evicted once it is exceeded.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=10 * 2 ** 30):
+        self.cache_dir = default_cache_dir if cache_dir is None else cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.pkl')
+
+    def _entries(self):
+        return [os.path.join(self.cache_dir, f)
+                for f in os.listdir(self.cache_dir) if f.endswith('.pkl')]
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        """
+        Get a cached value, marking it as recently used.
+
+        Raises
+        ------
+        KeyError
+            If the key is not in the cache.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            raise KeyError(key)
+        except Exception:
+            # A truncated or corrupt entry is removed and treated as a miss.
+            self.invalidate(key)
+            raise KeyError(key)
+
+        os.utime(path)
+        return value
+
+    def set(self, key, value):
+        """
+        Store a value, then evict least recently used entries if the cache
+        is over its size limit.
+        """
+        # Write to a temporary file first so that a concurrent reader never
+        # sees a partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))
+
+        self.evict()
+
+    def invalidate(self, key):
+        """
+        Remove an entry, if it exists.
+        """
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        for path in self._entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def size(self):
+        """
+        The total size of the entries, in bytes.
+        """
+        return sum(os.path.getsize(path) for path in self._entries())
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache is within
+        its size limit.
+        """
+        entries = []
+        for path in self._entries():
+            # Entries may be removed by another process meanwhile.
+            try:
+                entries.append((os.stat(path), path))
+            except FileNotFoundError:
+                pass
+        total = sum(stat.st_size for stat, _ in entries)
+
+        for stat, path in sorted(entries, key=lambda e: e[0].st_mtime_ns):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= stat.st_size
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    """
+    Get the process-wide default DiskCache.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = DiskCache()
+    return _default_cache
+
+
+def cache_key(func, args=(), kwargs=None, file_args=(), depends_on=()):
+    """
+    Compute the cache key of a function call from the function (and the
+    helpers it depends on), the content hash of the files named by
+    file_args and the other arguments.
+
+    Parameters
+    ----------
+    func : function
+        The function being called.
+    args : tuple
+        The positional arguments of the call.
+    kwargs : dictionary
+        The keyword arguments of the call.
+    file_args : list of str
+        The names of the arguments that are paths to input files.
+    depends_on : list of functions or modules
+        Helpers outside the function's module whose source is part of the
+        key.
+
+    Returns
+    -------
+    key : str
+        The hexadecimal key.
+    """
+    bound = inspect.signature(func).bind(*args, **(kwargs or {}))
+    bound.apply_defaults()
+
+    arguments = dict(bound.arguments)
+    for name in file_args:
+        if arguments.get(name) is not None:
+            arguments[name] = ('file', file_hash(arguments[name]))
+
+    try:
+        payload = pickle.dumps((_function_id(func, depends_on),
+                                sorted(arguments.items())), protocol=4)
+    except (pickle.PicklingError, TypeError, AttributeError) as e:
+        raise TypeError(f'The arguments of {func.__qualname__} cannot be '
+                        f'hashed for caching: {e}')
+
+    return hashlib.sha256(payload).hexdigest()
+
+
+def cached(func=None, file_args=(), depends_on=(), cache=None):
+    """
+    Decorator memoizing a function's results in a DiskCache, keyed by the
+    function, its input files' contents and its other arguments (see
+    cache_key). Can be used with or without arguments:
+
+    >>> @cached(file_args=['path'])
+    ... def load_electrodes(path, subjects=None):
+    ...     ...
+
+    Statistics can be memoized the same way, e.g.
+    cached(correlation_permutation_matrix)(groups, target, random_seed=0).
+    Edits to the function or its module invalidate its entries, while
+    helpers it calls from other modules must be listed in depends_on.
+    The decorated function has an invalidate method removing the entry for
+    given arguments.
+
+    Parameters
+    ----------
+    func : function
+        The function to decorate.
+    file_args : list of str
+        The names of the arguments that are paths to input files, which are
+        hashed by content rather than by name.
+    depends_on : list of functions or modules
+        Helpers outside the function's module whose source is part of the
+        key, e.g. [parallel.parallel_resample].
+    cache : DiskCache or None
+        The cache to use. Defaults to get_default_cache().
+
+    Returns
+    -------
+    wrapper : function
+        The memoized function.
+    """
+    if func is None:
+        return functools.partial(cached, file_args=file_args,
+                                 depends_on=depends_on, cache=cache)
+
+    def _cache():
+        return get_default_cache() if cache is None else cache
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = cache_key(func, args, kwargs, file_args=file_args,
+                        depends_on=depends_on)
+        try:
+            return _cache().get(key)
+        except KeyError:
+            value = func(*args, **kwargs)
+            _cache().set(key, value)
+            return value
+
+    def invalidate(*args, **kwargs):
+        _cache().invalidate(cache_key(func, args, kwargs,
+                                      file_args=file_args,
+                                      depends_on=depends_on))
+
+    wrapper.invalidate = invalidate
+    return wrapper
+
+
+@profiled
+@cached(file_args=['path'])
+def read_hdf(path, key=None, **kwargs):
+    """
+    Cached pd.read_hdf, reused until the file contents change.
+
+    Parameters
+    ----------
+    path : str
+        Path to the HDF5 file.
+    key : str or None
+        The group in the HDF5 file.
+    kwargs : dictionary
+        The keyword arguments to pass to pd.read_hdf.
+
+    Returns
+    -------
+    df : pd.DataFrame
+        The loaded table.
+    """
+    return pd.read_hdf(path, key=key, **kwargs)
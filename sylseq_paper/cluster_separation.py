@@ -0,0 +1,491 @@
+# -*- coding: utf-8 -*-
+"""
+Separation of the NMF clusters in PC space (Figure S6b-e), following
+figures/figureS6bcde-cluster_separation.m.
+
+The NMF input responses are downsampled and projected onto their first
+principal components, together with the NMF bases, and each electrode is
+assigned to the cluster of its largest NMF weight. Within-cluster and
+between-cluster Euclidean distances in PC space are then compared with a
+rank-sum test, and the angles between the projected bases are computed.
+Pairwise distances are computed in blocks and accumulated into fine
+histograms, so that the full electrode x electrode distance matrix is
+never built.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Third party libraries
+import numpy as np
+from scipy import signal, stats
+from scipy.spatial.distance import cdist
+
+# Custom libraries
+from sylseq_paper.file_utils import loadmat_fast
+from sylseq_paper.profiling import profiled
+
+# The order the clusters are plotted (and compared) in, and their colors.
+plot_order = [1, 2, 0, 3]
+cluster_colors = ['#F48024', '#EC1848', '#716FB2', '#90BD31']
+
+
+def load_nmf_clustering(filename):
+    """
+    Load the NMF inputs, bases and weights from fig1_nmf_clustering.mat.
+
+    Returns
+    -------
+    data_nmf : 2d array
+        The NMF input responses, of shape (time, electrodes).
+    W : 2d array
+        The NMF weights, of shape (electrodes, clusters), such that
+        data_nmf @ W are the cluster bases.
+    nmf_weights : 2d array
+        The weights used to assign electrodes to clusters, of shape
+        (electrodes, clusters).
+    """
+    data = loadmat_fast(filename,
+                        variable_names=['data_NMF', 'W', 'nmf_weights'])
+    return (np.asarray(data['data_NMF'], dtype=float),
+            np.asarray(data['W'], dtype=float),
+            np.asarray(data['nmf_weights'], dtype=float))
+
+
+def pca(data, n_components=4):
+    """
+    Principal component analysis of centered data through the SVD, with
+    the sign convention of MATLAB's pca (the largest absolute coefficient
+    of each component is positive).
+
+    Parameters
+    ----------
+    data : 2d array
+        The centered data, of shape (observations, variables).
+    n_components : int
+        The number of components to keep.
+
+    Returns
+    -------
+    coeff : 2d array
+        The component coefficients, of shape (variables, n_components).
+    explained : 1d array
+        The percentage of variance explained by every component.
+    """
+    _, singular_values, vt = np.linalg.svd(data, full_matrices=False)
+    coeff = vt[:n_components].T
+
+    max_idx = np.argmax(np.abs(coeff), axis=0)
+    coeff = coeff * np.sign(coeff[max_idx, np.arange(coeff.shape[1])])
+
+    explained = 100 * singular_values ** 2 / np.sum(singular_values ** 2)
+    return coeff, explained
+
+
+@profiled
+def nmf_pca(data_nmf, W, n_components=4, downsample=4):
+    """
+    Downsample the NMF input responses and the NMF bases (data_nmf @ W)
+    in time, and project both onto the first principal components of the
+    electrodes' responses.
+
+    Parameters
+    ----------
+    data_nmf : 2d array
+        The NMF input responses, of shape (time, electrodes).
+    W : 2d array
+        The NMF weights, of shape (electrodes, clusters).
+    n_components : int
+        The number of principal components to project onto.
+    downsample : int
+        The downsampling factor, applied with a polyphase anti-aliasing
+        filter (as MATLAB's resample).
+
+    Returns
+    -------
+    scores : 2d array
+        The electrodes in PC space, of shape (electrodes, n_components).
+    bases : 2d array
+        The NMF bases in PC space, of shape (clusters, n_components).
+    explained : 1d array
+        The percentage of variance explained by every component.
+    """
+    bases = data_nmf @ W
+
+    data_rs = signal.resample_poly(data_nmf, 1, downsample, axis=0).T
+    data_rs = data_rs - data_rs.mean(axis=0)
+    coeff, explained = pca(data_rs, n_components=n_components)
+
+    bases_rs = signal.resample_poly(bases, 1, downsample, axis=0).T
+    bases_rs = bases_rs - bases_rs.mean(axis=0)
+
+    return data_rs @ coeff, bases_rs @ coeff, explained
+
+
+def assign_clusters(nmf_weights):
+    """
+    Assign each electrode to the cluster of its largest NMF weight.
+
+    Parameters
+    ----------
+    nmf_weights : 2d array
+        The weights, of shape (electrodes, clusters).
+
+    Returns
+    -------
+    clusters : 1d array of ints
+        The (0-based) cluster of each electrode.
+    """
+    return np.argmax(nmf_weights, axis=1)
+
+
+def basis_angles(bases):
+    """
+    Compute the angles between every pair of bases.
+
+    Parameters
+    ----------
+    bases : 2d array
+        The bases, of shape (clusters, dimensions).
+
+    Returns
+    -------
+    angles : 2d array
+        The angles in degrees, of shape (clusters, clusters).
+    """
+    unit = bases / np.linalg.norm(bases, axis=1, keepdims=True)
+    return np.rad2deg(np.arccos(np.clip(unit @ unit.T, -1, 1)))
+
+
+class DistanceHistogram:
+    """
+    Counts of distances in fine, equally spaced bins, with their exact
+    number, mean, standard deviation, minimum and maximum, accumulated
+    block by block.
+
+    Parameters
+    ----------
+    max_distance : float
+        The largest possible distance.
+    n_bins : int
+        The number of bins between 0 and max_distance.
+    """
+
+    def __init__(self, max_distance, n_bins=10000):
+        self.edges = np.linspace(0, max_distance, n_bins + 1)
+        self.counts = np.zeros(n_bins, dtype=np.int64)
+        self.n = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, distances):
+        """
+        Add a block of distances.
+        """
+        distances = np.ravel(distances)
+        if len(distances) == 0:
+            return
+
+        n_bins = len(self.counts)
+        idx = (distances / self.edges[-1] * n_bins).astype(np.int64)
+        self.counts += np.bincount(np.clip(idx, 0, n_bins - 1),
+                                   minlength=n_bins)
+
+        self.n += len(distances)
+        self._sum += distances.sum()
+        self._sum_sq += np.sum(distances ** 2)
+        self.min = min(self.min, distances.min())
+        self.max = max(self.max, distances.max())
+
+    @property
+    def mean(self):
+        return self._sum / self.n
+
+    @property
+    def std(self):
+        return np.sqrt(max(self._sum_sq / self.n - self.mean ** 2, 0))
+
+    def quantile(self, q):
+        """
+        Approximate quantiles of the distances, to within a bin width.
+        """
+        cumulative = np.cumsum(self.counts)
+        idx = np.searchsorted(cumulative, np.asarray(q) * self.n)
+        centers = (self.edges[:-1] + self.edges[1:]) / 2
+        return np.clip(centers[np.minimum(idx, len(centers) - 1)],
+                       self.min, self.max)
+
+    def box_stats(self, label=None, whis=1.5):
+        """
+        Box plot statistics for matplotlib's Axes.bxp.
+        """
+        q1, med, q3 = self.quantile([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        return {'label' : label, 'med': med, 'q1': q1, 'q3': q3,
+                'mean'  : self.mean,
+                'whislo': max(self.min, q1 - whis * iqr),
+                'whishi': min(self.max, q3 + whis * iqr),
+                'fliers': []}
+
+
+def _accumulate_distances(points_a, points_b, histogram, block_size=2048,
+                          upper=False, distances=None):
+    """
+    Add the distances between points_a and points_b (only the pairs i < j
+    if upper, for points_a is points_b) to the histogram in tiles of at
+    most block_size x block_size pairs, also collecting them (in tile
+    order) in the distances list if given.
+    """
+    upper_masks = {}
+
+    for start_a in range(0, len(points_a), block_size):
+        stop_a = min(start_a + block_size, len(points_a))
+
+        # Within a set, only the tiles on or above the diagonal are needed.
+        first_b = start_a if upper else 0
+        for start_b in range(first_b, len(points_b), block_size):
+            stop_b = min(start_b + block_size, len(points_b))
+            block = cdist(points_a[start_a:stop_a], points_b[start_b:stop_b])
+
+            if upper and start_b == start_a:
+                # Diagonal tiles are square, keep their upper triangle.
+                n = stop_a - start_a
+                if n not in upper_masks:
+                    upper_masks[n] = np.triu(np.ones((n, n), dtype=bool),
+                                             k=1)
+                block = block[upper_masks[n]]
+
+            histogram.update(block)
+            if distances is not None:
+                distances.append(block.ravel())
+
+
+def rank_sum_test(x_counts, y_counts):
+    """
+    Wilcoxon rank-sum test from the counts of two samples in shared,
+    ordered bins (or unique values), with values in the same bin treated
+    as ties. Follows MATLAB's ranksum normal approximation (with tie and
+    continuity corrections), computing the rank sum of the smaller sample.
+
+    Parameters
+    ----------
+    x_counts : 1d array of ints
+        The number of values of the first sample in each bin.
+    y_counts : 1d array of ints
+        The number of values of the second sample in each bin.
+
+    Returns
+    -------
+    z : float
+        The z statistic.
+    p_value : float
+        The two-sided p-value.
+    """
+    x_counts = np.asarray(x_counts, dtype=float)
+    y_counts = np.asarray(y_counts, dtype=float)
+    nx, ny = x_counts.sum(), y_counts.sum()
+
+    small_counts, n_small = (x_counts, nx) if nx <= ny else (y_counts, ny)
+
+    # Mid-ranks of each bin.
+    ties = x_counts + y_counts
+    ranks = np.cumsum(ties) - ties + (ties + 1) / 2
+    rank_sum = np.sum(small_counts * ranks)
+
+    n = nx + ny
+    tie_correction = np.sum(ties ** 3 - ties) / (n * (n - 1))
+    variance = nx * ny * ((n + 1) - tie_correction) / 12
+
+    centered = rank_sum - n_small * (n + 1) / 2
+    z = (centered - 0.5 * np.sign(centered)) / np.sqrt(variance)
+    return z, 2 * stats.norm.cdf(-np.abs(z))
+
+
+@profiled
+def cluster_separation(scores, clusters, order=None, components=(1, 2, 3),
+                       include_same_cluster=True, n_bins=10000,
+                       block_size=2048, return_distances=False):
+    """
+    Compare the within-cluster and between-cluster Euclidean distances of
+    the electrodes in PC space, computing distances in blocks.
+
+    As in the MATLAB script, the clusters are taken in order and the
+    between-cluster distances of a cluster are to itself and to every
+    later cluster, so that by default they also include every ordered pair
+    of the same cluster (with the zero self-distances).
+
+    Parameters
+    ----------
+    scores : 2d array
+        The electrodes in PC space, of shape (electrodes, components).
+    clusters : 1d array of ints
+        The cluster of each electrode.
+    order : list of ints or None
+        The order of the clusters. Defaults to plot_order.
+    components : list of ints
+        The (0-based) components to compute distances in (PC2-PC4 by
+        default).
+    include_same_cluster : bool, default True
+        Whether the between-cluster distances include the pairs of the same
+        cluster, as in the MATLAB script. False compares only distinct
+        clusters.
+    n_bins : int
+        The number of histogram bins of the distances, which sets the
+        precision of the quantiles and rank-sum test.
+    block_size : int
+        The number of electrodes per side of the tiles of distances, which
+        bounds the memory to block_size ** 2 distances.
+    return_distances : bool, default False
+        Whether to also return every distance, in no particular order
+        (memory grows with the square of the number of electrodes), in which
+        case the rank-sum test is exact.
+
+    Returns
+    -------
+    results : dictionary
+        The within and between DistanceHistograms, the rank-sum z and
+        p_value (within vs. between) and, if return_distances, the within
+        and between distance arrays (within_distances and
+        between_distances).
+    """
+    order = plot_order if order is None else list(order)
+    points = np.asarray(scores)[:, list(components)]
+    members = [points[clusters == c] for c in order]
+
+    max_distance = np.linalg.norm(np.ptp(points, axis=0))
+    within = DistanceHistogram(max_distance, n_bins=n_bins)
+    between = DistanceHistogram(max_distance, n_bins=n_bins)
+    within_list = [] if return_distances else None
+    between_list = [] if return_distances else None
+
+    for k, points_k in enumerate(members):
+        _accumulate_distances(points_k, points_k, within,
+                              block_size=block_size, upper=True,
+                              distances=within_list)
+
+        start = k if include_same_cluster else k + 1
+        for points_j in members[start:]:
+            _accumulate_distances(points_k, points_j, between,
+                                  block_size=block_size,
+                                  distances=between_list)
+
+    results = {'within': within, 'between': between}
+
+    if return_distances:
+        results['within_distances'] = np.concatenate(within_list)
+        results['between_distances'] = np.concatenate(between_list)
+
+        values, codes = np.unique(np.concatenate(
+            [results['within_distances'], results['between_distances']]
+        ), return_inverse=True)
+        n_within = len(results['within_distances'])
+        x_counts = np.bincount(codes[:n_within], minlength=len(values))
+        y_counts = np.bincount(codes[n_within:], minlength=len(values))
+    else:
+        x_counts, y_counts = within.counts, between.counts
+
+    results['z'], results['p_value'] = rank_sum_test(x_counts, y_counts)
+    return results
+
+
+def run(filename, n_components=4, downsample=4, **kwargs):
+    """
+    Run the Figure S6b-e analysis on fig1_nmf_clustering.mat.
+
+    Parameters
+    ----------
+    filename : str
+        Path to fig1_nmf_clustering.mat.
+    n_components : int
+        The number of principal components.
+    downsample : int
+        The downsampling factor of the responses.
+    kwargs : dictionary
+        The keyword arguments to pass to cluster_separation.
+
+    Returns
+    -------
+    results : dictionary
+        The cluster_separation results, with the electrode scores, the
+        projected bases, the explained variance, the clusters and the
+        angles between the bases (in PC2-PC4, ordered as plot_order).
+    """
+    data_nmf, W, nmf_weights = load_nmf_clustering(filename)
+    scores, bases, explained = nmf_pca(data_nmf, W,
+                                       n_components=n_components,
+                                       downsample=downsample)
+    clusters = assign_clusters(nmf_weights)
+
+    results = cluster_separation(scores, clusters, **kwargs)
+    components = list(kwargs.get('components', (1, 2, 3)))
+    order = list(kwargs.get('order', plot_order))
+
+    results.update({
+        'scores'   : scores,
+        'bases'    : bases,
+        'explained': explained,
+        'clusters' : clusters,
+        'angles'   : basis_angles(bases[order][:, components]),
+    })
+    return results
+
+
+def plot_cluster_pcs(ax, scores, clusters, bases, order=None, colors=None,
+                     components=(1, 2, 3), basis_scale=30):
+    """
+    Scatter the electrodes of each cluster in 3D PC space with the
+    direction of its NMF basis (Figure S6b-d).
+
+    Parameters
+    ----------
+    ax : matplotlib 3D Axes
+        The axes to plot on (e.g. fig.add_subplot(projection='3d')).
+    scores : 2d array
+        The electrodes in PC space.
+    clusters : 1d array of ints
+        The cluster of each electrode.
+    bases : 2d array
+        The NMF bases in PC space.
+    order : list of ints or None
+        The order of the clusters. Defaults to plot_order.
+    colors : list or None
+        The color of each cluster, in order. Defaults to cluster_colors.
+    components : list of ints
+        The three (0-based) components to plot.
+    basis_scale : float
+        The length the basis directions are scaled by.
+    """
+    order = plot_order if order is None else order
+    colors = cluster_colors if colors is None else colors
+    components = list(components)
+
+    for cluster, color in zip(order, colors):
+        points = scores[clusters == cluster][:, components]
+        ax.scatter(*points.T, s=40, color=color, alpha=0.5,
+                   edgecolors='none', rasterized=True)
+
+        tip = bases[cluster, components] * basis_scale
+        ax.plot(*[[0, t] for t in tip], color=color, linewidth=1.5)
+
+    ax.set_xlabel(f'PC{components[0] + 1}')
+    ax.set_ylabel(f'PC{components[1] + 1}')
+    ax.set_zlabel(f'PC{components[2] + 1}')
+
+
+def plot_distances(ax, results):
+    """
+    Box plot of the within-cluster and between-cluster distances from the
+    cluster_separation results (Figure S6e), marking p < 0.001.
+    """
+    ax.bxp([results['within'].box_stats('Within-cluster'),
+            results['between'].box_stats('Between clusters')],
+           showfliers=False, medianprops={'color': 'k'})
+
+    if results['p_value'] < 0.001:
+        top = max(results['within'].max, results['between'].max)
+        ax.plot([1, 1, 2, 2], [top, top * 1.04, top * 1.04, top], 'k')
+        ax.text(1.5, top * 1.06, '***', ha='center')
+
+    ax.set_ylabel('Euclidean distance in PC space')
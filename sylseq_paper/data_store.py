@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar, memory-mapped store for the electrode tables and trial arrays.
+
+The pandas HDF5 tables of the data directory are converted once to Parquet
+files, sorted by the columns commonly filtered on (subject, alignment,
+hemisphere and view) and written in small row groups, so that reading only
+some columns of one subject's electrodes reads only those bytes. Trial
+arrays are kept as .npy files and memory-mapped. Parquet support requires
+pyarrow.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import glob
+import os
+import shutil
+import warnings
+
+# Third party libraries
+import numpy as np
+import pandas as pd
+
+# Custom libraries
+from sylseq_paper.profiling import profiled
+
+# Columns the tables are sorted by, so that filters on them skip row groups.
+sort_columns = ['subject', 'alignment', 'hemisphere', 'view']
+
+
+def _import_pyarrow():
+    """
+    Import pyarrow and pyarrow.parquet, which are only needed for the
+    columnar tables.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('The columnar data store requires pyarrow (pip '
+                          'install pyarrow).')
+    return pa, pq
+
+
+def table_name(h5_path, key):
+    """
+    Get the name of the stored table for a key of an HDF5 file, the file
+    name without extension for the only (or default) key.
+    """
+    stem = os.path.splitext(os.path.basename(h5_path))[0]
+    key = key.strip('/')
+    return stem if key in ['', 'df'] else f'{stem}__{key.replace("/", "__")}'
+
+
+def write_table(df, path, row_group_size=10000):
+    """
+    Write a DataFrame to a Parquet file sorted by the sort_columns it has,
+    with string columns dictionary-encoded.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The table to write.
+    path : str
+        Path to the Parquet file.
+    row_group_size : int
+        The maximum number of rows per row group. Smaller row groups let
+        filters skip more of the file.
+    """
+    pa, pq = _import_pyarrow()
+
+    by = [col for col in sort_columns if col in df.columns]
+    if by:
+        df = df.sort_values(by, kind='stable')
+
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    pq.write_table(table, path, row_group_size=row_group_size,
+                   use_dictionary=True, write_statistics=True)
+
+
+@profiled
+def convert_data_dir(data_dir, store_dir, row_group_size=10000):
+    """
+    Convert the HDF5 tables (.h5) and trial arrays (.npy) of a data
+    directory into a columnar store. Each key of each HDF5 file becomes a
+    Parquet file (see table_name) and each .npy file is copied as it is,
+    for memory-mapping. Tables that cannot be stored as Parquet (e.g.
+    columns holding arrays of varying types) are skipped with a warning.
+
+    Parameters
+    ----------
+    data_dir : str
+        The directory with the downloaded data files.
+    store_dir : str
+        The directory to write the store to.
+    row_group_size : int
+        The maximum number of rows per Parquet row group.
+
+    Returns
+    -------
+    converted : list of str
+        The names of the stored tables and arrays.
+    """
+    pa, _ = _import_pyarrow()
+    os.makedirs(store_dir, exist_ok=True)
+
+    converted = []
+    for h5_path in sorted(glob.glob(os.path.join(data_dir, '*.h5'))):
+        with pd.HDFStore(h5_path, mode='r') as store:
+            keys = store.keys()
+
+        for key in keys:
+            name = table_name(h5_path, key)
+            try:
+                write_table(pd.read_hdf(h5_path, key=key),
+                            os.path.join(store_dir, f'{name}.parquet'),
+                            row_group_size=row_group_size)
+                converted.append(name)
+            except (pa.ArrowException, TypeError, ValueError) as e:
+                warnings.warn(f'Could not convert {h5_path} ({key}): {e}')
+
+    for npy_path in sorted(glob.glob(os.path.join(data_dir, '*.npy'))):
+        shutil.copyfile(npy_path,
+                        os.path.join(store_dir, os.path.basename(npy_path)))
+        converted.append(os.path.splitext(os.path.basename(npy_path))[0])
+
+    return converted
+
+
+def _filter_expression(filters):
+    """
+    Convert a dictionary of column values into pyarrow filters. Scalar
+    values select equal rows and lists select rows with any of the values.
+    """
+    expression = []
+    for col, value in filters.items():
+        if isinstance(value, (list, tuple, set, np.ndarray)):
+            expression.append((col, 'in', list(value)))
+        else:
+            expression.append((col, '==', value))
+    return expression
+
+
+@profiled
+def read_table(name, store_dir, columns=None, filters=None):
+    """
+    Read a table from the store, reading only the requested columns and
+    skipping row groups that cannot match the filters.
+
+    >>> read_table('all_anatomical_info', store_dir,
+    ...            columns=['subject_electrode', 'x', 'y'],
+    ...            filters={'subject': 'EC217', 'hemisphere': 'lh',
+    ...                     'view': 'lateral'})
+
+    Parameters
+    ----------
+    name : str
+        The name of the table (see table_name).
+    store_dir : str
+        The directory of the store.
+    columns : list of str or None
+        The columns to read. None reads all columns.
+    filters : dictionary or None
+        Column values to select rows by, e.g. {'subject': 'EC217'} or
+        {'alignment': ['speech', 'pre_exec']}.
+
+    Returns
+    -------
+    df : pd.DataFrame
+        The selected rows and columns, with the original index.
+    """
+    _, pq = _import_pyarrow()
+
+    path = os.path.join(store_dir, f'{name}.parquet')
+
+    if columns is not None:
+        # Also read the stored index, so that the rows keep their labels.
+        metadata = pq.read_schema(path).pandas_metadata or {}
+        columns = list(columns) + [
+            col for col in metadata.get('index_columns', [])
+            if isinstance(col, str) and col not in columns
+        ]
+
+    table = pq.read_table(
+        path, columns=columns,
+        filters=_filter_expression(filters) if filters else None
+    )
+    return table.to_pandas()
+
+
+@profiled
+def load_array(name, store_dir, mmap=True):
+    """
+    Load a trial array from the store, memory-mapped (read-only) so that
+    only the parts indexed are read from disk.
+
+    Parameters
+    ----------
+    name : str
+        The name of the array (the .npy file name without extension).
+    store_dir : str
+        The directory of the store.
+    mmap : bool, default True
+        Whether to memory-map the array instead of reading it into memory.
+
+    Returns
+    -------
+    array : np.ndarray or np.memmap
+        The array.
+    """
+    return np.load(os.path.join(store_dir, f'{name}.npy'),
+                   mmap_mode='r' if mmap else None)
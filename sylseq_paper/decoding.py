@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+Batched cross-validated decoding over electrode groups and time windows.
+
+Every region x time window x fold is decoded with logistic regression in a
+single call. All the fits share the same fold splits, the window features
+are computed once for every electrode and sliced per region, each fold's
+standardized features are reused along the regularization path, where each
+fit warm-starts from the previous one, and the regions and windows are
+spread over a process pool. The results are tidy tables in the layout the
+notebooks read (e.g. suppfig_unique_sequence_accuracy.h5):
+
+>>> accuracy, probability = decode(trials, labels, times,
+...                                regions={'all_sig': sig_idx},
+...                                windows={'pre_execution': (-0.5, 0)},
+...                                random_seed=0, n_jobs=-1)
+>>> bacc = summarize_accuracy(accuracy).assign(subject=subject)
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import warnings
+
+# Third party libraries
+import numpy as np
+import pandas as pd
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold
+
+# Custom libraries
+from sylseq_paper.parallel import parallel_map
+from sylseq_paper.profiling import profiled
+
+
+def shared_folds(labels, n_folds=5, random_seed=None):
+    """
+    Split the trials into stratified cross-validation folds, shared by all
+    the fits of a decode call.
+
+    Parameters
+    ----------
+    labels : 1d array
+        The class of each trial.
+    n_folds : int
+        The number of folds.
+    random_seed : int or None
+        Random seed for the split.
+
+    Returns
+    -------
+    folds : list of tuples
+        The training and testing trial indices of each fold.
+    """
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True,
+                               random_state=random_seed)
+    labels = np.asarray(labels)
+    return list(splitter.split(np.zeros(len(labels)), labels))
+
+
+def window_features(trials, times, window, reduce='mean'):
+    """
+    Compute the features of a time window for every electrode.
+
+    Parameters
+    ----------
+    trials : 3d array
+        The trials, of shape (trials, time, electrodes).
+    times : 1d array
+        The time of each sample.
+    window : tuple
+        The start and stop times of the window (the stop is excluded).
+    reduce : str, default 'mean'
+        'mean' averages the window for each electrode, giving features of
+        shape (trials, electrodes, 1), and 'flatten' keeps every sample,
+        giving features of shape (trials, electrodes, samples).
+
+    Returns
+    -------
+    features : 3d array
+        The window features, of shape (trials, electrodes, features per
+        electrode).
+    """
+    in_window = (times >= window[0]) & (times < window[1])
+    block = np.asarray(trials)[:, in_window, :]
+
+    if reduce == 'mean':
+        return block.mean(axis=1)[:, :, None]
+    return np.transpose(block, (0, 2, 1))
+
+
+def _decode_block(task):
+    """
+    Decode one region and window in every fold, along the regularization
+    path.
+    """
+    (features, labels, folds, Cs, max_iter, return_proba, region,
+     window) = task
+
+    features = features.reshape(features.shape[0], -1)
+    classes = np.unique(labels)
+
+    accuracy_rows, probability_rows = [], []
+    for fold, (train, test) in enumerate(folds):
+        # Standardize once per fold and reuse along the path.
+        mean = features[train].mean(axis=0)
+        std = features[train].std(axis=0)
+        std[std == 0] = 1
+        X_train = (features[train] - mean) / std
+        X_test = (features[test] - mean) / std
+
+        model = LogisticRegression(warm_start=True, max_iter=max_iter)
+        for C in Cs:
+            model.set_params(C=C)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', ConvergenceWarning)
+                model.fit(X_train, labels[train])
+
+            accuracy_rows.append((region, window, fold, C,
+                                  model.score(X_test, labels[test])))
+
+            if return_proba:
+                proba = model.predict_proba(X_test)
+                probability_rows.append(pd.DataFrame({
+                    'area'       : region,
+                    'period'     : window,
+                    'fold'       : fold,
+                    'C'          : C,
+                    'trial'      : np.repeat(test, len(classes)),
+                    'label'      : np.repeat(labels[test], len(classes)),
+                    'class'      : np.tile(classes, len(test)),
+                    'probability': proba.ravel(),
+                }))
+
+    return accuracy_rows, probability_rows
+
+
+@profiled
+def decode(trials, labels, times, regions, windows, Cs=(1.0,), n_folds=5,
+           reduce='mean', return_proba=False, max_iter=1000,
+           random_seed=None, n_jobs=None):
+    """
+    Decode the trial labels with logistic regression from every region's
+    electrodes in every time window, in every cross-validation fold and for
+    every regularization strength.
+
+    Parameters
+    ----------
+    trials : 3d array
+        The trials, of shape (trials, time, electrodes).
+    labels : 1d array
+        The class of each trial (e.g. the phase or the sequence).
+    times : 1d array
+        The time of each sample.
+    regions : dictionary
+        The electrode indices of each region (e.g. 'all_sig' or 'mPrCG').
+    windows : dictionary
+        The start and stop times of each window (or period, e.g.
+        'pre_execution').
+    Cs : list of float
+        The inverse regularization strengths, fit from the strongest
+        regularization (smallest C) with warm starts.
+    n_folds : int
+        The number of cross-validation folds, shared by all fits.
+    reduce : str, default 'mean'
+        How the window is turned into features (see window_features).
+    return_proba : bool, default False
+        Whether to also return the predicted probabilities of every test
+        trial.
+    max_iter : int
+        The maximum number of solver iterations per fit.
+    random_seed : int or None
+        Random seed for the fold split.
+    n_jobs : int or None
+        The number of worker processes, see parallel.resolve_n_jobs.
+
+    Returns
+    -------
+    accuracy : pd.DataFrame
+        A row per region, window, fold and C with the columns area, period,
+        fold, C and accuracy.
+    probability : pd.DataFrame
+        If return_proba, a row per region, window, fold, C, test trial and
+        class with the columns area, period, fold, C, trial, label (the
+        true class), class and probability.
+    """
+    labels = np.asarray(labels)
+    times = np.asarray(times)
+    Cs = sorted(Cs)
+    folds = shared_folds(labels, n_folds=n_folds, random_seed=random_seed)
+
+    tasks = []
+    for window_name, window in windows.items():
+        # The window features of all electrodes, sliced for each region.
+        features = window_features(trials, times, window, reduce=reduce)
+        for region_name, electrodes in regions.items():
+            tasks.append((features[:, np.asarray(electrodes)], labels,
+                          folds, Cs, max_iter, return_proba, region_name,
+                          window_name))
+
+    results = parallel_map(_decode_block, tasks, n_jobs=n_jobs)
+
+    accuracy = pd.DataFrame(
+        [row for rows, _ in results for row in rows],
+        columns=['area', 'period', 'fold', 'C', 'accuracy']
+    )
+    if not return_proba:
+        return accuracy
+
+    probability = pd.concat([frame for _, frames in results
+                             for frame in frames], ignore_index=True)
+    return accuracy, probability
+
+
+def summarize_accuracy(accuracy, C=None):
+    """
+    Average the accuracies over folds, per region, window and C, in the
+    layout of suppfig_unique_sequence_accuracy.h5.
+
+    Parameters
+    ----------
+    accuracy : pd.DataFrame
+        The accuracy table from decode.
+    C : float or None
+        Keep only this regularization strength. None keeps all.
+
+    Returns
+    -------
+    summary : pd.DataFrame
+        A row per region, window and C with the columns area, period, C,
+        accuracy (the mean over folds) and accuracy_std.
+    """
+    if C is not None:
+        accuracy = accuracy.loc[accuracy.C == C]
+
+    grouped = accuracy.groupby(['area', 'period', 'C'], sort=False).accuracy
+    summary = grouped.mean().to_frame('accuracy')
+    summary['accuracy_std'] = grouped.std()
+    return summary.reset_index()
+
+
+def probability_timecourse(probability, periods, classes=None, label=None,
+                           C=None):
+    """
+    Average the predicted probability of each class over test trials, for
+    each window in order, in the layout of fig2b_decoding.pkl.
+
+    Parameters
+    ----------
+    probability : pd.DataFrame
+        The probability table from decode, for a single region.
+    periods : list
+        The windows, in time order (e.g. sliding windows over the trial).
+    classes : list or None
+        The classes, in the order of the output rows. Defaults to the
+        sorted classes.
+    label : label or None
+        Average only the trials of this true class. None averages all
+        trials.
+    C : float or None
+        Keep only this regularization strength. Defaults to the only C.
+
+    Returns
+    -------
+    timecourse : dictionary
+        tp_prob_ts_mean and tp_prob_ts_std, the mean and standard
+        deviation over trials of the probability of each class in each
+        window, of shape (classes, windows).
+    """
+    if C is not None:
+        probability = probability.loc[probability.C == C]
+    elif probability.C.nunique() > 1:
+        raise ValueError('The probabilities hold several values of C, '
+                         'select one with C.')
+    if label is not None:
+        probability = probability.loc[probability.label == label]
+
+    classes = sorted(probability['class'].unique()) if classes is None \
+        else list(classes)
+
+    grouped = probability.groupby(['class', 'period']).probability
+    mean = grouped.mean().unstack('period').reindex(index=classes,
+                                                    columns=list(periods))
+    std = grouped.std().unstack('period').reindex(index=classes,
+                                                  columns=list(periods))
+
+    return {'tp_prob_ts_mean': mean.values, 'tp_prob_ts_std': std.values}
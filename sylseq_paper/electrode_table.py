@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Indexed electrode tables.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Third party libraries
+import numpy as np
+import pandas as pd
+
+# Columns indexed by default, when present in the table.
+default_index_columns = ['subject_electrode', 'subject', 'alignment',
+                         'fancy_location', 'location', 'hemisphere', 'view',
+                         'feature_type']
+
+
+class ElectrodeTable:
+    """
+    A DataFrame of electrodes (or electrode x alignment/feature rows) with
+    precomputed indexes from the values of its key columns to their row
+    positions, replacing repeated boolean-mask scans like
+    df.loc[df.subject_electrode == se] with dictionary lookups.
+
+    >>> table = ElectrodeTable(seq_vs_syl_df)
+    >>> table.get(subject_electrode=se, feature_type='sequence')
+    >>> table.summary('fancy_location', flags=['significant'],
+    ...               alignment='target_presentation')
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The table. It should not be modified after indexing.
+    index_columns : list of str or None
+        The columns to index. Defaults to the default_index_columns present
+        in the table.
+    """
+
+    def __init__(self, df, index_columns=None):
+        self.df = df
+
+        if index_columns is None:
+            index_columns = [col for col in default_index_columns
+                             if col in df.columns]
+        self.index_columns = list(index_columns)
+
+        self.indexes = {
+            col: df.groupby(col, sort=False, dropna=False).indices
+            for col in self.index_columns
+        }
+
+    def __len__(self):
+        return self.df.shape[0]
+
+    def __repr__(self):
+        return (f'ElectrodeTable({len(self)} rows, indexed on '
+                f'{self.index_columns})')
+
+    def _column_positions(self, col, value):
+        """
+        Get the positions of the rows whose column equals the value (or any
+        of the values, for a list).
+        """
+        if isinstance(value, (list, tuple, set, np.ndarray, pd.Index)):
+            matches = [self._column_positions(col, v) for v in value]
+            return np.unique(np.concatenate(matches)) if matches else \
+                np.array([], dtype=int)
+
+        if col in self.indexes:
+            return self.indexes[col].get(value, np.array([], dtype=int))
+
+        # Fall back to a scan for columns that are not indexed.
+        return np.flatnonzero(self.df[col].values == value)
+
+    def positions(self, **criteria):
+        """
+        Get the row positions matching all the criteria.
+
+        Parameters
+        ----------
+        criteria : dictionary
+            Column values to match. A list matches any of its values.
+
+        Returns
+        -------
+        positions : 1d array of ints
+            The sorted row positions.
+        """
+        if not criteria:
+            return np.arange(len(self))
+
+        # Look up the most selective criterion, then check the others only
+        # on its rows.
+        matches = {col: self._column_positions(col, value)
+                   for col, value in criteria.items()}
+        first = min(matches, key=lambda col: len(matches[col]))
+        positions = matches[first]
+
+        for col, value in criteria.items():
+            if col == first or len(positions) == 0:
+                continue
+            values = self.df[col].values[positions]
+            if isinstance(value, (list, tuple, set, np.ndarray, pd.Index)):
+                positions = positions[np.isin(values, list(value))]
+            else:
+                positions = positions[values == value]
+
+        return positions
+
+    def get(self, **criteria):
+        """
+        Get the rows matching all the criteria, e.g.
+        get(subject_electrode=se, feature_type='sequence').
+
+        Returns
+        -------
+        df : pd.DataFrame
+            The matching rows.
+        """
+        return self.df.iloc[self.positions(**criteria)]
+
+    def groups(self, col, **criteria):
+        """
+        Iterate over the values of an indexed column and their rows, among
+        the rows matching the criteria.
+
+        Yields
+        ------
+        value
+            The column value.
+        df : pd.DataFrame
+            The rows with that value.
+        """
+        subset = self.positions(**criteria) if criteria else None
+        for value, positions in self.indexes[col].items():
+            if subset is not None:
+                positions = np.intersect1d(positions, subset,
+                                           assume_unique=True)
+                if len(positions) == 0:
+                    continue
+            yield value, self.df.iloc[positions]
+
+    def count(self, by, **criteria):
+        """
+        Count the rows for each value of one or more columns, among the rows
+        matching the criteria.
+
+        Parameters
+        ----------
+        by : str or list of str
+            The column(s) to group by.
+        criteria : dictionary
+            Column values the rows must match.
+
+        Returns
+        -------
+        counts : pd.Series
+            The number of rows per group.
+        """
+        return self.get(**criteria).groupby(by, dropna=False).size()
+
+    def summary(self, by, flags=(), **criteria):
+        """
+        Count the rows and the rows where each boolean flag column is True,
+        with their percentage, for each value of one or more columns, among
+        the rows matching the criteria. For example, the total and
+        significant electrodes per region.
+
+        Parameters
+        ----------
+        by : str or list of str
+            The column(s) to group by.
+        flags : list of str
+            Boolean columns to count and take the percentage of.
+        criteria : dictionary
+            Column values the rows must match.
+
+        Returns
+        -------
+        summary : pd.DataFrame
+            A row per group with the column total, and for each flag the
+            columns <flag> (count) and <flag>_percent.
+        """
+        df = self.get(**criteria)
+        grouped = df[list(flags)].fillna(False).astype(bool).groupby(
+            [df[col] for col in np.atleast_1d(by)], dropna=False
+        )
+
+        summary = grouped.sum()
+        summary.insert(0, 'total', grouped.size())
+        for flag in flags:
+            summary[f'{flag}_percent'] = 100 * summary[flag] / \
+                summary['total']
+
+        return summary.reset_index()
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming condition-averaged high-gamma ERPs.
+
+Trial arrays (trials x time x electrodes) are memory-mapped and read in
+chunks of trials, accumulating the per-condition count, sum and sum of
+squares of every time point and electrode with one matrix product per
+chunk, so the ERP means and SEMs of every electrode and condition come out
+of a single pass without loading the trials into memory. NaN samples are
+omitted, as with np.nanmean and stats.sem(..., nan_policy='omit').
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Third party libraries
+import numpy as np
+from scipy.ndimage import gaussian_filter1d
+
+# Custom libraries
+from sylseq_paper.profiling import profiled
+
+
+def open_trials(trials):
+    """
+    Memory-map a trial array saved as .npy (read-only), or return an array
+    as it is.
+    """
+    if isinstance(trials, str):
+        return np.load(trials, mmap_mode='r')
+    return trials
+
+
+class _ConditionSums:
+    """
+    Running per-condition counts, sums and sums of squares of trials,
+    shifted by a reference trial average to limit cancellation.
+    """
+
+    def __init__(self, n_conditions, shape):
+        self.n = np.zeros((n_conditions,) + shape)
+        self.sum = np.zeros((n_conditions,) + shape)
+        self.sum_sq = np.zeros((n_conditions,) + shape)
+        self.shift = None
+
+    def update(self, chunk, codes):
+        chunk = np.asarray(chunk, dtype=float)
+        if self.shift is None:
+            self.shift = np.nan_to_num(np.nanmean(chunk, axis=0))
+
+        chunk = chunk - self.shift
+        valid = ~np.isnan(chunk)
+        chunk = np.where(valid, chunk, 0).reshape(chunk.shape[0], -1)
+
+        # One product per statistic for all conditions at once.
+        one_hot = (codes[None, :] == np.arange(self.n.shape[0])[:, None])
+        one_hot = one_hot.astype(float)
+        shape = self.n.shape
+        self.n += (one_hot @ valid.reshape(chunk.shape)).reshape(shape)
+        self.sum += (one_hot @ chunk).reshape(shape)
+        self.sum_sq += (one_hot @ chunk ** 2).reshape(shape)
+
+    def mean(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.sum / self.n + self.shift
+
+    def sem(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            shifted_mean = self.sum / self.n
+            variance = (self.sum_sq - self.n * shifted_mean ** 2) / \
+                (self.n - 1)
+            return np.sqrt(np.clip(variance, 0, None) / self.n)
+
+
+@profiled
+def condition_erps(trials, conditions=None, sigma=None, smooth_sem=False,
+                   chunk_size=64):
+    """
+    Compute the mean, SEM and (optionally) Gaussian-smoothed mean of every
+    electrode's trials per condition, in one streaming pass over trials.
+
+    >>> erps = condition_erps('fig4_hga_schematic_trials.npy', sigma=2)
+    >>> erps = condition_erps(seq_complexity_trials[subject]['speech'])
+
+    Parameters
+    ----------
+    trials : nd-array, str or dictionary
+        The trials, of shape (trials, time, electrodes) (or (trials, time)
+        for a single electrode), as an array, a memory-map or the path to
+        a .npy file (which is memory-mapped). A dictionary of such trials
+        by condition gives the conditions directly.
+    conditions : 1d array or None
+        The condition of each trial, for a single array of trials. None
+        averages all trials together.
+    sigma : float or None
+        The standard deviation, in samples, of the Gaussian smoothing
+        (gaussian_filter1d) along time. None skips smoothing.
+    smooth_sem : bool, default False
+        Whether to also smooth the SEMs.
+    chunk_size : int
+        The number of trials read at a time.
+
+    Returns
+    -------
+    erps : dictionary
+        conditions (the condition labels), mean and sem (of shape
+        (conditions, time, electrodes)), n (the number of non-NaN trials
+        of each condition, time point and electrode) and, if sigma is
+        given, smoothed (the smoothed means).
+    """
+    if isinstance(trials, dict):
+        labels = list(trials)
+        sources = [(open_trials(trials[label]), i)
+                   for i, label in enumerate(labels)]
+    else:
+        trials = open_trials(trials)
+        if conditions is None:
+            labels, codes = [None], np.zeros(trials.shape[0], dtype=int)
+        else:
+            labels, codes = np.unique(np.asarray(conditions),
+                                      return_inverse=True)
+            labels = list(labels)
+        sources = [(trials, codes)]
+
+    sums = _ConditionSums(len(labels), sources[0][0].shape[1:])
+    for source, codes in sources:
+        for start in range(0, source.shape[0], chunk_size):
+            stop = min(start + chunk_size, source.shape[0])
+            chunk_codes = np.full(stop - start, codes) if np.isscalar(codes) \
+                else codes[start:stop]
+            sums.update(source[start:stop], chunk_codes)
+
+    erps = {
+        'conditions': labels,
+        'mean'      : sums.mean(),
+        'sem'       : sums.sem(),
+        'n'         : sums.n.astype(int),
+    }
+
+    if sigma is not None:
+        erps['smoothed'] = gaussian_filter1d(erps['mean'], sigma, axis=1)
+        if smooth_sem:
+            erps['sem'] = gaussian_filter1d(erps['sem'], sigma, axis=1)
+
+    return erps
+
+
+def plot_condition_erps(ax, times, erps, electrode=None, colors=None,
+                        labels=None, smoothed=False, **kwargs):
+    """
+    Plot the mean +/- SEM of every condition for one electrode.
+
+    Parameters
+    ----------
+    ax : matplotlib Axes
+        The axes to plot on.
+    times : 1d array
+        The time of each sample.
+    erps : dictionary
+        The condition_erps results.
+    electrode : int or None
+        The electrode to plot. None for trials without an electrode axis.
+    colors : dictionary or None
+        The color of each condition.
+    labels : dictionary or None
+        The legend label of each condition. Defaults to the conditions.
+    smoothed : bool, default False
+        Whether to plot the smoothed means.
+    kwargs : dictionary
+        The keyword arguments to pass to ax.plot.
+    """
+    means = erps['smoothed'] if smoothed else erps['mean']
+    sems = erps['sem']
+    if electrode is not None:
+        means, sems = means[..., electrode], sems[..., electrode]
+
+    for i, condition in enumerate(erps['conditions']):
+        color = None if colors is None else colors[condition]
+        label = condition if labels is None else labels[condition]
+
+        line, = ax.plot(times, means[i], color=color, label=label, **kwargs)
+        ax.fill_between(times, means[i] - sems[i], means[i] + sems[i],
+                        color=line.get_color(), alpha=0.2, ec='None')
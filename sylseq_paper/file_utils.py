@@ -6,13 +6,20 @@ File helpers. Credit cited in function documentation, otherwise written by JRL.
 :Copyright: Copyright (c) 2020, Jessie R. Liu, All rights reserved.
 """
 
+# Standard libraries
+from collections.abc import Mapping
+
 # Third party libraries
 import numpy as np
 import scipy.io as spio
 
+# Custom libraries
+from sylseq_paper.profiling import profiled
+
 
 # Excellent scipy.io.loadmat augmented function from
 # https://stackoverflow.com/questions/7008608/scipy-io-loadmat-nested-structures-i-e-dictionaries
+@profiled
 def loadmat(filename):
     '''
     this function should be called instead of direct spio.loadmat
@@ -64,3 +71,278 @@ def loadmat(filename):
 
     data = spio.loadmat(filename, struct_as_record=False, squeeze_me=True)
     return _check_keys(data)
+
+
+def _convert_mat(elem):
+    """
+    Convert a loaded MATLAB element to native Python/NumPy types without
+    copying numeric data: structs become dictionaries, cell arrays and
+    struct arrays (object ndarrays) become lists and numeric ndarrays are
+    returned as they are.
+    """
+    if isinstance(elem, spio.matlab.mat_struct):
+        return {field: _convert_mat(getattr(elem, field))
+                for field in elem._fieldnames}
+    elif isinstance(elem, np.ndarray) and elem.dtype == object:
+        return [_convert_mat(sub_elem) for sub_elem in elem]
+    return elem
+
+
+def _get_path(data, path):
+    """
+    Get the element at a dot-separated struct path (e.g. 'stats.pvals')
+    from nested dictionaries or mappings.
+    """
+    for field in path.split('.'):
+        data = data[field]
+    return data
+
+
+def is_hdf5_mat(filename):
+    """
+    Whether a .mat file is a v7.3 (HDF5-based) file.
+    """
+    with open(filename, 'rb') as f:
+        major, _ = spio.matlab.matfile_version(f)
+    return major == 2
+
+
+@profiled
+def loadmat_fast(filename, variable_names=None, paths=None):
+    """
+    Load a .mat file into nested dictionaries like loadmat, but keep numeric
+    arrays as the ndarrays read from the file (no per-element conversion
+    or copies) and optionally load only selected variables or struct
+    paths. Cell arrays and struct arrays become lists.
+
+    Both v5/v7 files (through scipy) and v7.3 HDF5-based files (through
+    h5py) are supported. For v7.3 files only the requested datasets are
+    read from disk, while for v5/v7 files the requested top-level
+    variables are read completely. See open_mat_hdf5 to slice v7.3 arrays
+    without reading them fully.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the .mat file.
+    variable_names : list of str or None
+        The top-level variables to load. None loads all of them.
+    paths : list of str or None
+        Dot-separated struct paths to load (e.g. 'results.stats.pvals'),
+        instead of complete variables. The returned dictionary is keyed by
+        path.
+
+    Returns
+    -------
+    data : dictionary
+        The loaded variables (or paths).
+    """
+    if paths is not None:
+        variable_names = sorted({path.split('.')[0] for path in paths})
+
+    if is_hdf5_mat(filename):
+        with open_mat_hdf5(filename) as mat:
+            if paths is not None:
+                return {path: _read_hdf5(_get_path(mat, path))
+                        for path in paths}
+            names = mat.keys() if variable_names is None else variable_names
+            return {name: _read_hdf5(mat[name]) for name in names}
+
+    data = spio.loadmat(filename, variable_names=variable_names,
+                        struct_as_record=False, squeeze_me=True)
+    data = {key: _convert_mat(val) for key, val in data.items()
+            if not key.startswith('__')}
+
+    if paths is not None:
+        return {path: _get_path(data, path) for path in paths}
+    return data
+
+
+class LazyMatArray:
+    """
+    A numeric array in a v7.3 .mat file, read from disk only when indexed.
+    Indexing follows the MATLAB dimension order (like scipy's loadmat),
+    although HDF5 stores the array transposed.
+
+    Parameters
+    ----------
+    dataset : h5py.Dataset
+        The dataset holding the array.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.matlab_class = _matlab_class(dataset)
+
+    @property
+    def shape(self):
+        return self.dataset.shape[::-1]
+
+    @property
+    def ndim(self):
+        return self.dataset.ndim
+
+    @property
+    def dtype(self):
+        return bool if self.matlab_class == 'logical' else self.dataset.dtype
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        key = key + (slice(None),) * (self.ndim - len(key))
+
+        data = np.asarray(self.dataset[key[::-1]]).T
+        return data.astype(bool) if self.matlab_class == 'logical' else data
+
+    def __array__(self, dtype=None):
+        data = self[()]
+        return data if dtype is None else data.astype(dtype)
+
+    def __repr__(self):
+        return f'LazyMatArray(shape={self.shape}, class={self.matlab_class})'
+
+
+class MatStructHDF5(Mapping):
+    """
+    A struct (or the file root) of a v7.3 .mat file, as a read-only mapping
+    from field names to lazily read elements: nested structs are
+    MatStructHDF5, numeric arrays are LazyMatArray, and strings and cell
+    arrays are read when accessed.
+
+    Parameters
+    ----------
+    group : h5py.Group
+        The group holding the struct.
+    """
+
+    def __init__(self, group):
+        self.group = group
+
+    def __getitem__(self, key):
+        return _lazy_hdf5(self.group[key])
+
+    def __iter__(self):
+        return (key for key in self.group if not key.startswith('#'))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f'MatStructHDF5(fields={list(self)})'
+
+
+class MatFileHDF5(MatStructHDF5):
+    """
+    An open v7.3 (HDF5-based) .mat file, as a mapping from variable names
+    to lazily read elements (see MatStructHDF5). Close it when done, or use
+    it as a context manager.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the .mat file.
+    """
+
+    def __init__(self, filename):
+        try:
+            import h5py
+        except ImportError:
+            raise ImportError('Reading v7.3 .mat files requires h5py (pip '
+                              'install h5py).')
+
+        self.file = h5py.File(filename, 'r')
+        super().__init__(self.file)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def open_mat_hdf5(filename):
+    """
+    Open a v7.3 (HDF5-based) .mat file for lazy, partial reads. Numeric
+    arrays are only read when indexed:
+
+    >>> with open_mat_hdf5('results.mat') as mat:
+    ...     first_trials = mat['hga'][:10]
+    ...     pvals = mat['stats']['pvals'][()]
+
+    Parameters
+    ----------
+    filename : str
+        Path to the .mat file.
+
+    Returns
+    -------
+    mat : MatFileHDF5
+        The open file.
+    """
+    return MatFileHDF5(filename)
+
+
+def _matlab_class(obj):
+    """
+    Get the MATLAB class stored in the attributes of an HDF5 object.
+    """
+    matlab_class = obj.attrs.get('MATLAB_class', b'')
+    if isinstance(matlab_class, bytes):
+        matlab_class = matlab_class.decode()
+    return matlab_class
+
+
+def _lazy_hdf5(obj):
+    """
+    Wrap an HDF5 object of a v7.3 .mat file: groups as MatStructHDF5,
+    numeric datasets as LazyMatArray, and strings, cell arrays and empty
+    arrays read directly.
+    """
+    if hasattr(obj, 'keys'):
+        return MatStructHDF5(obj)
+    elif _matlab_class(obj) in ['char', 'cell'] or obj.dtype.kind == 'O' \
+            or obj.attrs.get('MATLAB_empty', 0):
+        return _read_dataset(obj)
+    return LazyMatArray(obj)
+
+
+def _read_dataset(dataset):
+    """
+    Read a dataset of a v7.3 .mat file into native Python/NumPy types,
+    squeezed like loadmat.
+    """
+    matlab_class = _matlab_class(dataset)
+    if dataset.attrs.get('MATLAB_empty', 0):
+        return '' if matlab_class == 'char' else np.array([])
+
+    data = dataset[()]
+    if dataset.dtype.kind == 'O':
+        # Cell arrays hold references to their elements.
+        return [_read_hdf5(_lazy_hdf5(dataset.file[ref]))
+                for ref in data.T.ravel()]
+
+    data = data.T
+    if matlab_class == 'char':
+        return ''.join(map(chr, data.ravel()))
+    elif matlab_class == 'logical':
+        data = data.astype(bool)
+
+    data = data.squeeze()
+    return data[()] if data.ndim == 0 else data
+
+
+def _read_hdf5(elem):
+    """
+    Fully read a lazily wrapped element of a v7.3 .mat file.
+    """
+    if isinstance(elem, Mapping):
+        return {key: _read_hdf5(elem[key]) for key in elem}
+    elif isinstance(elem, LazyMatArray):
+        return _read_dataset(elem.dataset)
+    return elem
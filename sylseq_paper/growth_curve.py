@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+"""
+Growth curves of decoding accuracy against the number of electrodes.
+
+For each group of electrodes (e.g. sustained electrodes, or those of a
+region) and each number of electrodes, many random subsets of the group
+are decoded with cross-validation. The cross-validation folds are prepared
+once (split and standardized on the training trials) and saved as .npy
+files that every worker memory-maps, and each (group, size) result is
+written as soon as it is computed, so an interrupted run resumes where it
+stopped. The results are assembled into the gc_data structure plotted by
+the Figure 2 growth_curve panel:
+
+>>> gc_data = growth_curves(features, labels,
+...                         groups={'Sustained': sustained_idx,
+...                                 'Non-sustained': non_sustained_idx},
+...                         out_dir='growth_curves', random_seed=0,
+...                         n_jobs=-1)
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+# Third party libraries
+import numpy as np
+from sklearn.base import clone
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
+from sklearn.model_selection import StratifiedKFold
+
+# Custom libraries
+from sylseq_paper.parallel import parallel_map
+from sylseq_paper.profiling import profiled
+
+# The numbers of electrodes sampled (capped at the size of each group).
+default_sizes = [1, 2, 5, 10, 20, 40, 80, 160, 320]
+
+# The gc_data keys of the bootstrapped mean accuracies compared in the
+# growth_curve panel, and the groups they come from.
+draw_mean_keys = {
+    'c_rate_iter_draw_mean_sus'   : 'Sustained',
+    'c_rate_iter_draw_mean_nonsus': 'Non-sustained'
+}
+
+fold_arrays = ['X_train', 'X_test', 'y_train', 'y_test']
+
+
+def default_classifier():
+    """
+    The default classifier, a shrinkage LDA.
+    """
+    return LinearDiscriminantAnalysis(solver='lsqr', shrinkage='auto')
+
+
+def _atomic_save(path, array):
+    """
+    Save an array to a .npy file through a temporary file, so that an
+    interrupted write never leaves a partial result.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                    suffix='.tmp.npy')
+    with os.fdopen(fd, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def prepare_folds(features, labels, fold_dir, n_folds=5, random_seed=None,
+                  standardize=True):
+    """
+    Split the trials into stratified cross-validation folds and save each
+    fold's training and testing features, standardized with the training
+    trials' mean and standard deviation, for memory-mapping.
+
+    Parameters
+    ----------
+    features : nd-array
+        The features, of shape (trials, electrodes) or (trials, electrodes,
+        features per electrode).
+    labels : 1d array
+        The class of each trial.
+    fold_dir : str
+        The directory to save the folds to.
+    n_folds : int
+        The number of folds.
+    random_seed : int, np.random.SeedSequence or None
+        Random seed for the split.
+    standardize : bool, default True
+        Whether to standardize the features.
+
+    Returns
+    -------
+    fold_paths : list of dictionaries
+        For each fold, the path of each of its arrays (X_train, X_test,
+        y_train and y_test).
+    """
+    os.makedirs(fold_dir, exist_ok=True)
+    features = np.asarray(features, dtype=float)
+    if features.ndim == 2:
+        features = features[:, :, None]
+    labels = np.asarray(labels)
+
+    seed = np.random.default_rng(random_seed).integers(2 ** 31)
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True,
+                               random_state=seed)
+
+    fold_paths = []
+    for k, (train, test) in enumerate(splitter.split(features[:, 0, 0],
+                                                     labels)):
+        X_train, X_test = features[train], features[test]
+        if standardize:
+            mean = X_train.mean(axis=0)
+            std = X_train.std(axis=0)
+            std[std == 0] = 1
+            X_train = (X_train - mean) / std
+            X_test = (X_test - mean) / std
+
+        arrays = dict(X_train=X_train, X_test=X_test, y_train=labels[train],
+                      y_test=labels[test])
+        paths = {name: os.path.join(fold_dir, f'fold{k}_{name}.npy')
+                 for name in fold_arrays}
+        for name in fold_arrays:
+            _atomic_save(paths[name], arrays[name])
+        fold_paths.append(paths)
+
+    return fold_paths
+
+
+def subset_accuracy(folds, channels, classifier):
+    """
+    Compute the cross-validated accuracy of decoding from a subset of
+    electrodes.
+
+    Parameters
+    ----------
+    folds : list of dictionaries
+        The arrays of each fold (see prepare_folds).
+    channels : 1d array of ints
+        The electrodes to decode from.
+    classifier : sklearn estimator
+        The classifier, cloned for every fold.
+
+    Returns
+    -------
+    accuracy : float
+        The accuracy, averaged over folds.
+    """
+    accuracies = []
+    for fold in folds:
+        X_train = fold['X_train'][:, channels].reshape(
+            fold['X_train'].shape[0], -1
+        )
+        X_test = fold['X_test'][:, channels].reshape(
+            fold['X_test'].shape[0], -1
+        )
+        model = clone(classifier).fit(X_train, fold['y_train'])
+        accuracies.append(model.score(X_test, fold['y_test']))
+    return np.mean(accuracies)
+
+
+def _growth_curve_block(task):
+    """
+    Decode n_iter random subsets of a group's electrodes of one size, and
+    save the accuracies.
+    """
+    fold_paths, channels, size, n_iter, seed, classifier, out_path = task
+
+    folds = [{name: np.load(path, mmap_mode='r')
+              for name, path in paths.items()} for paths in fold_paths]
+    rng = np.random.default_rng(seed)
+
+    # Every subset of the full group is the same, so decode it once.
+    if size >= len(channels):
+        accuracies = np.full(n_iter, subset_accuracy(folds, channels,
+                                                     classifier))
+    else:
+        accuracies = np.array([
+            subset_accuracy(folds,
+                            np.sort(rng.choice(channels, size=size,
+                                               replace=False)),
+                            classifier)
+            for _ in range(n_iter)
+        ])
+
+    _atomic_save(out_path, accuracies)
+    return accuracies
+
+
+def _features_hash(features, labels):
+    """
+    Hash the features and labels, to check that a resumed run uses the same
+    data.
+    """
+    sha = hashlib.sha256(np.ascontiguousarray(features).tobytes())
+    sha.update(np.asarray(labels).astype(str).tobytes())
+    return sha.hexdigest()
+
+
+def _draw_means(accuracies, n_draws, rng):
+    """
+    Bootstrap the mean accuracy over iterations, for each size.
+
+    Parameters
+    ----------
+    accuracies : 2d array
+        The accuracies, of shape (sizes, iterations).
+
+    Returns
+    -------
+    draw_means : 2d array
+        The bootstrapped means, of shape (n_draws, sizes).
+    """
+    n_iter = accuracies.shape[1]
+    idx = rng.integers(0, n_iter, size=(n_draws, n_iter))
+    return accuracies[:, idx].mean(axis=2).T
+
+
+@profiled
+def growth_curves(features, labels, groups, sizes=None, n_iter=100,
+                  n_folds=5, classifier=None, out_dir=None, n_draws=1000,
+                  reference=None, random_seed=None, n_jobs=None, log=print):
+    """
+    Compute decoding accuracy growth curves: for each group of electrodes
+    and each number of electrodes, the cross-validated accuracy of n_iter
+    random subsets of the group.
+
+    With an out_dir, the folds and each (group, size) result are saved
+    there as they are computed, and running again with the same arguments
+    only computes the missing results.
+
+    Parameters
+    ----------
+    features : nd-array
+        The features, of shape (trials, electrodes) or (trials, electrodes,
+        features per electrode).
+    labels : 1d array
+        The class of each trial.
+    groups : dictionary
+        The electrode indices (into the features' electrode axis) of each
+        group, by group label (e.g. 'Sustained (mPrCG)').
+    sizes : list of int or None
+        The numbers of electrodes to sample, capped at each group's size.
+        Defaults to default_sizes.
+    n_iter : int
+        The number of random subsets per group and size.
+    n_folds : int
+        The number of cross-validation folds.
+    classifier : sklearn estimator or None
+        The classifier. Defaults to default_classifier().
+    out_dir : str or None
+        The directory to save the folds and results to, and resume from.
+        None uses a temporary directory.
+    n_draws : int
+        The number of bootstrapped mean accuracies per group and size.
+    reference : str or None
+        The group the accuracy_ratio is relative to. Defaults to the first
+        group.
+    random_seed : int or None
+        Random seed for reproducibility.
+    n_jobs : int or None
+        The number of worker processes, see parallel.resolve_n_jobs.
+    log : function
+        Called with progress messages.
+
+    Returns
+    -------
+    gc_data : dictionary
+        The growth curves, with a row per group:
+
+        legend_str : 1d array
+            The group labels.
+        N_ch_actual : 2d array
+            The number of electrodes of each size, of shape (groups,
+            sizes).
+        c_rate_iter : 3d array
+            The accuracy of each subset, of shape (groups, sizes, n_iter).
+        c_rate_iter_mean, c_rate_iter_std : 2d arrays
+            The mean and standard deviation over subsets.
+        c_rate_iter_draw_mean : 3d array
+            The bootstrapped mean accuracies, of shape (groups, n_draws,
+            sizes), also under the keys of draw_mean_keys for their groups.
+        accuracy_ratio : 1d array
+            The mean accuracy of each group with all its electrodes, relative
+            to the reference group's accuracy with the same number of
+            electrodes.
+    """
+    if out_dir is None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            return growth_curves(features, labels, groups, sizes=sizes,
+                                 n_iter=n_iter, n_folds=n_folds,
+                                 classifier=classifier, out_dir=tmp_dir,
+                                 n_draws=n_draws, reference=reference,
+                                 random_seed=random_seed, n_jobs=n_jobs,
+                                 log=log)
+
+    sizes = default_sizes if sizes is None else list(sizes)
+    classifier = default_classifier() if classifier is None else classifier
+    group_labels = list(groups)
+    group_channels = [np.asarray(groups[label]) for label in group_labels]
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Check that a resumed run has the same configuration.
+    config = {
+        'features'  : _features_hash(features, labels),
+        'groups'    : {label: [int(c) for c in channels]
+                       for label, channels in zip(group_labels,
+                                                  group_channels)},
+        'sizes'     : [int(s) for s in sizes],
+        'n_iter'    : n_iter,
+        'n_folds'   : n_folds,
+        'classifier': repr(classifier),
+        'entropy'   : np.random.SeedSequence(random_seed).entropy,
+    }
+    config_path = os.path.join(out_dir, 'config.json')
+    if os.path.exists(config_path):
+        with open(config_path) as f:
+            saved = json.load(f)
+        if random_seed is None:
+            config['entropy'] = saved['entropy']
+        if saved != config:
+            raise ValueError(f'{out_dir} holds results of a different '
+                             f'configuration, use another out_dir.')
+    else:
+        with open(config_path, 'w') as f:
+            json.dump(config, f, indent=2)
+
+    seeds = np.random.SeedSequence(config['entropy']).spawn(
+        2 + len(group_labels) * len(sizes)
+    )
+
+    fold_dir = os.path.join(out_dir, 'folds')
+    fold_paths = [{name: os.path.join(fold_dir, f'fold{k}_{name}.npy')
+                   for name in fold_arrays} for k in range(n_folds)]
+    if not all(os.path.exists(path) for paths in fold_paths
+               for path in paths.values()):
+        fold_paths = prepare_folds(features, labels, fold_dir,
+                                   n_folds=n_folds, random_seed=seeds[0])
+
+    # Collect the (group, size) blocks that are not computed yet.
+    result_paths = {}
+    tasks = []
+    for g, channels in enumerate(group_channels):
+        for s, size in enumerate(sizes):
+            path = os.path.join(out_dir, f'group{g}_size{s}.npy')
+            result_paths[g, s] = path
+            if not os.path.exists(path):
+                tasks.append((fold_paths, channels, size, n_iter,
+                              seeds[2 + g * len(sizes) + s], classifier,
+                              path))
+
+    log(f'{len(result_paths) - len(tasks)} of {len(result_paths)} growth '
+        f'curve points already computed.')
+    parallel_map(_growth_curve_block, tasks, n_jobs=n_jobs)
+
+    accuracies = np.stack([
+        np.stack([np.load(result_paths[g, s]) for s in range(len(sizes))])
+        for g in range(len(group_labels))
+    ])
+
+    rng = np.random.default_rng(seeds[1])
+    n_ch_actual = np.array([np.minimum(sizes, len(channels))
+                            for channels in group_channels])
+    gc_data = {
+        'legend_str'           : np.array(group_labels, dtype=object),
+        'N_ch_actual'          : n_ch_actual,
+        'c_rate_iter'          : accuracies,
+        'c_rate_iter_mean'     : accuracies.mean(axis=2),
+        'c_rate_iter_std'      : accuracies.std(axis=2),
+        'c_rate_iter_draw_mean': np.stack([_draw_means(acc, n_draws, rng)
+                                           for acc in accuracies]),
+    }
+
+    for key, label in draw_mean_keys.items():
+        if label in group_labels:
+            gc_data[key] = gc_data['c_rate_iter_draw_mean'][
+                group_labels.index(label)]
+
+    # Accuracy with all of each group's electrodes, relative to the
+    # reference group with as many electrodes.
+    ref = 0 if reference is None else group_labels.index(reference)
+    ratios = []
+    for g, channels in enumerate(group_channels):
+        s = int(np.argmax(n_ch_actual[g]))
+        ratios.append(gc_data['c_rate_iter_mean'][g, s] /
+                      np.interp(n_ch_actual[g, s], n_ch_actual[ref],
+                                gc_data['c_rate_iter_mean'][ref]))
+    gc_data['accuracy_ratio'] = np.array(ratios)
+
+    return gc_data
+
+
+def save_gc_data(gc_data, filename):
+    """
+    Save the growth curves as a pickle, like fig2_growth_curve_data.pkl.
+    """
+    with open(filename, 'wb') as f:
+        pickle.dump(gc_data, f)
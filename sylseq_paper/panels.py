@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+"""
+Figure panels registered for headless builds (see sylseq_paper.build), which
+sylseq-build builds by default:
+
+    sylseq-build --data-dir data --img-dir imaging --out-dir build
+
+Panels reading brain images take them from img_dir (the imaging directory of
+this repository by default), which is not part of their build signature.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import os
+import pickle
+
+# Third party libraries
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from mpl_toolkits.axes_grid1 import make_axes_locatable
+
+# Custom libraries
+from sylseq_paper.assets import AssetCache
+from sylseq_paper.build import panel
+from sylseq_paper.electrode_table import ElectrodeTable
+from sylseq_paper.file_utils import loadmat_fast
+from sylseq_paper.plotting import default_plot_settings, \
+    fancy_location_colors, raster_image, rename_df_areas, \
+    smoothed_weighted_histograms, ucsf_sequential_color_palette as colors
+from sylseq_paper.statistics import fdr_omitnans, p_value_calc
+from sylseq_paper.stimulation_info import stim_site_coordinates
+
+sig_thresh = 0.05
+
+growth_curve_groups = {
+    'Sustained'        : ('o', colors[5]),
+    'Non-sustained'    : ('^', colors[7]),
+    'Sustained (mPrCG)': ('s', fancy_location_colors['middle PrCG']),
+    'Sustained (IFG)'  : ('v', fancy_location_colors['Pars operc.']),
+}
+
+
+def load_growth_curve_data(data_dir):
+    """
+    Load the Figure 2 growth curve results (fig2_growth_curve_data.pkl).
+    """
+    with open(os.path.join(data_dir, 'fig2_growth_curve_data.pkl'),
+              'rb') as f:
+        return pickle.load(f)
+
+
+def plot_growth_curve(ax, gc_data, ms=5, sig_fs=15, legend_fs=10):
+    """
+    Plot the decoding accuracy against the number of electrodes for the
+    sustained and non-sustained groups, marking the sizes at which the
+    sustained electrodes decode better (FDR corrected).
+
+    Parameters
+    ----------
+    ax : matplotlib Axes
+        The axes to plot on.
+    gc_data : dictionary
+        The growth curve results (see growth_curve.save_gc_data).
+    ms : float
+        The marker size.
+    sig_fs : float
+        The font size of the significance markers.
+    legend_fs : float
+        The font size of the tick labels and legend.
+
+    Returns
+    -------
+    fdr_pvals : 1d array
+        The FDR corrected p-values of each size.
+    """
+    legend_str = np.asarray(gc_data['legend_str'])
+    for group_label, (marker, color) in growth_curve_groups.items():
+        i = np.where(legend_str == group_label)[0][0]
+
+        x = gc_data['N_ch_actual'][i]
+        y = gc_data['c_rate_iter_mean'][i]
+        err = gc_data['c_rate_iter_std'][i]
+
+        ax.semilogx(x, y, marker=marker, color=color, ms=ms,
+                    label=group_label, clip_on=False, alpha=0.7)
+        ax.errorbar(x, y, err, color=color, clip_on=False, alpha=0.7)
+
+    differences = gc_data['c_rate_iter_draw_mean_sus'] - \
+        gc_data['c_rate_iter_draw_mean_nonsus']
+    pvals = np.array([p_value_calc(differences[:, i], test_statistic=0)
+                      for i in range(differences.shape[1])])
+    fdr_pvals = fdr_omitnans(pvals, alpha=sig_thresh, method='poscorr',
+                             is_sorted=False)
+
+    for x, sig in zip(gc_data['N_ch_actual'][0], fdr_pvals):
+        if sig < sig_thresh:
+            ax.annotate('*', (x, 1), ha='center', va='bottom',
+                        fontsize=sig_fs)
+
+    sns.despine(ax=ax, offset=dict(left=5, bottom=5))
+
+    xticks = [1, 2, 5, 10, 20, 40, 80, 160, 320, 901]
+    yticks = [0.25, 0.50, 0.75, 1.00]
+    ax.set(xticks=xticks, xlim=(1, 901), ylim=(0.25, 1.0), yticks=yticks,
+           ylabel='Accuracy', xlabel='Number of electrodes')
+    ax.set_xticklabels(xticks, fontsize=legend_fs)
+    ax.set_yticklabels([f'{l:0.2f}' for l in yticks], fontsize=legend_fs)
+
+    ax.legend(loc='lower right', bbox_to_anchor=(1.03, -0.05),
+              frameon=False, fontsize=legend_fs)
+
+    return fdr_pvals
+
+
+@panel(inputs=['fig2_growth_curve_data.pkl'])
+def fig2_growth_curve(data_dir):
+    """
+    Figure 2 growth curve panel.
+    """
+    default_plot_settings(fontsize=12)
+
+    fig, ax = plt.subplots(figsize=(5, 4))
+    plot_growth_curve(ax, load_growth_curve_data(data_dir))
+    return fig
+
+
+# Figure 1 rasters: the trial average alignment, the rows it is drawn for and
+# the window of each column.
+raster_columns = [
+    ('target_presentation_delay', 'target_presentation', [-0.5, 3.25]),
+    ('go_cue', 'pre_exec', [-0.25, 0.25]),
+    ('pre_exec_speech', 'pre_exec', [-0.5, 2.0]),
+]
+
+raster_time_periods = {
+    'target_presentation_delay': 'visual pres.',
+    'go_cue'                   : 'go-cue',
+    'pre_exec_speech'          : 'speech onset',
+}
+
+raster_xticks = {
+    'target_presentation_delay': np.arange(-0.5, 3.3, 0.25),
+    'go_cue'                   : np.array([-0.25, 0.0, 0.25]),
+    'pre_exec_speech'          : np.arange(-0.5, 2.1, 0.25),
+}
+
+raster_sr = 100
+
+
+def load_raster_data(data_dir):
+    """
+    Load the Figure 1 raster data: the electrodes significant above
+    baseline, sorted by area, NMF cluster weight and reaction time, with
+    the total electrodes per area and the trial averages.
+
+    Returns
+    -------
+    data : dictionary
+        The keys ndf (the sorted significant electrode x alignment rows,
+        with the columns cluster_label and cluster_weight), totals (the
+        number of electrodes per fancy_location) and trial_avgs (the trial
+        averages, by alignment and subject).
+    """
+    with open(os.path.join(data_dir, 'fig1_ndf_sustained_se.pkl'), 'rb') as f:
+        neural_df = rename_df_areas(pickle.load(f)['neural_df'])
+    with open(os.path.join(data_dir, 'fig1_trial_averages.pkl'), 'rb') as f:
+        trial_avgs = pickle.load(f)
+    clusters = loadmat_fast(os.path.join(data_dir, 'fig1_nmf_clustering.mat'),
+                            variable_names=['nmf_weights', 'clustered_se'])
+
+    totals = ElectrodeTable(neural_df).summary(
+        'fancy_location', alignment='target_presentation'
+    ).set_index('fancy_location').total
+
+    # Each clustered electrode's weight in its (largest) cluster. The other
+    # electrodes sort after them.
+    nmf_weights = np.asarray(clusters['nmf_weights'])
+    cluster_weight = pd.Series(nmf_weights.max(axis=-1),
+                               index=np.asarray(clusters['clustered_se']))
+
+    ndf = neural_df.loc[neural_df.significant_above_baseline_anytime.astype(
+        bool)].copy()
+    is_clustered = ndf.subject_electrode.isin(cluster_weight.index).values
+    ndf['cluster_label'] = np.where(is_clustered, 'clustered', 'none')
+    ndf['cluster_weight'] = cluster_weight.reindex(
+        ndf.subject_electrode.values).fillna(-15).values
+
+    # Areas with the most clustered electrodes first, then the others.
+    electrode_areas = neural_df.drop_duplicates('subject_electrode') \
+        .set_index('subject_electrode').fancy_location.astype(object)
+    cluster_counts = electrode_areas.reindex(cluster_weight.index) \
+        .value_counts().sort_index().sort_values(ascending=False,
+                                                 kind='stable')
+    areas = list(cluster_counts.index) + sorted(
+        set(ndf.fancy_location.astype(object)) - set(cluster_counts.index)
+    )
+    ndf['fancy_location'] = pd.Categorical(
+        ndf.fancy_location.astype(object), categories=areas
+    )
+
+    ndf = ndf.sort_values(
+        ['fancy_location', 'cluster_weight', 'pre_exec_speech_reaction_time'],
+        ascending=[True, False, True], kind='stable'
+    )
+    return dict(ndf=ndf, totals=totals, trial_avgs=trial_avgs)
+
+
+def plot_area_rasters(axs, col, df, trial_avgs, alignment, window, totals,
+                      sr=raster_sr, plot_cluster_labels=False, fs=10, s=10):
+    """
+    Plot the trial averages of the electrodes of each area as a raster, an
+    area per row of axes, in the order of the rows of df.
+
+    Parameters
+    ----------
+    axs : 2d array of matplotlib Axes
+        The axes, a row per area (in the order of the fancy_location
+        categories) and a column per alignment.
+    col : int
+        The column of axes to plot on.
+    df : pd.DataFrame
+        The electrodes, sorted, with the columns subject, electrode,
+        fancy_location and cluster_label.
+    trial_avgs : dictionary
+        The trial averages, by alignment and subject, of shape (time,
+        electrodes).
+    alignment : str
+        The alignment of the trial averages.
+    window : list of float
+        The time window of the trial averages, in seconds.
+    totals : pd.Series
+        The number of electrodes of each area, for the row labels.
+    sr : float
+        The sampling rate of the trial averages.
+    plot_cluster_labels : bool, default False
+        Whether to mark the clustered electrodes to the right.
+    fs : float
+        The font size.
+    s : float
+        The marker size of the cluster marks.
+    """
+    x = np.linspace(window[0], window[1], int(np.abs(window).sum() * sr))
+    areas = list(df.fancy_location.cat.categories)
+
+    for area, area_df in df.groupby('fancy_location', sort=False):
+        if area_df.shape[0] == 0:
+            continue
+        ax = axs[areas.index(area), col]
+
+        rows = np.stack([trial_avgs[alignment][subject][:, electrode]
+                         for subject, electrode in
+                         zip(area_df.subject.values,
+                             area_df.electrode.values)])
+        cmap = mpl.colors.LinearSegmentedColormap.from_list(
+            area, ['white', fancy_location_colors[area]]
+        )
+        raster_image(ax, np.flipud(rows), x=x, vmin=0, vmax=0.75, cmap=cmap)
+
+        for spine in ax.spines.values():
+            spine.set_visible(True)
+        ax.set(yticks=[], xticks=[])
+
+        if col == 0:
+            n = rows.shape[0]
+            sep = ' ' if n < 35 else '\n'
+            ax.set_ylabel(f'{area}{sep}(n={n}/{totals[area]})', rotation=0,
+                          ha='right', va='center', fontsize=fs)
+
+        if plot_cluster_labels:
+            cax = make_axes_locatable(ax).append_axes('right', size='3%',
+                                                      pad='1%')
+            cax.axis('off')
+            cax.set(ylim=(0, rows.shape[0]))
+            clustered = np.flatnonzero(
+                np.flip(area_df.cluster_label.values) != 'none'
+            )
+            cax.scatter(np.full(len(clustered), 0.5), clustered, color='k',
+                        clip_on=False, s=s)
+
+
+@panel(inputs=['fig1_ndf_sustained_se.pkl', 'fig1_trial_averages.pkl',
+               'fig1_nmf_clustering.mat'])
+def figure1_full_rasters(data_dir):
+    """
+    Figure 1 rasters of the trial averages of every significant electrode,
+    by area, aligned to the visual presentation, the go-cue and the speech
+    onset, with the clustered electrodes marked.
+    """
+    default_plot_settings(fontsize=16)
+    data = load_raster_data(data_dir)
+    ndf = data['ndf']
+
+    counts = ndf.loc[ndf.alignment == 'target_presentation'] \
+        .fancy_location.value_counts(sort=False).values
+    fig, axs = plt.subplots(
+        len(counts), len(raster_columns), figsize=(16, 20), squeeze=False,
+        gridspec_kw={'height_ratios': np.maximum(counts, 1), 'wspace': 0.1,
+                     'width_ratios': [1.5, 0.5, 1.5]}
+    )
+
+    for col, (alignment, rows, window) in enumerate(raster_columns):
+        plot_area_rasters(axs, col, ndf.loc[ndf.alignment == rows],
+                          data['trial_avgs'], alignment, window,
+                          data['totals'],
+                          plot_cluster_labels=col == len(raster_columns) - 1)
+
+        xticks = raster_xticks[alignment]
+        for ax in axs[:, col]:
+            ax.axvline(x=0, color='k', alpha=0.75)
+            if alignment == 'target_presentation_delay':
+                ax.axvline(x=2.5, color='k', alpha=0.75)
+            ax.tick_params(axis='x', direction='in')
+            ax.set(xticks=xticks, xticklabels=[])
+
+        labels = xticks if len(xticks) <= 3 else \
+            [tick if i % 2 == 0 else '' for i, tick in enumerate(xticks)]
+        axs[-1, col].set(
+            xticklabels=labels,
+            xlabel=f'Time from\n{raster_time_periods[alignment]} (s)'
+        )
+
+    for ax in axs.ravel():
+        ax.tick_params(axis='both', labelsize=10)
+
+    return fig
+
+
+# Figure 5 stimulation sites.
+stim_subjects = {
+    'EC260': ('^', 0.5),
+    'EC267': ('o', 0.5),
+    'EC276': ('D', 0.4),
+    'EC282': ('*', 1.0),
+    'EC289': ('v', 0.5),
+}
+
+
+def stim_site_categories(sites):
+    """
+    Categorize stimulation sites by their effect: 'sequencing' (consistent
+    sequencing errors without motor effects), 'other' (motor effects at
+    this or higher amplitudes, or other sensory or perceptual effects),
+    'none' (no effects) or None (inconsistent effects, not plotted).
+
+    Parameters
+    ----------
+    sites : pd.DataFrame
+        The sites, from stimulation_info.stim_site_table.
+
+    Returns
+    -------
+    categories : 1d array of objects
+        The category of each site.
+    """
+    seq = sites.seq_deficit.values.astype(bool)
+    inconsistent = sites.inconsistent_seq_deficit.values.astype(bool)
+    motor = sites.motor_deficit.values.astype(bool)
+    other = sites.higher_amp_motor_deficit.eq(True).values | \
+        sites.other_deficit.notna().values
+
+    categories = np.full(len(sites), None, dtype=object)
+    no_seq = ~seq & ~inconsistent
+    categories[no_seq] = np.where(motor | other, 'other', 'none')[no_seq]
+    categories[seq & ~inconsistent & ~motor] = 'sequencing'
+    return categories
+
+
+def overlap_density(overlap, img_shape, bins=100, smooth=2):
+    """
+    The summed smoothed densities of the sequence and reaction time
+    electrodes (each normalized by the density of all electrodes and to sum
+    to 1), scaled to a maximum of 1.
+
+    Returns
+    -------
+    density : 2d array
+        The density, of shape (bins, bins).
+    xedges, yedges : 1d arrays
+        The bin edges.
+    """
+    df = overlap['cur_df']
+    weights = np.stack([overlap['in_seq'], overlap['in_rt']]).astype(float)
+    ims, xedges, yedges = smoothed_weighted_histograms(
+        weights, x=df.x.values, y=df.y.values, xlim=[0, img_shape[1]],
+        ylim=[0, img_shape[0]], bins=bins, smooth=smooth, baseline_norm=True
+    )
+    density = (ims / ims.sum(axis=(1, 2), keepdims=True)).sum(axis=0)
+    return density / density.max(), xedges, yedges
+
+
+def plot_stim_recon(ax, sites, img, density=None, markersize=200,
+                    label_fontsize=9):
+    """
+    Plot the stimulation sites on the MNI brain by effect, with a marker
+    per subject, over the overlap density of the sequence and reaction time
+    electrodes.
+
+    Parameters
+    ----------
+    ax : matplotlib Axes
+        The axes to plot on.
+    sites : pd.DataFrame
+        The sites, with the columns subject, warp_x and warp_y (see
+        stimulation_info.stim_site_coordinates).
+    img : nd-array
+        The MNI brain image.
+    density : tuple or None
+        The output of overlap_density, to plot under the sites.
+    markersize : float
+        The marker size of the sequencing sites.
+    label_fontsize : float
+        The font size of the legends.
+    """
+    ax.imshow(img, alpha=0.5, zorder=0)
+    ax.axis('off')
+
+    if density is not None:
+        density, xedges, yedges = density
+        cmap = mpl.colors.LinearSegmentedColormap.from_list(
+            'cmap', ['white', colors[2]]
+        )
+        # Fade in the density by drawing bands of it with rising opacity.
+        alphas = np.concatenate([np.zeros(15), np.linspace(0, 0.7, 55),
+                                 0.7 * np.ones(30)])
+        dx = 0.05
+        for low in np.arange(0, 1, dx):
+            band = np.where((density > low) & (density <= low + dx), density,
+                            np.nan)
+            ax.pcolormesh(xedges, yedges, band.T, alpha=alphas[int(100 * low)],
+                          vmin=0, vmax=1, cmap=cmap, zorder=0,
+                          rasterized=True)
+
+    categories = stim_site_categories(sites)
+    styles = {
+        'sequencing': dict(facecolor=colors[1], alpha=0.8, zorder=3),
+        'other'     : dict(facecolor='grey', alpha=0.5, zorder=2),
+        'none'      : dict(facecolor='None', alpha=0.5, zorder=2),
+    }
+    for subject, (marker, proportion) in stim_subjects.items():
+        labeled = False
+        for i in np.flatnonzero(sites.subject.values == subject):
+            category = categories[i]
+            if category is None:
+                continue
+            size = int(proportion * markersize) if category == 'sequencing' \
+                else int(proportion * markersize // 2)
+            label = None
+            if category == 'sequencing' and not labeled:
+                label, labeled = subject, True
+            ax.scatter(sites.warp_x.values[i], sites.warp_y.values[i],
+                       edgecolor='k', s=size, marker=marker, label=label,
+                       **styles[category])
+
+    handles, labels = ax.get_legend_handles_labels()
+    ax.add_artist(ax.legend(handles, labels, frameon=False, ncol=3,
+                            loc='lower left', fontsize=label_fontsize,
+                            bbox_to_anchor=(-0.05, -0.25), columnspacing=2.5))
+    ax.legend([mpl.patches.Patch(color=colors[1]),
+               mpl.patches.Patch(color='grey'),
+               mpl.patches.Patch(facecolor='None', edgecolor='k')],
+              ['Sequencing errors', 'Other sensorimotor effects',
+               'No deficits'],
+              frameon=False, ncol=2, loc='lower left',
+              fontsize=label_fontsize, bbox_to_anchor=(-0.05, -0.45),
+              columnspacing=0.75)
+
+
+@panel(inputs=['all_anatomical_info.h5', 'rt_seq_overlap_density_dict.pkl'])
+def stim_recon(data_dir, img_dir=None):
+    """
+    Figure 5 stimulation sites on the MNI brain, over the overlap density of
+    the sequence and reaction time electrodes.
+    """
+    default_plot_settings(fontsize=11, linewidth=1)
+
+    electrode_df = pd.read_hdf(os.path.join(data_dir,
+                                            'all_anatomical_info.h5'))
+    electrode_df = electrode_df.loc[electrode_df.subject.isin(stim_subjects)]
+    sites = stim_site_coordinates(electrode_df, coords=('warp_x', 'warp_y'))
+    sites = sites.loc[sites.subject.isin(stim_subjects)]
+
+    with open(os.path.join(data_dir, 'rt_seq_overlap_density_dict.pkl'),
+              'rb') as f:
+        overlap = pickle.load(f)
+    img = AssetCache(img_dir).brain_image('lh', 'lateral')
+
+    fig, ax = plt.subplots(figsize=(6, 6))
+    plot_stim_recon(ax, sites, img, density=overlap_density(overlap,
+                                                            img.shape))
+    return fig
@@ -12,8 +12,12 @@ import logging
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
 import seaborn as sns
-from scipy import ndimage
+from scipy import ndimage, signal
+
+# Custom libraries
+from sylseq_paper.profiling import profiled
 
 ucsf_colors = {
     'primary_palette'  : {
@@ -159,6 +163,274 @@ fancy_location_colors = {
                      0.5358103155058701)
 }
 
+# Renaming `SMA` label to `medial SFG`
+renamed_areas = {
+    'location'      : {
+        'supplementarymotor': 'medialsuperiorfrontal'
+    },
+    'fancy_location': {
+        'SMA': 'medial SFG'
+    }
+}
+
+
+def _remap_categorical(values, mapping):
+    """
+    Map the values of an array or Series through a dictionary (values not in
+    the dictionary are kept) as a pandas Categorical, by remapping the
+    category codes rather than the individual strings.
+    """
+    values = pd.Categorical(values)
+    new_labels = np.array([mapping.get(c, c) for c in values.categories],
+                          dtype=object)
+    new_categories, new_codes = np.unique(new_labels, return_inverse=True)
+
+    # Missing values have the code -1, which selects the -1 appended last.
+    codes = np.append(new_codes, -1)[values.codes]
+    return pd.Categorical.from_codes(codes, categories=new_categories)
+
+
+def rename_df_areas(df, renames=None):
+    """
+    Rename anatomical labels in place (by default `SMA` to `medial SFG`,
+    see renamed_areas), converting the location columns to categoricals.
+    The renaming only touches the categories, so it costs the same for any
+    number of rows, and the categoricals store each label once.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The table with location columns.
+    renames : dictionary or None
+        Maps each column to a dictionary of old to new labels. Defaults to
+        renamed_areas.
+
+    Returns
+    -------
+    df : pd.DataFrame
+        The same table, with renamed categorical location columns.
+    """
+    renames = renamed_areas if renames is None else renames
+    for label_type, label_renames in renames.items():
+        if label_type in df.columns:
+            df[label_type] = _remap_categorical(df[label_type],
+                                                label_renames)
+    return df
+
+
+def fancy_locations(locations):
+    """
+    Convert anatomical (FreeSurfer) location names to the labels of
+    area_names, e.g. for a fancy_location column.
+
+    Parameters
+    ----------
+    locations : array-like of str
+        The location names.
+
+    Returns
+    -------
+    fancy : pd.Categorical
+        The area labels, with names not in area_names kept as they are.
+    """
+    return _remap_categorical(locations, area_names)
+
+
+def area_colors(fancy_location, default=(0.5, 0.5, 0.5)):
+    """
+    Look up the fancy_location_colors of many electrodes at once, resolving
+    the color of each distinct area once.
+
+    Parameters
+    ----------
+    fancy_location : array-like of str
+        The area label of each electrode.
+    default : tuple
+        The RGB color of areas without a color (and missing labels).
+
+    Returns
+    -------
+    colors : 2d array
+        The RGB color of each electrode, of shape (electrodes, 3).
+    """
+    fancy_location = pd.Categorical(fancy_location)
+    palette = np.array([fancy_location_colors.get(area, default)
+                        for area in fancy_location.categories] + [default],
+                       dtype=float)
+
+    # Missing labels have the code -1, selecting the default at the end.
+    return palette[fancy_location.codes]
+
+
+def bin_coordinates(x, y, xlim, ylim, bins):
+    """
+    Find the 2D histogram bin of each coordinate, with the same bins as
+    np.histogram2d, so that repeated histograms of the same electrode
+    coordinates can reuse them (see smoothed_weighted_histograms).
+
+    Parameters
+    ----------
+    x : 1d array
+        The x coordinates.
+    y : 1d array
+        The y coordinates.
+    xlim : list of float or None
+        The [min, max] range of the x bins. None uses the range of x.
+    ylim : list of float or None
+        The [min, max] range of the y bins. None uses the range of y.
+    bins : int, array or list
+        As for np.histogram2d: the number of bins for both axes, the bin
+        edges for both axes, or [x bins, y bins] with each either a number
+        of bins or bin edges. Given edges override xlim and ylim.
+
+    Returns
+    -------
+    binned : dictionary
+        The flat bin index of each coordinate ('index', -1 for coordinates
+        outside the range), the histogram 'shape' and the bin edges
+        ('xedges' and 'yedges').
+    """
+    coordinates = [np.asarray(x, dtype=float), np.asarray(y, dtype=float)]
+
+    # Split bins per axis the way np.histogram2d does.
+    try:
+        n_items = len(bins)
+    except TypeError:
+        n_items = 1
+    axis_bins = [bins, bins] if n_items != 2 else list(bins)
+
+    edges = []
+    for values, lim, cur_bins in zip(coordinates, [xlim, ylim], axis_bins):
+        if np.ndim(cur_bins) == 0:
+            cur_edges = np.histogram_bin_edges(values, bins=int(cur_bins),
+                                               range=lim)
+        else:
+            cur_edges = np.asarray(cur_bins, dtype=float)
+            if np.any(np.diff(cur_edges) < 0):
+                raise ValueError('The bin edges must increase '
+                                 'monotonically.')
+        edges.append(cur_edges)
+
+    bin_idx = []
+    for values, cur_edges in zip(coordinates, edges):
+        # Like np.histogram2d, values on the last edge go in the last bin.
+        idx = np.searchsorted(cur_edges, values, side='right') - 1
+        idx[values == cur_edges[-1]] -= 1
+        bin_idx.append(idx)
+
+    shape = (len(edges[0]) - 1, len(edges[1]) - 1)
+    in_range = (bin_idx[0] >= 0) & (bin_idx[0] < shape[0]) & \
+               (bin_idx[1] >= 0) & (bin_idx[1] < shape[1])
+    flat_idx = np.where(in_range, bin_idx[0] * shape[1] + bin_idx[1], -1)
+
+    return {'index': flat_idx, 'shape': shape, 'xedges': edges[0],
+            'yedges': edges[1]}
+
+
+def _gaussian_smooth_fft(ims, sigma, truncate=4.0):
+    """
+    Gaussian smooth a stack of images along their last 2 axes by separable
+    FFT convolution, with the same kernel and (reflected) boundaries as
+    ndimage.gaussian_filter.
+    """
+    radius = int(truncate * sigma + 0.5)
+    x = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 * x ** 2 / sigma ** 2)
+    kernel /= kernel.sum()
+
+    for axis in [1, 2]:
+        pad_width = [(0, 0)] * ims.ndim
+        pad_width[axis] = (radius, radius)
+        kernel_shape = [1] * ims.ndim
+        kernel_shape[axis] = len(kernel)
+
+        ims = signal.fftconvolve(np.pad(ims, pad_width, mode='symmetric'),
+                                 kernel.reshape(kernel_shape), mode='valid',
+                                 axes=axis)
+    return ims
+
+
+@profiled
+def smoothed_weighted_histograms(weights, x=None, y=None, xlim=None,
+                                 ylim=None, bins=None, smooth=None,
+                                 baseline_norm=False, binned=None,
+                                 fft_sigma=8):
+    """
+    Generate Gaussian smoothed 2D histograms for many weight vectors over
+    the same coordinates at once (e.g. every cluster or feature type of a
+    recon). The coordinates are binned once (or the bins from
+    bin_coordinates are reused), all weight vectors are accumulated into
+    one stacked histogram and the stack is smoothed together, by FFT
+    convolution for large smoothing widths.
+
+    Each histogram is the same as smoothed_weighted_histogram for its
+    weights (up to floating point error).
+
+    Parameters
+    ----------
+    weights : 2d array
+        The weights, of shape (histograms, coordinates).
+    x : 1d array
+        The x coordinates. Not needed if binned is given.
+    y : 1d array
+        The y coordinates. Not needed if binned is given.
+    xlim : list of float or None
+        The [min, max] range of the x bins. None uses the range of x.
+    ylim : list of float or None
+        The [min, max] range of the y bins. None uses the range of y.
+    bins : int, array or list
+        The bins, as for np.histogram2d (see bin_coordinates).
+    smooth : float
+        The standard deviation of the Gaussian smoothing, in bins.
+    baseline_norm : bool, default False
+        Whether to normalize each histogram by the unweighted histogram of
+        all coordinates before smoothing.
+    binned : dictionary or None
+        The output of bin_coordinates for these coordinates, to reuse.
+    fft_sigma : float
+        The smoothing width from which FFT convolution is used.
+
+    Returns
+    -------
+    ims : 3d array
+        The smoothed histograms, each scaled to a maximum of 1, of shape
+        (histograms, x bins, y bins).
+    xedges : 1d array
+        The x bin edges.
+    yedges : 1d array
+        The y bin edges.
+    """
+    if binned is None:
+        binned = bin_coordinates(x, y, xlim, ylim, bins)
+
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+    n_maps = weights.shape[0]
+    n_bins = binned['shape'][0] * binned['shape'][1]
+    in_range = binned['index'] >= 0
+    flat_idx = binned['index'][in_range]
+
+    # Offset each map's bins so that a single bincount fills the stack.
+    stacked_idx = (np.arange(n_maps)[:, None] * n_bins + flat_idx).ravel()
+    ims = np.bincount(stacked_idx, weights=weights[:, in_range].ravel(),
+                      minlength=n_maps * n_bins)
+    ims = ims.reshape((n_maps,) + binned['shape'])
+
+    if baseline_norm:
+        b_im = np.bincount(flat_idx, minlength=n_bins).reshape(
+            binned['shape'])
+        ims /= b_im + 1e-15
+
+    if smooth >= fft_sigma:
+        ims = _gaussian_smooth_fft(ims, smooth)
+    else:
+        ims = ndimage.gaussian_filter(ims, sigma=(0, smooth, smooth),
+                                      order=0)
+    ims /= ims.max(axis=(1, 2), keepdims=True)
+
+    return ims, binned['xedges'], binned['yedges']
+
+
+@profiled
 def smoothed_weighted_histogram(x=None, y=None, weights=None, xlim=None,
                                 ylim=None, bins=None, smooth=None,
                                 baseline_norm=False):
@@ -166,7 +438,12 @@ def smoothed_weighted_histogram(x=None, y=None, weights=None, xlim=None,
     Generate a Gaussian smoothed 2D histogram. If baseline norm is set to
     True, then the weights that are 0 determine the rest of the population
     and the resulting density will be normalized by the baseline before
-    smoothing.
+    smoothing. See smoothed_weighted_histograms to compute many histograms
+    over the same coordinates at once.
+
+    The bins are those of np.histogram2d (see bin_coordinates): xlim and
+    ylim may be None to use the range of the coordinates, and bins may be
+    bin edges.
 
     Parameters
     ----------
@@ -183,17 +460,150 @@ def smoothed_weighted_histogram(x=None, y=None, weights=None, xlim=None,
 
     """
 
-    im, xedges, yedges = np.histogram2d(
-        x, y, bins=bins, density=False, weights=weights, range=[xlim, ylim]
+    if weights is None:
+        weights = np.ones(len(x))
+
+    ims, xedges, yedges = smoothed_weighted_histograms(
+        weights, x=x, y=y, xlim=xlim, ylim=ylim, bins=bins, smooth=smooth,
+        baseline_norm=baseline_norm
     )
 
-    if baseline_norm:
-        b_im, xedges, yedges = np.histogram2d(
-            x, y, bins=bins, density=False, range=[xlim, ylim]
-        )
-        im /= b_im + 1e-15
+    return ims[0], xedges, yedges
+
+
+def decimate_raster(data, max_rows=None, max_cols=None, reduce='mean'):
+    """
+    Reduce a 2D raster (e.g. electrodes x time bins) to at most max_rows x
+    max_cols by combining contiguous blocks of rows and columns, as a
+    level-of-detail step for fast previews.
+
+    Parameters
+    ----------
+    data : 2d array
+        The raster, of shape (rows, columns).
+    max_rows : int or None
+        The maximum number of rows. None keeps all rows.
+    max_cols : int or None
+        The maximum number of columns. None keeps all columns.
+    reduce : str, default 'mean'
+        How to combine each block, 'mean' or 'max'.
+
+    Returns
+    -------
+    decimated : 2d array
+        The reduced raster.
+    """
+    data = np.asarray(data, dtype=float)
+
+    for axis, max_size in enumerate([max_rows, max_cols]):
+        size = data.shape[axis]
+        if max_size is None or size <= max_size:
+            continue
+
+        starts = np.linspace(0, size, max_size + 1).astype(int)[:-1]
+        if reduce == 'max':
+            data = np.maximum.reduceat(data, starts, axis=axis)
+        else:
+            counts = np.diff(np.append(starts, size))
+            data = np.add.reduceat(data, starts, axis=axis)
+            data /= np.expand_dims(counts, 1 - axis)
+
+    return data
+
+
+@profiled
+def raster_image(ax, data, x=None, y=None, max_rows=None, max_cols=None,
+                 reduce='mean', **kwargs):
+    """
+    Draw a dense 2D raster (e.g. electrodes x time bins) as a single image
+    instead of a mesh of individual cells, so that it renders quickly and
+    is embedded as a raster in vector (e.g. PDF) output. Equivalent to
+    ax.pcolormesh(x, y, data, shading='auto') for evenly spaced x and y.
+
+    Parameters
+    ----------
+    ax : matplotlib Axes
+        The axes to draw on.
+    data : 2d array
+        The raster, of shape (rows, columns), with row 0 drawn at the
+        bottom.
+    x : 1d array or None
+        The evenly spaced centers of the columns. Defaults to the column
+        indices.
+    y : 1d array or None
+        The evenly spaced centers of the rows. Defaults to the row indices.
+    max_rows : int or None
+        Decimate to at most this many rows (see decimate_raster).
+    max_cols : int or None
+        Decimate to at most this many columns (see decimate_raster).
+    reduce : str, default 'mean'
+        How decimation combines blocks, 'mean' or 'max'.
+    kwargs : dictionary
+        The keyword arguments to pass to ax.imshow (e.g. cmap, vmin, vmax).
+
+    Returns
+    -------
+    im : matplotlib AxesImage
+        The image.
+    """
+    data = np.asarray(data)
+    x = np.arange(data.shape[1]) if x is None else np.asarray(x)
+    y = np.arange(data.shape[0]) if y is None else np.asarray(y)
+
+    # Extend the extent by half a cell, like pcolormesh with shading='auto'.
+    extent = []
+    for centers in [x, y]:
+        half_step = (centers[-1] - centers[0]) / max(len(centers) - 1, 1) / 2
+        extent.extend([centers[0] - half_step, centers[-1] + half_step])
+
+    data = decimate_raster(data, max_rows=max_rows, max_cols=max_cols,
+                           reduce=reduce)
+
+    kwargs = {'aspect': 'auto', 'interpolation': 'nearest', **kwargs}
+    return ax.imshow(data, origin='lower', extent=extent, **kwargs)
+
+
+@profiled
+def rasterized_scatter(ax, x, y, max_points=None, random_seed=0, **kwargs):
+    """
+    Draw a scatter (e.g. electrodes on a recon) as a single rasterized
+    collection, so that it is embedded as a raster in otherwise vector
+    output, optionally drawing a random subset of the points for fast
+    previews.
+
+    Parameters
+    ----------
+    ax : matplotlib Axes
+        The axes to draw on.
+    x : 1d array
+        The x coordinates.
+    y : 1d array
+        The y coordinates.
+    max_points : int or None
+        If given, draw at most this many randomly selected points (in their
+        original drawing order).
+    random_seed : int
+        Random seed for the subset of points.
+    kwargs : dictionary
+        The keyword arguments to pass to ax.scatter. Per-point arrays (e.g.
+        c, s, color, edgecolors) are subset with the points.
+
+    Returns
+    -------
+    collection : matplotlib PathCollection
+        The scatter.
+    """
+    x, y = np.asarray(x), np.asarray(y)
+
+    if max_points is not None and len(x) > max_points:
+        rng = np.random.default_rng(random_seed)
+        keep = np.sort(rng.choice(len(x), size=max_points, replace=False))
 
-    im = ndimage.gaussian_filter(im, sigma=(smooth, smooth), order=0)
-    im /= im.max()
+        for key, val in kwargs.items():
+            if not isinstance(val, str) and np.ndim(val) > 0 and \
+                    len(val) == len(x):
+                kwargs[key] = np.asarray(val)[keep]
+        x, y = x[keep], y[keep]
 
-    return im, xedges, yedges
+    kwargs.setdefault('rasterized', True)
+    return ax.scatter(x, y, **kwargs)
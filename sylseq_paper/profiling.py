@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+"""
+Timing and memory instrumentation of the analysis hot paths.
+
+Functions decorated with profiled (and blocks of code within profile_block)
+record their wall time, inputs and, optionally, peak memory while profiling
+is enabled, and cost a single flag check otherwise. The records can be
+summarized per function or saved as a Chrome trace (viewable in
+chrome://tracing or https://ui.perfetto.dev):
+
+>>> from sylseq_paper import profiling
+>>> profiling.enable(trace_memory=True)
+>>> ... run the notebook cells ...
+>>> profiling.summary()
+>>> profiling.write_chrome_trace('trace.json')
+
+Setting the SYLSEQ_PROFILE environment variable to a file path enables
+profiling on import and saves the Chrome trace there when Python exits.
+Only calls in the current process are recorded.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import atexit
+import contextlib
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# Third party libraries
+import numpy as np
+import pandas as pd
+
+_enabled = False
+_trace_memory = False
+_started_tracing = False
+_events = []
+
+# tracemalloc.reset_peak is only available from Python 3.9.
+_has_reset_peak = hasattr(tracemalloc, 'reset_peak')
+
+# The highest traced peak discarded when resetting the peak to measure a
+# call, so that the peak of the whole traced run is kept (see
+# get_traced_memory).
+_discarded_peak = 0
+
+# Per-thread stack of the peak memory of the running calls' children.
+_local = threading.local()
+
+
+def enable(trace_memory=False):
+    """
+    Start recording the profiled calls.
+
+    Parameters
+    ----------
+    trace_memory : bool, default False
+        Whether to also record the peak memory allocated during each call,
+        with tracemalloc. This slows down allocation-heavy code. Before
+        Python 3.9, a call's peak is only exact when it exceeds the peak of
+        everything traced before it, and is otherwise the memory the call
+        retains. Each call resets tracemalloc's peak to measure its own, so
+        read the peak of the whole run (including before profiling, if
+        tracing was already started) with get_traced_memory instead of
+        tracemalloc.get_traced_memory.
+    """
+    global _enabled, _trace_memory, _started_tracing, _discarded_peak
+    _trace_memory = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracing = True
+        _discarded_peak = 0
+    _enabled = True
+
+
+def disable():
+    """
+    Stop recording the profiled calls (the records are kept).
+    """
+    global _enabled, _trace_memory, _started_tracing
+    _enabled = False
+    # Leave tracing running if it was started by the caller.
+    if _started_tracing:
+        tracemalloc.stop()
+    _trace_memory = False
+    _started_tracing = False
+
+
+def is_enabled():
+    """
+    Whether profiling is enabled.
+    """
+    return _enabled
+
+
+def get_traced_memory():
+    """
+    Get the current and peak traced memory, like
+    tracemalloc.get_traced_memory, but with the peak since tracing started
+    (or since reset_peak), including the peaks reset to measure each
+    profiled call.
+
+    Returns
+    -------
+    current : int
+        The current traced memory, in bytes.
+    peak : int
+        The peak traced memory, in bytes.
+    """
+    current, peak = tracemalloc.get_traced_memory()
+    return current, max(peak, _discarded_peak)
+
+
+def reset_peak():
+    """
+    Reset the peak of get_traced_memory (and tracemalloc's, from Python
+    3.9) to the current traced memory.
+    """
+    global _discarded_peak
+    _discarded_peak = 0
+    if _has_reset_peak:
+        tracemalloc.reset_peak()
+
+
+def reset():
+    """
+    Remove the recorded calls.
+    """
+    _events.clear()
+
+
+def describe(value):
+    """
+    Describe the size of an input: the shape and bytes of arrays, the shape
+    of tables, the length of sequences and the size of existing files.
+    """
+    if isinstance(value, np.ndarray):
+        return {'shape': list(value.shape), 'dtype': str(value.dtype),
+                'nbytes': int(value.nbytes)}
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return {'shape': list(value.shape)}
+    if isinstance(value, str):
+        if os.path.isfile(value):
+            return {'path': value, 'nbytes': os.path.getsize(value)}
+        return value if len(value) <= 100 else f'{value[:100]}...'
+    if isinstance(value, (bool, int, float, type(None))):
+        return value
+    if isinstance(value, (list, tuple, dict, set)):
+        return {'type': type(value).__name__, 'len': len(value)}
+    return type(value).__name__
+
+
+class _Call:
+    """
+    Record of a running profiled call.
+    """
+
+    def __init__(self, name, category, inputs):
+        global _discarded_peak
+        self.name = name
+        self.category = category
+        self.inputs = inputs
+        self.start = time.perf_counter_ns()
+
+        if _trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            self.start_memory = current
+            self.start_peak = peak
+            if _has_reset_peak:
+                # Keep the parent's peak so far, then measure this call's
+                # own.
+                stack = _memory_stack()
+                if stack:
+                    stack[-1] = max(stack[-1], peak)
+                stack.append(0)
+                _discarded_peak = max(_discarded_peak, peak)
+                tracemalloc.reset_peak()
+
+    def finish(self):
+        end = time.perf_counter_ns()
+        event = {
+            'name'    : self.name,
+            'category': self.category,
+            'start'   : self.start,
+            'duration': end - self.start,
+            'pid'     : os.getpid(),
+            'tid'     : threading.get_ident(),
+            'inputs'  : self.inputs,
+        }
+
+        if _trace_memory and hasattr(self, 'start_memory'):
+            current, peak = tracemalloc.get_traced_memory()
+            if _has_reset_peak:
+                stack = _memory_stack()
+                peak = max(peak, stack.pop())
+                if stack:
+                    stack[-1] = max(stack[-1], peak)
+            elif peak <= self.start_peak:
+                # The peak was reached before the call, so only the memory
+                # it retains is known.
+                peak = current
+            event['peak_memory'] = max(peak - self.start_memory, 0)
+
+        _events.append(event)
+
+
+def _memory_stack():
+    if not hasattr(_local, 'memory_stack'):
+        _local.memory_stack = []
+    return _local.memory_stack
+
+
+def profiled(func=None, name=None, category=None):
+    """
+    Decorator recording the calls of a function while profiling is enabled
+    (see enable). Can be used with or without arguments.
+
+    Parameters
+    ----------
+    func : function
+        The function to profile.
+    name : str or None
+        The name of the records. Defaults to module.function.
+    category : str or None
+        The category of the records (e.g. 'io' or 'statistics'). Defaults
+        to the module name.
+
+    Returns
+    -------
+    wrapper : function
+        The profiled function.
+    """
+    if func is None:
+        return functools.partial(profiled, name=name, category=category)
+
+    module = func.__module__.split('.')[-1]
+    record_name = f'{module}.{func.__qualname__}' if name is None else name
+    record_category = module if category is None else category
+    signature = []
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+
+        if not signature:
+            signature.append(inspect.signature(func))
+        try:
+            arguments = signature[0].bind(*args, **kwargs).arguments
+        except TypeError:
+            arguments = {}
+
+        call = _Call(record_name, record_category,
+                     {key: describe(val) for key, val in arguments.items()})
+        try:
+            return func(*args, **kwargs)
+        finally:
+            call.finish()
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def profile_block(name, category='block', **inputs):
+    """
+    Context manager recording a block of code while profiling is enabled
+    (see enable), e.g. a figure panel or its rendering.
+
+    >>> with profile_block('savefig', path=path):
+    ...     fig.savefig(path)
+
+    Parameters
+    ----------
+    name : str
+        The name of the record.
+    category : str
+        The category of the record.
+    inputs : dictionary
+        Inputs of the block to describe in the record.
+    """
+    if not _enabled:
+        yield
+        return
+
+    call = _Call(name, category,
+                 {key: describe(val) for key, val in inputs.items()})
+    try:
+        yield
+    finally:
+        call.finish()
+
+
+def events():
+    """
+    Get the recorded calls, as dictionaries with the name, category, start
+    and duration (in nanoseconds), process and thread, the description of
+    the inputs and, when traced, the peak memory (in bytes).
+    """
+    return list(_events)
+
+
+def summary():
+    """
+    Summarize the recorded calls per name.
+
+    Returns
+    -------
+    summary : pd.DataFrame
+        A row per name with the number of calls, the total, mean and
+        maximum wall time (in seconds) and the maximum peak memory (in
+        bytes, when traced), sorted by total time. Nested calls are
+        included in the time of their callers.
+    """
+    columns = ['name', 'category', 'calls', 'total_time', 'mean_time',
+               'max_time', 'peak_memory']
+    if not _events:
+        return pd.DataFrame(columns=columns)
+
+    df = pd.DataFrame(_events)
+    df['duration'] = df['duration'] / 1e9
+    if 'peak_memory' not in df.columns:
+        df['peak_memory'] = np.nan
+
+    grouped = df.groupby(['name', 'category'])
+    summary = pd.DataFrame({
+        'calls'      : grouped.size(),
+        'total_time' : grouped.duration.sum(),
+        'mean_time'  : grouped.duration.mean(),
+        'max_time'   : grouped.duration.max(),
+        'peak_memory': grouped.peak_memory.max(),
+    }).reset_index()
+
+    return summary.sort_values('total_time', ascending=False,
+                               ignore_index=True)[columns]
+
+
+def write_chrome_trace(path):
+    """
+    Save the recorded calls as a Chrome trace (JSON trace event format),
+    viewable in chrome://tracing or https://ui.perfetto.dev.
+
+    Parameters
+    ----------
+    path : str
+        Path to the JSON file.
+    """
+    trace_events = []
+    for event in _events:
+        args = {'inputs': event['inputs']}
+        if 'peak_memory' in event:
+            args['peak_memory'] = event['peak_memory']
+
+        trace_events.append({
+            'name': event['name'],
+            'cat' : event['category'],
+            'ph'  : 'X',
+            'ts'  : event['start'] / 1e3,
+            'dur' : event['duration'] / 1e3,
+            'pid' : event['pid'],
+            'tid' : event['tid'],
+            'args': args,
+        })
+
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'},
+                  f, default=str)
+
+
+def write_log(path):
+    """
+    Save the recorded calls as a JSON lines log, one call per line.
+
+    Parameters
+    ----------
+    path : str
+        Path to the log file.
+    """
+    with open(path, 'w') as f:
+        for event in _events:
+            f.write(json.dumps(event, default=str) + '\n')
+
+
+if os.environ.get('SYLSEQ_PROFILE'):
+    enable(trace_memory=os.environ.get('SYLSEQ_PROFILE_MEMORY') == '1')
+    atexit.register(write_chrome_trace, os.environ['SYLSEQ_PROFILE'])
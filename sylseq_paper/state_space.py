@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming PCA state-space trajectories per region (Figure 2 state space).
+
+Each region's principal components are computed from running sums of its
+electrodes' activity (the number of samples, their sum and the sum of their
+outer products), accumulated chunk by chunk as the trial data streams
+through, so the trials x time x electrodes data is never held in memory.
+The sums are exact sufficient statistics, so new trials are added to a
+fitted region without revisiting the old ones, and they are cached on disk
+by the region's electrodes and a data key, so adding a region or a
+participant only fits the regions that changed:
+
+>>> space = StateSpace(electrodes=df.subject_electrode.values,
+...                    cache_dir='state_space', data_key='v1')
+>>> space.fit(regions, lambda: iter_trial_chunks(...))
+>>> stsp = space.trajectories(mean_trials, times, phase_windows)
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import hashlib
+import json
+import os
+
+# Third party libraries
+import numpy as np
+
+# Custom libraries
+from sylseq_paper.profiling import profiled
+
+
+class RegionPCA:
+    """
+    PCA of a region from running sums of its samples.
+
+    Parameters
+    ----------
+    n_features : int
+        The number of electrodes (features) of the region.
+    """
+
+    def __init__(self, n_features):
+        self.n = 0
+        self.sum = np.zeros(n_features)
+        self.sum_outer = np.zeros((n_features, n_features))
+
+    def update(self, rows):
+        """
+        Add samples, of shape (samples, features).
+        """
+        rows = np.asarray(rows, dtype=float)
+        self.n += rows.shape[0]
+        self.sum += rows.sum(axis=0)
+        self.sum_outer += rows.T @ rows
+
+    @property
+    def mean(self):
+        return self.sum / self.n
+
+    @property
+    def covariance(self):
+        return (self.sum_outer - self.n * np.outer(self.mean, self.mean)) / \
+            (self.n - 1)
+
+    def components(self, n_components=3):
+        """
+        Compute the principal components, with the largest absolute
+        coefficient of each component positive.
+
+        Returns
+        -------
+        components : 2d array
+            The components, of shape (n_components, features).
+        explained : 1d array
+            The fraction of variance explained by every component.
+        """
+        eigenvalues, eigenvectors = np.linalg.eigh(self.covariance)
+        eigenvalues = np.clip(eigenvalues[::-1], 0, None)
+        components = eigenvectors[:, ::-1][:, :n_components].T
+
+        max_idx = np.argmax(np.abs(components), axis=1)
+        components *= np.sign(
+            components[np.arange(components.shape[0]), max_idx]
+        )[:, None]
+
+        return components, eigenvalues / eigenvalues.sum()
+
+    def to_dict(self):
+        return {'n': self.n, 'sum': self.sum, 'sum_outer': self.sum_outer}
+
+    @classmethod
+    def from_dict(cls, stats):
+        pca = cls(len(stats['sum']))
+        pca.n = int(stats['n'])
+        pca.sum = np.asarray(stats['sum'], dtype=float)
+        pca.sum_outer = np.asarray(stats['sum_outer'], dtype=float)
+        return pca
+
+
+def phase_labels(times, phase_windows):
+    """
+    Label each time point with the (1-based) phase whose window contains
+    it, or 0 for none.
+
+    Parameters
+    ----------
+    times : 1d array
+        The time points.
+    phase_windows : list of tuples
+        The start and stop times of each phase, in phase order.
+
+    Returns
+    -------
+    labels : 1d array of ints
+        The phase of each time point.
+    """
+    times = np.asarray(times)
+    labels = np.zeros(len(times), dtype=int)
+    for phase, (start, stop) in enumerate(phase_windows):
+        labels[(times >= start) & (times < stop) & (labels == 0)] = phase + 1
+    return labels
+
+
+def _as_rows(chunk):
+    """
+    Reshape a chunk of trials (trials, time, electrodes) into samples
+    (trials x time, electrodes).
+    """
+    chunk = np.asarray(chunk)
+    return chunk.reshape(-1, chunk.shape[-1])
+
+
+class StateSpace:
+    """
+    Streaming PCA of the electrodes of several regions, with the running
+    sums of each region cached on disk.
+
+    Parameters
+    ----------
+    electrodes : list
+        The identifiers of the data's electrodes (e.g. subject_electrode),
+        in the order of the last axis of the data chunks.
+    n_components : int
+        The number of components of the trajectories.
+    cache_dir : str or None
+        The directory to cache the regions' sums in. None keeps them in
+        memory only.
+    data_key : str
+        Identifies the data the sums are computed from (e.g. a file hash or
+        version), so that cached sums are only reused for the same data.
+        Regions fitted by fit use this key, and update advances the key of
+        the regions it updates (see data_keys).
+    """
+
+    def __init__(self, electrodes, n_components=3, cache_dir=None,
+                 data_key=''):
+        self.electrodes = list(electrodes)
+        self.n_components = n_components
+        self.cache_dir = cache_dir
+        self.data_key = data_key
+        self.data_keys = {}
+        self.regions = {}
+        self.pcas = {}
+
+        self._positions = {e: i for i, e in enumerate(self.electrodes)}
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _key(self, region, data_key=None):
+        """
+        The cache key of a region's sums, from the region's data key and
+        electrodes.
+        """
+        if data_key is None:
+            data_key = self.data_keys.get(region, self.data_key)
+        payload = json.dumps([data_key, [str(e) for e in
+                                         self.regions[region]]])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, region, data_key=None):
+        return os.path.join(self.cache_dir,
+                            f'{self._key(region, data_key)}.npz')
+
+    def _save(self, region):
+        if self.cache_dir is not None:
+            np.savez(self._path(region), **self.pcas[region].to_dict())
+
+    def columns(self, region):
+        """
+        The positions of a region's electrodes in the data.
+        """
+        return np.array([self._positions[e] for e in self.regions[region]])
+
+    @profiled
+    def fit(self, regions, chunks):
+        """
+        Fit the regions whose sums are neither fitted nor cached (for their
+        current electrodes), in a single pass over the data.
+
+        Parameters
+        ----------
+        regions : dictionary
+            The electrode identifiers of each region.
+        chunks : function
+            Called without arguments, returns an iterable over chunks of
+            the data, of shape (trials, time, electrodes) or (samples,
+            electrodes). Only called if a region needs fitting.
+
+        Returns
+        -------
+        fitted : list of str
+            The regions that were fitted from the data.
+        """
+        to_fit = []
+        for region, region_electrodes in regions.items():
+            changed = list(region_electrodes) != self.regions.get(region)
+            self.regions[region] = list(region_electrodes)
+
+            if not changed and region in self.pcas:
+                continue
+            self.data_keys[region] = self.data_key
+            if self.cache_dir is not None and os.path.exists(
+                    self._path(region)):
+                with np.load(self._path(region)) as stats:
+                    self.pcas[region] = RegionPCA.from_dict(stats)
+                continue
+
+            self.pcas[region] = RegionPCA(len(region_electrodes))
+            to_fit.append(region)
+
+        if to_fit:
+            columns = {region: self.columns(region) for region in to_fit}
+            for chunk in chunks():
+                rows = _as_rows(chunk)
+                for region in to_fit:
+                    self.pcas[region].update(rows[:, columns[region]])
+
+            for region in to_fit:
+                self._save(region)
+
+        return to_fit
+
+    @profiled
+    def update(self, chunks, data_key, regions=None):
+        """
+        Add new samples (e.g. new trials) to the fitted regions, without
+        revisiting the data they were fitted on, and cache the updated sums
+        under a new data key.
+
+        Only the updated regions move to the new data key; the others keep
+        the key (and cache entry) of the data they were fitted on. The
+        default data key, used by later fits, advances once every fitted
+        region has been updated to it.
+
+        Parameters
+        ----------
+        chunks : iterable
+            The chunks of new data, as for fit.
+        data_key : str
+            The key of the data including the new samples.
+        regions : list of str or None
+            The regions to update. Defaults to all fitted regions.
+        """
+        regions = list(self.pcas) if regions is None else list(regions)
+        columns = {region: self.columns(region) for region in regions}
+
+        for chunk in chunks:
+            rows = _as_rows(chunk)
+            for region in regions:
+                self.pcas[region].update(rows[:, columns[region]])
+
+        for region in regions:
+            self.data_keys[region] = data_key
+            self._save(region)
+
+        if all(self.data_keys.get(region) == data_key
+               for region in self.pcas):
+            self.data_key = data_key
+
+    def project(self, region, data):
+        """
+        Project data onto a region's components.
+
+        Parameters
+        ----------
+        region : str
+            The region.
+        data : nd-array
+            The data, of shape (..., electrodes) over all the electrodes
+            (e.g. the trial-averaged activity, time x electrodes).
+
+        Returns
+        -------
+        projection : nd-array
+            The projection, of shape (..., n_components).
+        """
+        pca = self.pcas[region]
+        components, _ = pca.components(self.n_components)
+        return (np.asarray(data)[..., self.columns(region)] - pca.mean) @ \
+            components.T
+
+    def explained_variance(self, region):
+        """
+        The fraction of variance explained by each of a region's components.
+        """
+        return self.pcas[region].components(self.n_components)[1]
+
+    def trajectories(self, data, times, phase_windows, regions=None):
+        """
+        Project trial-averaged data onto each region's components, with the
+        phase of each time point, in the layout of fig2_state_space.pkl.
+
+        Parameters
+        ----------
+        data : 2d array
+            The trial-averaged activity, of shape (time, electrodes).
+        times : 1d array
+            The time of each time point.
+        phase_windows : list of tuples
+            The start and stop times of each phase (see phase_labels).
+        regions : list of str or None
+            The regions, in order. Defaults to all fitted regions.
+
+        Returns
+        -------
+        stsp : dictionary
+            regions, X_pca_all (the trajectory of each region, time x
+            n_components), phase_label (the phase of each time point, per
+            region) and var_exp (the explained variance percentages of each
+            region).
+        """
+        regions = list(self.pcas) if regions is None else list(regions)
+        labels = phase_labels(times, phase_windows)
+
+        return {
+            'regions'    : np.array(regions, dtype=object),
+            'X_pca_all'  : [self.project(region, data) for region in regions],
+            'phase_label': [labels.copy() for _ in regions],
+            'var_exp'    : [100 * self.explained_variance(region)
+                            for region in regions],
+        }
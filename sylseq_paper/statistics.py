@@ -18,6 +18,13 @@ from scipy import stats
 from scipy.ndimage.filters import gaussian_filter1d
 from statsmodels.stats.multitest import fdrcorrection
 
+# Custom libraries
+from sylseq_paper.parallel import (block_sizes, parallel_map,
+                                   parallel_resample, resolve_n_jobs,
+                                   spawn_seeds)
+from sylseq_paper.profiling import profiled
+
+@profiled
 def fdr_omitnans(pvals, **kwargs):
     """
     Computes FDR correction while ignoring NaN entries.
@@ -44,6 +51,211 @@ def fdr_omitnans(pvals, **kwargs):
     return corrected_pvals
 
 
+# FDR method names (as in statsmodels' fdrcorrection) and the procedure
+# they select, Benjamini-Hochberg ('bh') or Benjamini-Yekutieli ('by').
+_fdr_methods = {
+    'i'      : 'bh',
+    'indep'  : 'bh',
+    'p'      : 'bh',
+    'poscorr': 'bh',
+    'bh'     : 'bh',
+    'n'      : 'by',
+    'negcorr': 'by',
+    'by'     : 'by'
+}
+
+
+def _resolve_fdr_method(method):
+    """
+    Get the FDR procedure ('bh' or 'by') for a method name, raising a
+    ValueError for unknown names.
+    """
+    try:
+        return _fdr_methods[method]
+    except KeyError:
+        raise ValueError(f'Unknown FDR method {method}, use one of '
+                         f'{list(_fdr_methods)}.')
+
+
+def _fdr_scale(n_tests, procedure):
+    """
+    Get the factor the ranked p-values are scaled by, n_tests for
+    Benjamini-Hochberg and n_tests times the harmonic sum for
+    Benjamini-Yekutieli.
+    """
+    n_tests = np.asarray(n_tests, dtype=float)
+    if procedure == 'by':
+        # The harmonic sum of 1..n for every n up to the largest n_tests.
+        harmonic = np.cumsum(1 / np.arange(1, max(n_tests.max(), 1) + 1))
+        return n_tests * np.concatenate([[0], harmonic])[
+            n_tests.astype(int)]
+    return n_tests
+
+
+@profiled
+def fdr_correction(pvals, method='indep', axis=-1):
+    """
+    Computes FDR correction along an axis of an N-D array of p-values,
+    correcting each 1-D slice separately while ignoring NaN entries, with a
+    single sort for all slices. Along a 1-D array this matches
+    fdr_omitnans.
+
+    Parameters
+    ----------
+    pvals : nd-array of floats
+        The p-values to correct.
+    method : str, default 'indep'
+        'indep' (or 'bh') for Benjamini-Hochberg, 'negcorr' (or 'by') for
+        Benjamini-Yekutieli, as in statsmodels' fdrcorrection.
+    axis : int or None
+        The axis of the tests to correct together. None corrects all the
+        p-values together.
+
+    Returns
+    -------
+    corrected_pvals : nd-array of floats
+        The corrected p-values with the same shape as pvals. Any NaN
+        p-values remain NaN's.
+    """
+    procedure = _resolve_fdr_method(method)
+    pvals = np.asarray(pvals, dtype=float)
+    shape = pvals.shape
+
+    if axis is None:
+        pvals = pvals.reshape(1, -1)
+    else:
+        pvals = np.moveaxis(pvals, axis, -1)
+        moved_shape = pvals.shape
+        pvals = pvals.reshape(-1, moved_shape[-1])
+
+    # Sort NaN's last so that the first n_tests ranks are the tests.
+    nans = np.isnan(pvals)
+    n_tests = (~nans).sum(axis=1, keepdims=True)
+    order = np.argsort(np.where(nans, np.inf, pvals), axis=1)
+    sorted_pvals = np.take_along_axis(pvals, order, axis=1)
+
+    ranks = np.arange(1, pvals.shape[1] + 1)
+    with np.errstate(invalid='ignore'):
+        adjusted = sorted_pvals * _fdr_scale(n_tests, procedure) / ranks
+    adjusted[np.isnan(adjusted)] = np.inf
+
+    # Enforce monotonicity from the largest p-value down.
+    adjusted = np.minimum.accumulate(adjusted[:, ::-1], axis=1)[:, ::-1]
+    adjusted = np.minimum(adjusted, 1)
+
+    corrected_pvals = np.empty_like(adjusted)
+    np.put_along_axis(corrected_pvals, order, adjusted, axis=1)
+    corrected_pvals[nans] = np.nan
+
+    if axis is None:
+        return corrected_pvals.reshape(shape)
+    return np.moveaxis(corrected_pvals.reshape(moved_shape), -1, axis)
+
+
+@profiled
+def _group_keys(groups, data=None):
+    """
+    Convert the groups of fdr_grouped into a list of 1d keys whose
+    combinations form the groups.
+    """
+    if data is not None and (isinstance(groups, str) or (
+            isinstance(groups, list) and groups and
+            all(isinstance(col, str) for col in groups))):
+        groups = data[groups]
+
+    if isinstance(groups, pd.DataFrame):
+        return [groups[col].values for col in groups.columns]
+    if isinstance(groups, list) and groups and all(
+            np.ndim(key) == 1 and not isinstance(key, tuple)
+            for key in groups):
+        return groups
+
+    # A single key, either labels or tuples of labels.
+    labels = list(groups)
+    if labels and all(isinstance(label, tuple) for label in labels):
+        tuples = pd.MultiIndex.from_tuples(labels)
+        return [tuples.get_level_values(i) for i in range(tuples.nlevels)]
+    return [np.asarray(groups)]
+
+
+def fdr_grouped(pvals, groups, method='indep', data=None):
+    """
+    Computes FDR correction separately within each group of p-values while
+    ignoring NaN entries, in a single sort over all the groups. For
+    example, correcting per alignment and feature type in one call:
+
+    >>> df['fdr_pval'] = fdr_grouped(df.pval, [df.alignment, df.feature_type])
+
+    or, equivalently, fdr_grouped('pval', ['alignment', 'feature_type'],
+    data=df) or fdr_grouped(df.pval, df[['alignment', 'feature_type']]).
+
+    Parameters
+    ----------
+    pvals : 1d array of floats, pd.Series or str
+        The p-values to correct, or their column in data.
+    groups : 1d array, list of 1d arrays, pd.DataFrame or list of str
+        The group of each p-value (a label or a tuple of labels), or several
+        keys (e.g. DataFrame columns, or the columns of data by name) whose
+        combinations form the groups.
+    method : str, default 'indep'
+        'indep' (or 'bh') for Benjamini-Hochberg, 'negcorr' (or 'by') for
+        Benjamini-Yekutieli, as in statsmodels' fdrcorrection.
+    data : pd.DataFrame or None
+        The table holding the columns named by pvals and groups.
+
+    Returns
+    -------
+    corrected_pvals : 1d array of floats or pd.Series
+        The corrected p-values, a Series with the index of pvals if it is
+        one. Any NaN p-values remain NaN's.
+    """
+    procedure = _resolve_fdr_method(method)
+    if data is not None and isinstance(pvals, str):
+        pvals = data[pvals]
+    index = pvals.index if isinstance(pvals, pd.Series) else None
+    pvals = np.asarray(pvals, dtype=float)
+
+    keys = _group_keys(groups, data=data)
+    codes = pd.DataFrame(
+        {i: np.asarray(key) for i, key in enumerate(keys)}
+    ).groupby(list(range(len(keys))), sort=False, dropna=False).ngroup()
+    codes = codes.values
+
+    # Sort by group, then p-value with NaN's last, and rank within groups.
+    # Sorting on a single integer key (the group, then the rank of the
+    # p-value) is much faster than a lexicographic sort.
+    nans = np.isnan(pvals)
+    pval_ranks = np.empty(len(pvals), dtype=np.int64)
+    pval_ranks[np.argsort(np.where(nans, np.inf, pvals))] = \
+        np.arange(len(pvals))
+    order = np.argsort(codes * len(pvals) + pval_ranks)
+    sorted_codes = codes[order]
+    sorted_pvals = pvals[order]
+
+    n_groups = codes.max() + 1 if len(codes) else 0
+    group_starts = np.searchsorted(sorted_codes, np.arange(n_groups))
+    ranks = np.arange(1, len(pvals) + 1) - group_starts[sorted_codes]
+    n_tests = np.bincount(codes[~nans], minlength=n_groups)[sorted_codes]
+
+    with np.errstate(invalid='ignore'):
+        adjusted = sorted_pvals * _fdr_scale(n_tests, procedure) / ranks
+    adjusted[np.isnan(adjusted)] = np.inf
+
+    # Enforce monotonicity from the largest p-value down, within groups.
+    adjusted = pd.Series(adjusted[::-1]).groupby(
+        sorted_codes[::-1]
+    ).cummin().values[::-1]
+
+    corrected_pvals = np.empty(len(pvals))
+    corrected_pvals[order] = np.minimum(adjusted, 1)
+    corrected_pvals[nans] = np.nan
+
+    if index is not None:
+        return pd.Series(corrected_pvals, index=index)
+    return corrected_pvals
+
+
+@profiled
 def p_value_calc(data, test_statistic=None, axis=0):
     """
     Calculate the p-value for a specific test statistic value from
@@ -78,14 +290,354 @@ def p_value_calc(data, test_statistic=None, axis=0):
 
     return p_value
 
+class PValueAccumulator:
+    """
+    Streaming version of p_value_calc that consumes the resampled test
+    statistics in chunks (along the iteration axis) instead of needing the
+    full distribution in memory, holding only O(chunk) memory.
+
+    p_value_calc centers the distribution on its mean before counting the
+    resampled values more extreme than the test statistic, so the mean is
+    needed before counting. Either pass the center if it is known (e.g. a
+    stored shift from a previous run), and count in a single pass:
+
+    >>> acc = PValueAccumulator(test_statistic, center=0)
+    >>> for chunk in chunks:
+    ...     acc.update(chunk)
+
+    or make two passes over the same chunks (e.g. by regenerating them from
+    the same random seed), the first computing the running mean:
+
+    >>> acc = PValueAccumulator(test_statistic)
+    >>> for chunk in chunks():
+    ...     acc.update_mean(chunk)
+    >>> for chunk in chunks():
+    ...     acc.update(chunk)
+    >>> p_value = acc.p_value()
+
+    Parameters
+    ----------
+    test_statistic : int, float or nd-array
+        The test statistic to compare against, broadcastable to the shape
+        of a chunk without the iteration axis.
+    center : int, float, nd-array or None
+        The mean of the resampled distribution. If None, it is computed
+        from the chunks passed to update_mean.
+    axis : int
+        The axis of each chunk holding the bootstrap or permutation
+        iterations.
+    """
+
+    def __init__(self, test_statistic, center=None, axis=0):
+        self.test_statistic = test_statistic
+        self.axis = axis
+        self._center = center
+        self._sum = 0
+        self._n_mean = 0
+        self._count = 0
+        self._n_count = 0
+
+    def _iterations_first(self, chunk):
+        return np.moveaxis(np.asarray(chunk), self.axis, 0)
+
+    def update_mean(self, chunk):
+        """
+        Add a chunk of resampled test statistics to the running mean (first
+        pass).
+        """
+        chunk = self._iterations_first(chunk)
+        self._sum = self._sum + chunk.sum(axis=0, dtype=float)
+        self._n_mean += chunk.shape[0]
+
+    @property
+    def center(self):
+        """
+        The center of the resampled distribution, either given or the
+        running mean of the first pass.
+        """
+        if self._center is not None:
+            return self._center
+        if self._n_mean == 0:
+            raise ValueError('No center was given and no chunks were passed '
+                             'to update_mean.')
+        return self._sum / self._n_mean
+
+    def update(self, chunk):
+        """
+        Count the resampled test statistics in a chunk that are more
+        extreme than the test statistic, relative to the center.
+        """
+        chunk = self._iterations_first(chunk)
+        center = self.center
+        threshold = np.abs(self.test_statistic - center)
+        self._count = self._count + np.sum(np.abs(chunk - center) > threshold,
+                                           axis=0)
+        self._n_count += chunk.shape[0]
+
+    def p_value(self):
+        """
+        The p-value, equal to p_value_calc applied to the concatenated
+        chunks.
+
+        Returns
+        -------
+        p_value : nd-array
+            Array of p-values, shape of a chunk without the iteration axis.
+        """
+        if self._center is None and self._n_count != self._n_mean:
+            raise ValueError(f'The counting pass saw {self._n_count} '
+                             f'iterations but the mean pass saw '
+                             f'{self._n_mean}.')
+        return self._count / self._n_count
+
+
+def streaming_p_value(chunks, test_statistic=None, center=None, axis=0):
+    """
+    Calculate the p-value of p_value_calc from chunks of the resampled test
+    statistics without holding all of them in memory, using a
+    PValueAccumulator.
+
+    Parameters
+    ----------
+    chunks : function
+        A function with no arguments that returns an iterable over chunks
+        of the resampled test statistics. Called twice (once for the mean
+        and once for counting) if center is None, so the chunks it produces
+        must be the same each time (e.g. seeded).
+    test_statistic : int, float or nd-array
+        The test statistic to compare against.
+    center : int, float, nd-array or None
+        The known mean of the resampled distribution, if any, to count in a
+        single pass.
+    axis : int
+        The axis of each chunk holding the bootstrap or permutation
+        iterations.
+
+    Returns
+    -------
+    p_value : nd-array
+        Array of p-values, same shape as a chunk except reducing the given
+        axis.
+    """
+    accumulator = PValueAccumulator(test_statistic, center=center, axis=axis)
+
+    if center is None:
+        for chunk in chunks():
+            accumulator.update_mean(chunk)
+
+    for chunk in chunks():
+        accumulator.update(chunk)
+
+    return accumulator.p_value()
+
+
+# Correlation functions with a vectorized equivalent in the batch engine.
+_correlation_methods = {
+    'pearson' : stats.pearsonr,
+    'spearman': stats.spearmanr
+}
+
+
+def _resolve_correlation_method(corr):
+    """
+    Get the name of the batch correlation method matching a correlation
+    function (or name), raising a ValueError if there is none.
+    """
+    for method, func in _correlation_methods.items():
+        if corr == method or corr is func:
+            return method
+
+    raise ValueError(f'The batch engine only supports the correlation '
+                     f'functions {list(_correlation_methods)}, not {corr}. '
+                     f'Use engine="loop" for other correlation functions.')
+
+
+def _standardize_rows(data, method='pearson'):
+    """
+    Center each row of the data and scale it to unit norm, ranking it first
+    for a Spearman correlation, so that correlations become dot products.
+    Rows containing NaN's or with no variance become NaN.
+    """
+    data = np.atleast_2d(np.asarray(data, dtype=float))
+    # Older scipy versions rank NaN's as the largest values, so rows with
+    # NaN's are masked explicitly.
+    has_nans = np.isnan(data).any(axis=-1)
+
+    if method == 'spearman':
+        data = stats.rankdata(data, axis=-1)
+    data = np.where(has_nans[..., None], np.nan, data)
+
+    data = data - data.mean(axis=-1, keepdims=True)
+    norm = np.linalg.norm(data, axis=-1, keepdims=True)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return data / norm
+
+
+def _permutation_chunks(n_obs, n_permute, rng, chunk_size=1000):
+    """
+    Yield the permutation indices in chunks of at most chunk_size
+    permutations (rows). Every chunk is drawn from the same Generator in
+    order, so the permutations do not depend on the chunk size.
+    """
+    for start in range(0, n_permute, chunk_size):
+        n_chunk = min(chunk_size, n_permute - start)
+        yield rng.permuted(np.tile(np.arange(n_obs), (n_chunk, 1)), axis=1)
+
+
+def _correlation_block(rng, n_block, fixed, permuted, chunk_size=1000):
+    """
+    Compute the correlations between the standardized rows of fixed and
+    n_block permutations of the standardized permuted observations. Returns
+    an array of shape (n_block, rows).
+    """
+    corr_block = np.zeros((n_block, fixed.shape[0]))
+    start = 0
+    for perm_idx in _permutation_chunks(len(permuted), n_block, rng,
+                                        chunk_size=chunk_size):
+        stop = start + perm_idx.shape[0]
+        corr_block[start:stop] = permuted[perm_idx] @ fixed.T
+        start = stop
+
+    return corr_block
+
+
+def _permuted_correlations(fixed, permuted, n_permute, method='pearson',
+                           random_seed=None, chunk_size=1000, n_jobs=None):
+    """
+    Compute the correlations between each row of fixed and permutations of
+    permuted, in chunks of permutations. The permutations are drawn in
+    blocks with independent random streams (see parallel.parallel_resample),
+    so the result does not depend on chunk_size or n_jobs.
+
+    Parameters
+    ----------
+    fixed : 2d array
+        The un-permuted observations, of shape (rows, observations).
+    permuted : 1d array
+        The observations to permute, of shape (observations,).
+    n_permute : int
+        The number of permutations.
+    method : str
+        Either 'pearson' or 'spearman'.
+    random_seed : int
+        Random seed for reproducibility.
+    chunk_size : int
+        The number of permutations to compute at once.
+    n_jobs : int or None
+        The number of worker processes.
+
+    Returns
+    -------
+    test_correlations : 1d array
+        The correlation between each row of fixed and the un-permuted data,
+        of shape (rows,).
+    corr_dist : 2d array
+        The correlation for each row and permutation, of shape (rows,
+        n_permute).
+    """
+    fixed = _standardize_rows(fixed, method=method)
+    permuted = _standardize_rows(permuted, method=method)[0]
+
+    test_correlations = fixed @ permuted
+
+    corr_dist = parallel_resample(
+        _correlation_block, n_permute, args=(fixed, permuted),
+        kwargs=dict(chunk_size=chunk_size), random_seed=random_seed,
+        n_jobs=n_jobs
+    )
+
+    return test_correlations, corr_dist.T
+
+
+def _correlation_null_pass(task):
+    """
+    Stream the correlations of a run of permutation blocks into a
+    PValueAccumulator, for the mean (first pass, center None) or the counts
+    (second pass, given the center). Returns the accumulated sums or counts
+    and the number of permutations.
+    """
+    blocks, fixed, permuted, test_correlations, center, chunk_size = task
+
+    accumulator = PValueAccumulator(test_correlations, center=center)
+    for seed, n_block in blocks:
+        rng = np.random.default_rng(seed)
+        for perm_idx in _permutation_chunks(len(permuted), n_block, rng,
+                                            chunk_size=chunk_size):
+            chunk = permuted[perm_idx] @ fixed.T
+            if center is None:
+                accumulator.update_mean(chunk)
+            else:
+                accumulator.update(chunk)
+
+    if center is None:
+        return accumulator._sum, accumulator._n_mean
+    return accumulator._count, accumulator._n_count
+
+
+def _streamed_correlation_p_values(fixed, permuted, n_permute,
+                                   method='pearson', random_seed=None,
+                                   chunk_size=1000, n_jobs=None):
+    """
+    Compute the permutation p-values of _permuted_correlations (with the
+    same permutations) without holding the permutation distribution, in
+    two passes over the same seeded blocks: the first for the mean of each
+    row's distribution and the second for the counts of more extreme
+    correlations. Each worker gets a single run of blocks.
+
+    Returns
+    -------
+    test_correlations : 1d array
+        The correlation between each row of fixed and the un-permuted data.
+    p_values : 1d array
+        The permutation p-value of each row, as p_value_calc.
+    """
+    fixed = _standardize_rows(fixed, method=method)
+    permuted = _standardize_rows(permuted, method=method)[0]
+    test_correlations = fixed @ permuted
+
+    # The seeds are spawned once so that both passes see the same
+    # permutations, even without a random seed.
+    sizes = block_sizes(n_permute)
+    blocks = list(zip(spawn_seeds(random_seed, len(sizes)), sizes))
+    n_tasks = min(resolve_n_jobs(n_jobs), len(blocks))
+    runs = [list(run) for run in np.array_split(
+        np.arange(len(blocks)), n_tasks)]
+
+    def _pass(center):
+        results = parallel_map(
+            _correlation_null_pass,
+            [([blocks[i] for i in run], fixed, permuted, test_correlations,
+              center, chunk_size) for run in runs],
+            n_jobs=n_jobs
+        )
+        return sum(r[0] for r in results), sum(r[1] for r in results)
+
+    total, n_total = _pass(None)
+    counts, n_counted = _pass(total / n_total)
+
+    return test_correlations, counts / n_counted
+
+
+@profiled
 def correlation_permutation(group1, group2, n_permute=1000,
                             corr=stats.pearsonr, return_dist=False,
-                            random_seed=None):
+                            random_seed=None, engine='loop',
+                            chunk_size=1000, n_jobs=None):
     """
     Perform a permutation test for a correlation function. Performs the
     permutation by permuting only 1 group, to assess the null
     hypothesis that the group structure has a significant correlation.
 
+    The default 'loop' engine calls corr once per permutation and supports
+    any correlation function. The 'batch' engine draws the permutations
+    with a NumPy Generator and computes Pearson or Spearman correlations
+    for chunks of permutations at once with matrix operations. The two
+    engines use different random number generators, so their seeded
+    distributions differ, but each is reproducible for a given seed. The
+    'batch' engine can also split the permutations across a process pool
+    (n_jobs) without changing the seeded result.
+
     Parameters
     ----------
     group1 : 1d array
@@ -94,17 +646,30 @@ def correlation_permutation(group1, group2, n_permute=1000,
         The second group of observations, with equal shape to group1.
     n_permute : int
         The number of permutations to
-    corr : function
+    corr : function or str
         A correlation function that accepts 2 args (each a group of
         observations to calculate the correlation between) and returns a
         tuple with the first element being the correlation value and the
         second element being a p-value (which is ignored in favor of the
-        permutation calculated p-value). Need not be a scipy.stats function.
+        permutation calculated p-value). Need not be a scipy.stats function
+        for the 'loop' engine. The 'batch' engine requires stats.pearsonr,
+        stats.spearmanr, 'pearson' or 'spearman'.
     return_dist : bool, default False
         Whether to return the distribution of computed correlation values
         for each permutation.
     random_seed : int
         Random seed for reproducibility.
+    engine : str, default 'loop'
+        Either 'loop' (one corr call per permutation) or 'batch' (chunked
+        matrix computation).
+    chunk_size : int, default 1000
+        The number of permutations computed at once by the 'batch' engine.
+        Bounds the memory use to roughly chunk_size x len(group1) values
+        and does not change the result.
+    n_jobs : int or None
+        The number of worker processes used by the 'batch' engine (see
+        parallel.resolve_n_jobs). Does not change the result. The 'loop'
+        engine always runs in the calling process and ignores it.
 
     Returns
     -------
@@ -116,6 +681,28 @@ def correlation_permutation(group1, group2, n_permute=1000,
     (optionally) corr_dist : 1d array
         The distribution of correlation values from each permutation.
     """
+    if engine == 'batch':
+        test_correlation, corr_dist = _permuted_correlations(
+            group2, group1, n_permute,
+            method=_resolve_correlation_method(corr),
+            random_seed=random_seed, chunk_size=chunk_size, n_jobs=n_jobs
+        )
+        test_correlation = test_correlation[0]
+        corr_dist = corr_dist[0]
+        p_value = p_value_calc(corr_dist, test_statistic=test_correlation)
+
+        if return_dist:
+            return test_correlation, p_value, corr_dist
+        else:
+            return test_correlation, p_value
+
+    elif engine != 'loop':
+        raise ValueError(f'Unknown engine {engine}, must be "loop" or '
+                         f'"batch".')
+
+    if isinstance(corr, str):
+        corr = _correlation_methods[corr]
+
     # Set random number generator.
     random.seed(random_seed)
 
@@ -142,3 +729,780 @@ def correlation_permutation(group1, group2, n_permute=1000,
         return test_correlation, p_value, corr_dist
     else:
         return test_correlation, p_value
+
+
+@profiled
+def correlation_permutation_matrix(groups, target, n_permute=1000,
+                                   corr='pearson', return_dist=False,
+                                   random_seed=None, chunk_size=1000,
+                                   n_jobs=None):
+    """
+    Perform a permutation test for the correlation between each row of a
+    matrix of observations (e.g. electrodes x observations) and a single
+    target. One set of permutations of the target is shared by all rows,
+    and all rows are computed together for each chunk of permutations.
+    Unless return_dist is set, the permutation distribution is streamed
+    in two passes over the same seeded permutations instead of being held
+    in memory (see PValueAccumulator), with the same p-values.
+
+    Parameters
+    ----------
+    groups : 2d array
+        The observations for each row, of shape (rows, observations). Rows
+        containing NaN's or with no variance get NaN correlations and
+        p-values.
+    target : 1d array
+        The observations to correlate with each row and to permute, of
+        shape (observations,).
+    n_permute : int
+        The number of permutations.
+    corr : function or str, default 'pearson'
+        One of stats.pearsonr, stats.spearmanr, 'pearson' or 'spearman'.
+    return_dist : bool, default False
+        Whether to return the distribution of computed correlation values
+        for each row and permutation.
+    random_seed : int
+        Random seed for reproducibility.
+    chunk_size : int, default 1000
+        The number of permutations computed at once. Does not change the
+        result.
+    n_jobs : int or None
+        The number of worker processes (see parallel.resolve_n_jobs). Does
+        not change the result.
+
+    Returns
+    -------
+    test_correlations : 1d array
+        The correlation between each un-permuted row and the target, of
+        shape (rows,).
+    p_values : 1d array
+        The permutation p-value for each row, of shape (rows,). Can be
+        passed directly to fdr_omitnans.
+    (optionally) corr_dist : 2d array
+        The correlation for each row and permutation, of shape (rows,
+        n_permute).
+    """
+    method = _resolve_correlation_method(corr)
+
+    if not return_dist:
+        # Stream the distribution instead of holding it.
+        test_correlations, p_values = _streamed_correlation_p_values(
+            groups, target, n_permute, method=method,
+            random_seed=random_seed, chunk_size=chunk_size, n_jobs=n_jobs
+        )
+        p_values[np.isnan(test_correlations)] = np.nan
+        return test_correlations, p_values
+
+    test_correlations, corr_dist = _permuted_correlations(
+        groups, target, n_permute, method=method,
+        random_seed=random_seed, chunk_size=chunk_size, n_jobs=n_jobs
+    )
+
+    p_values = p_value_calc(corr_dist.T, test_statistic=test_correlations,
+                            axis=0)
+    p_values[np.isnan(test_correlations)] = np.nan
+
+    return test_correlations, p_values, corr_dist
+
+
+@profiled
+def sequential_correlation_permutation(groups, target, max_permute=10000,
+                                       alpha=0.05, rule='binomial',
+                                       error_rate=0.001, h=10,
+                                       corr='pearson', batch_size=100,
+                                       random_seed=None):
+    """
+    Perform a permutation test for the correlation between each row of a
+    matrix of observations and a single target (like
+    correlation_permutation_matrix), stopping the permutations for each row
+    as soon as its p-value is decided.
+
+    Permutations of the target are drawn in batches shared by all rows
+    that have not stopped. A resampled correlation counts as more extreme
+    when its absolute value exceeds the absolute test correlation (the
+    permutation distribution of a correlation is centered on 0). Two
+    stopping rules are available:
+
+    'binomial'
+        Stop once a Clopper-Pearson confidence interval for the p-value
+        lies entirely below or above alpha. The interval level is
+        Bonferroni corrected for the number of looks, so the probability
+        that a row is decided on the wrong side of alpha is at most
+        error_rate. The p-value is the fraction of more extreme
+        permutations, as in p_value_calc.
+    'besag_clifford'
+        Besag & Clifford (1991) sequential Monte Carlo p-values. Stop once
+        h more extreme permutations have been seen after L permutations,
+        giving p = h / L, otherwise p = (g + 1) / (max_permute + 1) for
+        the g more extreme permutations seen. Does not depend on alpha.
+
+    Parameters
+    ----------
+    groups : 2d array
+        The observations for each row, of shape (rows, observations). Rows
+        containing NaN's or with no variance get NaN correlations and
+        p-values.
+    target : 1d array
+        The observations to correlate with each row and to permute, of
+        shape (observations,).
+    max_permute : int
+        The maximum number of permutations for any row.
+    alpha : float
+        The significance level to decide at, for the 'binomial' rule.
+    rule : str, default 'binomial'
+        The stopping rule, either 'binomial' or 'besag_clifford'.
+    error_rate : float
+        The bound on the probability of a wrong decision per row, for the
+        'binomial' rule.
+    h : int
+        The number of more extreme permutations to stop at, for the
+        'besag_clifford' rule.
+    corr : function or str, default 'pearson'
+        One of stats.pearsonr, stats.spearmanr, 'pearson' or 'spearman'.
+    batch_size : int
+        The number of permutations between checks of the stopping rule.
+    random_seed : int
+        Random seed for reproducibility.
+
+    Returns
+    -------
+    test_correlations : 1d array
+        The correlation between each un-permuted row and the target, of
+        shape (rows,).
+    p_values : 1d array
+        The sequential p-value for each row, of shape (rows,). Can be
+        passed directly to fdr_omitnans.
+    n_permutations : 1d array of ints
+        The number of permutations actually used for each row (L for rows
+        stopped by the 'besag_clifford' rule).
+    """
+    if rule not in ['binomial', 'besag_clifford']:
+        raise ValueError(f'Unknown rule {rule}, must be "binomial" or '
+                         f'"besag_clifford".')
+
+    method = _resolve_correlation_method(corr)
+    fixed = _standardize_rows(groups, method=method)
+    permuted = _standardize_rows(target, method=method)[0]
+    test_correlations = fixed @ permuted
+    threshold = np.abs(test_correlations)
+
+    n_rows = fixed.shape[0]
+    n_exceed = np.zeros(n_rows, dtype=int)
+    n_permutations = np.zeros(n_rows, dtype=int)
+    p_values = np.full(n_rows, np.nan)
+
+    # Each look at the data uses a share of the error rate.
+    n_looks = int(np.ceil(max_permute / batch_size))
+    look_error = error_rate / n_looks
+
+    active = ~np.isnan(test_correlations)
+    rng = np.random.default_rng(random_seed)
+    for perm_idx in _permutation_chunks(len(permuted), max_permute, rng,
+                                        chunk_size=batch_size):
+        rows = np.where(active)[0]
+        if len(rows) == 0:
+            break
+
+        corr_batch = fixed[rows] @ permuted[perm_idx].T
+        exceeds = np.abs(corr_batch) > threshold[rows, None]
+        previous = n_exceed[rows]
+        n_exceed[rows] += np.sum(exceeds, axis=1)
+        n_permutations[rows] += perm_idx.shape[0]
+
+        k, n = n_exceed[rows], n_permutations[rows]
+        if rule == 'binomial':
+            # The interval bounds are 0 and 1 at k = 0 and k = n.
+            lower, upper = np.zeros(len(rows)), np.ones(len(rows))
+            lower[k > 0] = stats.beta.ppf(look_error / 2, k[k > 0],
+                                          n[k > 0] - k[k > 0] + 1)
+            upper[k < n] = stats.beta.ppf(1 - look_error / 2, k[k < n] + 1,
+                                          n[k < n] - k[k < n])
+            decided = (upper < alpha) | (lower > alpha)
+            p_values[rows[decided]] = k[decided] / n[decided]
+        else:
+            # L is the permutation that gave the h-th more extreme
+            # correlation, not the end of the batch.
+            decided = k >= h
+            reached = np.cumsum(exceeds[decided], axis=1) >= \
+                (h - previous[decided])[:, None]
+            stop = n[decided] - perm_idx.shape[0] + \
+                np.argmax(reached, axis=1) + 1
+            p_values[rows[decided]] = h / stop
+            n_permutations[rows[decided]] = stop
+
+        active[rows[decided]] = False
+
+    # Rows still undecided after max_permute permutations.
+    rows = np.where(active)[0]
+    if rule == 'binomial':
+        p_values[rows] = n_exceed[rows] / n_permutations[rows]
+    else:
+        p_values[rows] = (n_exceed[rows] + 1) / (max_permute + 1)
+
+    return test_correlations, p_values, n_permutations
+
+
+def _group_codes(keys):
+    """
+    Get integer codes for the groups formed by one key or a list of keys,
+    and the sorted group labels (tuples for several keys).
+    """
+    if isinstance(keys, list):
+        return pd.MultiIndex.from_arrays(
+            [np.asarray(key) for key in keys]
+        ).factorize(sort=True)
+    return pd.factorize(np.asarray(keys), sort=True)
+
+
+def _bootstrap_counts(rng, n_boot, n_obs, cells, cluster_codes=None):
+    """
+    Draw the number of times each observation is resampled in each
+    bootstrap, resampling with replacement within each cell (a list of
+    positions). Without cluster codes the cells hold observations; with
+    them the cells hold clusters, which are resampled whole.
+    """
+    n_units = n_obs if cluster_codes is None else cluster_codes.max() + 1
+    counts = np.zeros((n_boot, n_units), dtype=np.int32)
+
+    for positions in cells:
+        n = len(positions)
+        counts[:, positions] = rng.multinomial(n, np.full(n, 1 / n),
+                                               size=n_boot)
+
+    if cluster_codes is not None:
+        counts = counts[:, cluster_codes]
+    return counts
+
+
+def _weighted_median(counts, values, max_elements=2 ** 22):
+    """
+    Compute the median of the values repeated by each row of counts, for
+    values of shape (observations, ...). The rows of counts are processed
+    in chunks of at most max_elements (rows x values) at a time.
+    """
+    shape = values.shape[1:]
+    values = values.reshape(values.shape[0], -1)
+
+    order = np.argsort(values, axis=0)
+    sorted_values = np.take_along_axis(values, order, axis=0)[None]
+
+    medians = np.zeros((counts.shape[0], values.shape[1]))
+    chunk_size = max(1, max_elements // max(values.size, 1))
+    for start in range(0, counts.shape[0], chunk_size):
+        stop = min(start + chunk_size, counts.shape[0])
+        cumulative = np.cumsum(counts[start:stop, order], axis=1)
+        total = cumulative[:, -1]
+
+        # The two middle order statistics (the same one for odd totals).
+        for k in [(total + 1) // 2, total // 2 + 1]:
+            idx = np.argmax(cumulative >= k[:, None], axis=1)
+            medians[start:stop] += np.take_along_axis(
+                sorted_values, idx[:, None], axis=1
+            )[:, 0] / 2
+        medians[start:stop][total == 0] = np.nan
+
+    return medians.reshape(-1, *shape)
+
+
+def _grouped_statistic(counts, values, group_positions, statistic='mean'):
+    """
+    Compute the statistic of the values repeated by each row of counts, for
+    every group at once.
+
+    Returns
+    -------
+    statistics : nd-array
+        The statistics, of shape (rows of counts, groups, ...).
+    """
+    results = []
+    for positions in group_positions:
+        group_counts = counts[:, positions]
+        group_values = values[positions]
+
+        if statistic == 'median':
+            results.append(_weighted_median(group_counts, group_values))
+            continue
+
+        total = group_counts.sum(axis=1).reshape(
+            -1, *[1] * (group_values.ndim - 1)
+        )
+        with np.errstate(invalid='ignore', divide='ignore'):
+            results.append(np.tensordot(group_counts, group_values, axes=1) /
+                           total)
+
+    return np.stack(results, axis=1)
+
+
+def _bootstrap_block(rng, n_block, values, group_positions, cells,
+                     cluster_codes, statistic):
+    """
+    Compute a block of bootstrapped group statistics (see
+    parallel.parallel_resample).
+    """
+    counts = _bootstrap_counts(rng, n_block, values.shape[0], cells,
+                               cluster_codes=cluster_codes)
+    return _grouped_statistic(counts, values, group_positions,
+                              statistic=statistic)
+
+
+@profiled
+def bootstrap(values, groups=None, strata=None, clusters=None,
+              statistic='mean', n_boot=1000, random_seed=None,
+              block_size=1000, n_jobs=None):
+    """
+    Bootstrap the mean or median of every group of observations at once.
+    Observations are resampled with replacement within each group (and
+    within each stratum, if given), or, given clusters (e.g. the subject of
+    each electrode), whole clusters are resampled (within each stratum, if
+    given) and bring all their observations, in every group.
+
+    For example, the mean correlation per region with subjects resampled:
+
+    >>> means, dist, regions = bootstrap(df.correlation.values,
+    ...                                  groups=df.fancy_location.values,
+    ...                                  clusters=df.subject.values)
+    >>> ci_low, ci_high = bootstrap_ci(dist)
+
+    Parameters
+    ----------
+    values : nd-array
+        The observations, of shape (observations, ...), e.g. a value or a
+        time course per electrode. Should not contain NaN's.
+    groups : 1d array, list of 1d arrays or None
+        The group of each observation, or several keys whose combinations
+        form the groups. None treats all observations as one group.
+    strata : 1d array or None
+        The stratum of each observation (or of each cluster), within which
+        resampling preserves the number of observations (or clusters).
+    clusters : 1d array or None
+        The cluster of each observation, to resample whole clusters.
+    statistic : str, default 'mean'
+        'mean' or 'median'.
+    n_boot : int
+        The number of bootstraps.
+    random_seed : int or None
+        Random seed for reproducibility.
+    block_size : int, default 1000
+        The number of bootstraps per block (see parallel.parallel_resample).
+    n_jobs : int or None
+        The number of worker processes, see parallel.resolve_n_jobs.
+
+    Returns
+    -------
+    estimates : nd-array
+        The statistic of each group, of shape (groups, ...), without the
+        group axis if groups is None.
+    dist : nd-array
+        The bootstrap distribution, of shape (n_boot, groups, ...), without
+        the group axis if groups is None.
+    labels : 1d array or None
+        The sorted group labels (tuples for several keys), or None if groups
+        is None.
+    """
+    if statistic not in ['mean', 'median']:
+        raise ValueError(f'Unknown statistic {statistic}, use "mean" or '
+                         f'"median".')
+
+    values = np.asarray(values, dtype=float)
+    n_obs = values.shape[0]
+
+    if groups is None:
+        group_codes, labels = np.zeros(n_obs, dtype=int), None
+    else:
+        group_codes, labels = _group_codes(groups)
+    group_positions = [np.flatnonzero(group_codes == g)
+                       for g in range(group_codes.max() + 1)]
+
+    strata_codes = np.zeros(n_obs, dtype=int) if strata is None else \
+        _group_codes(strata)[0]
+
+    if clusters is None:
+        # Resample observations within each group and stratum.
+        cell_codes = _group_codes([group_codes, strata_codes])[0]
+        cluster_codes = None
+    else:
+        # Resample clusters within each stratum, taking the stratum of a
+        # cluster from its first observation.
+        cluster_codes, _ = _group_codes(clusters)
+        first = np.unique(cluster_codes, return_index=True)[1]
+        cell_codes = strata_codes[first]
+    cells = [np.flatnonzero(cell_codes == c)
+             for c in range(cell_codes.max() + 1)]
+
+    estimates = _grouped_statistic(np.ones((1, n_obs), dtype=int), values,
+                                   group_positions, statistic=statistic)[0]
+    dist = parallel_resample(
+        _bootstrap_block, n_boot,
+        args=(values, group_positions, cells, cluster_codes, statistic),
+        random_seed=random_seed, block_size=block_size, n_jobs=n_jobs
+    )
+
+    if groups is None:
+        return estimates[0], dist[:, 0], None
+    return estimates, dist, labels
+
+
+def bootstrap_ci(dist, ci=95, axis=0):
+    """
+    Compute percentile confidence intervals from a bootstrap distribution.
+
+    Parameters
+    ----------
+    dist : nd-array
+        The bootstrap distribution.
+    ci : float, default 95
+        The confidence level, in percent.
+    axis : int
+        The axis holding the bootstraps.
+
+    Returns
+    -------
+    ci_low : nd-array
+        The lower bounds, same shape as dist except reducing the given
+        axis.
+    ci_high : nd-array
+        The upper bounds.
+    """
+    ci_low, ci_high = np.nanpercentile(dist, [(100 - ci) / 2,
+                                              (100 + ci) / 2], axis=axis)
+    return ci_low, ci_high
+
+
+@profiled
+def bootstrap_table(df, value, by=None, strata=None, cluster=None,
+                    statistic='mean', n_boot=1000, ci=95, reference=None,
+                    random_seed=None, block_size=1000, n_jobs=None,
+                    return_dist=False):
+    """
+    Bootstrap the mean or median of a column of an electrode table for
+    every group at once (see bootstrap), with confidence intervals and,
+    optionally, the difference of each group from a reference group. The
+    table can be computed once (e.g. memoized with cache.cached) and
+    plotted as error bars, instead of bootstrapping on every redraw:
+
+    >>> summary = cached(bootstrap_table)(df, 'correlation',
+    ...                                   by='fancy_location',
+    ...                                   cluster='subject', random_seed=0)
+    >>> ax.errorbar(summary.fancy_location, summary.estimate,
+    ...             yerr=[summary.estimate - summary.ci_low,
+    ...                   summary.ci_high - summary.estimate])
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The table. Rows where the value is NaN are dropped.
+    value : str
+        The column to summarize.
+    by : str, list of str or None
+        The column(s) defining the groups. None summarizes all rows.
+    strata : str or None
+        The column to stratify the resampling by (see bootstrap).
+    cluster : str or None
+        The column of clusters (e.g. 'subject') to resample whole.
+    statistic : str, default 'mean'
+        'mean' or 'median'.
+    n_boot : int
+        The number of bootstraps.
+    ci : float, default 95
+        The confidence level, in percent.
+    reference : label or None
+        The group to compare every group against (a tuple for several by
+        columns). The differences come from the same bootstraps.
+    random_seed : int or None
+        Random seed for reproducibility.
+    block_size : int, default 1000
+        The number of bootstraps per block (see parallel.parallel_resample).
+    n_jobs : int or None
+        The number of worker processes, see parallel.resolve_n_jobs.
+    return_dist : bool, default False
+        Whether to also return the bootstrap distribution.
+
+    Returns
+    -------
+    summary : pd.DataFrame
+        A row per group with the by columns, the number of rows n, the
+        estimate, ci_low and ci_high and, given a reference, the
+        difference, difference_ci_low, difference_ci_high and the
+        bootstrap p-value of the difference, difference_p (see
+        p_value_calc).
+    dist : 2d array
+        The bootstrap distribution, of shape (n_boot, groups), if
+        return_dist is True.
+    """
+    df = df.loc[df[value].notna()]
+    by_columns = [] if by is None else list(np.atleast_1d(by))
+
+    if by is None:
+        groups = None
+    elif isinstance(by, str):
+        groups = df[by].values
+    else:
+        groups = [df[col].values for col in by_columns]
+
+    estimates, dist, labels = bootstrap(
+        df[value].values, groups=groups,
+        strata=None if strata is None else df[strata].values,
+        clusters=None if cluster is None else df[cluster].values,
+        statistic=statistic, n_boot=n_boot, random_seed=random_seed,
+        block_size=block_size, n_jobs=n_jobs
+    )
+
+    if groups is not None:
+        summary = pd.DataFrame(
+            {by: labels} if isinstance(by, str) else list(labels),
+            columns=by_columns
+        )
+        summary['n'] = np.bincount(_group_codes(groups)[0])
+    else:
+        estimates, dist = np.atleast_1d(estimates), dist[:, None]
+        summary = pd.DataFrame({'n': [df.shape[0]]})
+
+    summary['estimate'] = estimates
+    summary['ci_low'], summary['ci_high'] = bootstrap_ci(dist, ci=ci)
+
+    if reference is not None:
+        ref_idx = list(labels).index(reference)
+        difference = estimates - estimates[ref_idx]
+        diff_dist = dist - dist[:, [ref_idx]]
+
+        summary['difference'] = difference
+        summary['difference_ci_low'], summary['difference_ci_high'] = \
+            bootstrap_ci(diff_dist, ci=ci)
+        with np.errstate(invalid='ignore'):
+            summary['difference_p'] = p_value_calc(diff_dist,
+                                                   test_statistic=0, axis=0)
+        summary.loc[ref_idx, 'difference_p'] = np.nan
+
+    if return_dist:
+        return summary, dist
+    return summary
+
+
+def _cluster_masses(stat, mask):
+    """
+    Find the clusters (runs of True along the last axis) of a 2d mask and
+    sum the test statistic within each, for all rows at once.
+
+    Returns
+    -------
+    rows, starts, stops : 1d arrays of ints
+        The row, first index and last index + 1 of each cluster.
+    masses : 1d array
+        The sum of the statistic within each cluster.
+    """
+    edges = np.diff(np.pad(mask, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, stops = np.nonzero(edges == -1)
+
+    cumulative = np.pad(np.cumsum(np.where(mask, stat, 0), axis=1),
+                        ((0, 0), (1, 0)))
+    masses = cumulative[rows, stops] - cumulative[rows, starts]
+
+    return rows, starts, stops, masses
+
+
+def _tail_masks(stat, threshold, tail):
+    """
+    Get the (sign, mask) pairs of the supra-threshold samples for each tail
+    being tested.
+    """
+    masks = []
+    if tail >= 0:
+        masks.append((1, stat > threshold))
+    if tail <= 0:
+        masks.append((-1, stat < -threshold))
+    return masks
+
+
+def _max_cluster_mass(stat, threshold, tail):
+    """
+    Get the largest absolute cluster mass in each row of a 2d statistic.
+    """
+    max_mass = np.zeros(stat.shape[0])
+    for sign, mask in _tail_masks(stat, threshold, tail):
+        rows, _, _, masses = _cluster_masses(sign * stat, mask)
+        np.maximum.at(max_mass, rows, masses)
+    return max_mass
+
+
+def _two_sample_statistic(sum1, sumsq1, total, total_sq, n1, n2, stat='f'):
+    """
+    Compute the pooled-variance two-sample t (or F = t ** 2) statistic from
+    the sums and sums of squares of group 1 and of all observations.
+    """
+    sum2, sumsq2 = total - sum1, total_sq - sumsq1
+    mean1, mean2 = sum1 / n1, sum2 / n2
+    pooled_var = (sumsq1 - sum1 * mean1 + sumsq2 - sum2 * mean2) / \
+                 (n1 + n2 - 2)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = (mean1 - mean2) / np.sqrt(pooled_var * (1 / n1 + 1 / n2))
+
+    return t ** 2 if stat == 'f' else t
+
+
+def _cluster_null_block(task):
+    """
+    Compute the permutation distribution of the maximum cluster mass for a
+    block of electrodes. Every block draws the same permutations from the
+    shared seed.
+
+    Returns an array of shape (electrodes, n_permute).
+    """
+    data, n1, n_permute, stat, threshold, tail, seed, chunk_size = task
+    n_obs, n_elecs, n_times = data.shape
+    n2 = n_obs - n1
+
+    flat = data.reshape(n_obs, -1)
+    flat_sq = flat ** 2
+    total, total_sq = flat.sum(axis=0), flat_sq.sum(axis=0)
+
+    null = np.zeros((n_elecs, n_permute))
+    rng = np.random.default_rng(seed)
+    start = 0
+    for perm_idx in _permutation_chunks(n_obs, n_permute, rng,
+                                        chunk_size=chunk_size):
+        stop = start + perm_idx.shape[0]
+
+        # Indicator of the observations assigned to group 1.
+        group1 = (perm_idx < n1).astype(float)
+        perm_stat = _two_sample_statistic(
+            group1 @ flat, group1 @ flat_sq, total, total_sq, n1, n2,
+            stat=stat
+        )
+        perm_stat = np.nan_to_num(perm_stat).reshape(-1, n_times)
+        null[:, start:stop] = _max_cluster_mass(
+            perm_stat, threshold, tail
+        ).reshape(stop - start, n_elecs).T
+        start = stop
+
+    return null
+
+
+@profiled
+def cluster_permutation_test(data1, data2, n_permute=1000, stat='f', tail=0,
+                             threshold=None, electrodes=None, times=None,
+                             random_seed=None, block_size=50,
+                             chunk_size=100, n_jobs=None):
+    """
+    Perform a cluster-based permutation test between two conditions for
+    many electrodes' time series at once, in the manner of
+    mne.stats.permutation_cluster_test with the default (one-way F) test
+    statistic and temporal clusters.
+
+    The trial labels are permuted, and the test statistic for every
+    permutation, electrode and time point is computed from matrix products
+    of the permuted group indicators with the trial data. Clusters are
+    contiguous supra-threshold time points, labeled for all permutations
+    at once, and each cluster's p-value is the fraction of permutations
+    whose maximum cluster mass (for that electrode) is at least the
+    cluster's mass, counting the observed labeling as one of them (as MNE
+    does), so that p-values are never 0. All electrodes share the same
+    permutations. Blocks of
+    electrodes can run in parallel without changing the result.
+
+    Parameters
+    ----------
+    data1 : 3d array
+        The trials of condition 1, of shape (trials, electrodes, times).
+    data2 : 3d array
+        The trials of condition 2, of shape (trials, electrodes, times).
+    n_permute : int
+        The number of permutations.
+    stat : str, default 'f'
+        The test statistic, either 'f' (one-way F, as in MNE) or 't'
+        (pooled-variance two-sample t).
+    tail : int, default 0
+        For the 't' statistic, 0 tests both tails, 1 tests condition 1 >
+        condition 2 and -1 tests condition 1 < condition 2. Ignored for
+        'f', which is always upper-tailed.
+    threshold : float or None
+        The cluster-forming threshold. None uses the statistic at p < 0.05
+        (split between tails for a two-tailed t).
+    electrodes : list or None
+        Labels for the electrodes (e.g. subject_electrode), defaulting to
+        their indices.
+    times : 1d array or None
+        Time of each sample, defaulting to the sample indices.
+    random_seed : int
+        Random seed for reproducibility.
+    block_size : int
+        The number of electrodes per parallel task.
+    chunk_size : int
+        The number of permutations computed at once within a task.
+    n_jobs : int or None
+        The number of worker processes (see parallel.resolve_n_jobs).
+
+    Returns
+    -------
+    clusters : pd.DataFrame
+        One row per observed cluster with the columns electrode, cluster,
+        start and stop (sample indices, stop exclusive), tmin and tmax,
+        mass (signed sum of the statistic), p_value and mask (a boolean
+        array over the time samples).
+    """
+    if stat not in ['f', 't']:
+        raise ValueError(f'Unknown stat {stat}, must be "f" or "t".')
+    if stat == 'f':
+        tail = 1
+
+    data1 = np.asarray(data1, dtype=float)
+    data2 = np.asarray(data2, dtype=float)
+    n1, n2 = data1.shape[0], data2.shape[0]
+    _, n_elecs, n_times = data1.shape
+
+    if threshold is None:
+        if stat == 'f':
+            threshold = stats.f.ppf(1 - 0.05, 1, n1 + n2 - 2)
+        else:
+            threshold = stats.t.ppf(1 - 0.05 / (2 if tail == 0 else 1),
+                                    n1 + n2 - 2)
+
+    electrodes = np.arange(n_elecs) if electrodes is None else \
+        np.asarray(electrodes)
+    times = np.arange(n_times) if times is None else np.asarray(times)
+
+    # Center each electrode and time point for numerical stability (the
+    # statistic does not depend on it).
+    data = np.concatenate([data1, data2], axis=0)
+    data -= data.mean(axis=0)
+
+    # Observed statistic.
+    obs_stat = _two_sample_statistic(
+        data[:n1].sum(axis=0), (data[:n1] ** 2).sum(axis=0),
+        data.sum(axis=0), (data ** 2).sum(axis=0), n1, n2, stat=stat
+    )
+    obs_stat = np.nan_to_num(obs_stat)
+
+    # Permutation distribution of the max cluster mass, per electrode.
+    seed = np.random.SeedSequence(random_seed)
+    tasks = [(data[:, start:start + block_size], n1, n_permute, stat,
+              threshold, tail, seed, chunk_size)
+             for start in range(0, n_elecs, block_size)]
+    null = np.concatenate(parallel_map(_cluster_null_block, tasks,
+                                       n_jobs=n_jobs), axis=0)
+
+    results = {key: [] for key in ['electrode', 'cluster', 'start', 'stop',
+                                   'tmin', 'tmax', 'mass', 'p_value',
+                                   'mask']}
+    cluster_count = np.zeros(n_elecs, dtype=int)
+    for sign, mask in _tail_masks(obs_stat, threshold, tail):
+        rows, starts, stops, masses = _cluster_masses(sign * obs_stat, mask)
+        for row, start, stop, mass in zip(rows, starts, stops, masses):
+            cluster_mask = np.zeros(n_times, dtype=bool)
+            cluster_mask[start:stop] = True
+
+            results['electrode'].append(electrodes[row])
+            results['cluster'].append(cluster_count[row])
+            results['start'].append(start)
+            results['stop'].append(stop)
+            results['tmin'].append(times[start])
+            results['tmax'].append(times[stop - 1])
+            results['mass'].append(sign * mass)
+            results['p_value'].append(
+                (1 + np.sum(null[row] >= mass)) / (n_permute + 1)
+            )
+            results['mask'].append(cluster_mask)
+            cluster_count[row] += 1
+
+    return pd.DataFrame(data=results)
@@ -2,10 +2,26 @@
 """
 Parameters and information for stimulation sties.
 
+stim_pairs is compiled into a table of stimulation sites (stim_site_table),
+whose coordinates are looked up against an electrode table in one merge
+(stim_site_coordinates), and ElectrodeIndex holds a KD-tree over the
+electrode coordinates, so the electrodes near every stimulation site of
+every subject are found in one batched query:
+
+>>> sites = stim_site_coordinates(total_edf, coords=('warp_x', 'warp_y'))
+>>> index = ElectrodeIndex(total_edf, coords=('warp_x', 'warp_y'))
+>>> near = index.neighbors(sites[['warp_x', 'warp_y']].values, radius=20,
+...                        subjects=sites.subject.values)
+
 :Author: Jessie R. Liu
 :Copyright: Copyright (c) 2021, Jessie R. Liu, All rights reserved.
 """
 
+# Third party libraries
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
 # these are 1-indexed
 stim_pairs = {
     'EC260': {
@@ -233,3 +249,232 @@ stim_pairs = {
         }
     }
 }
+
+_deficit_keys = ['inconsistent_seq_deficit', 'seq_deficit', 'motor_deficit',
+                 'higher_amp_motor_deficit']
+
+
+def stim_site_table(pairs=None):
+    """
+    Compile the stimulation pairs into a table with a row per site.
+
+    Parameters
+    ----------
+    pairs : dictionary or None
+        The stimulation pairs, by subject and pair, in the layout of
+        stim_pairs. Defaults to stim_pairs.
+
+    Returns
+    -------
+    sites : pd.DataFrame
+        The columns subject, pair, elec1 and elec2 (the 0-indexed research
+        electrodes of the pair), center (the 0-indexed center electrode,
+        -1 if it is interpolated), is_interpolated (whether the center is
+        the midpoint of the pair), inconsistent_seq_deficit, seq_deficit,
+        motor_deficit, higher_amp_motor_deficit (True, False or
+        'not_tested', None if not given) and other_deficit (None if none).
+    """
+    pairs = stim_pairs if pairs is None else pairs
+
+    rows = []
+    for subject, subject_pairs in pairs.items():
+        for pair, info in subject_pairs.items():
+            center = info['center_research_elec']
+            is_interpolated = center == 'interpolate'
+            row = {
+                'subject'        : subject,
+                'pair'           : pair,
+                'elec1'          : info['research_elecs'][0] - 1,
+                'elec2'          : info['research_elecs'][1] - 1,
+                'center'         : -1 if is_interpolated else center - 1,
+                'is_interpolated': is_interpolated,
+            }
+            row.update({key: info.get(key) for key in _deficit_keys})
+            row['other_deficit'] = info.get('other_deficit')
+            rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+def stim_site_coordinates(electrode_df, sites=None, coords=('x', 'y')):
+    """
+    Add the coordinates of every stimulation site: those of its center
+    electrode, or the midpoint of its pair of electrodes if the center is
+    interpolated.
+
+    Parameters
+    ----------
+    electrode_df : pd.DataFrame
+        The electrodes, with the columns subject, electrode (0-indexed) and
+        the coordinates (e.g. all_anatomical_info.h5).
+    sites : pd.DataFrame or None
+        The sites, from stim_site_table. Defaults to all of stim_pairs.
+    coords : list of str
+        The coordinate columns of electrode_df.
+
+    Returns
+    -------
+    sites : pd.DataFrame
+        The sites, with the coordinate columns added. The coordinates of
+        sites whose electrodes are not in electrode_df are NaN.
+    """
+    sites = stim_site_table() if sites is None else sites
+    coords = list(coords)
+    lookup = electrode_df.drop_duplicates(['subject', 'electrode']) \
+        .set_index(['subject', 'electrode'])[coords]
+
+    def _lookup(column):
+        index = pd.MultiIndex.from_arrays([sites.subject.values,
+                                           sites[column].values])
+        return lookup.reindex(index).values
+
+    midpoint = (_lookup('elec1') + _lookup('elec2')) / 2
+    center = _lookup('center')
+    is_interpolated = sites.is_interpolated.values.astype(bool)
+
+    values = np.where(is_interpolated[:, None], midpoint, center)
+    return sites.assign(**{c: values[:, i] for i, c in enumerate(coords)})
+
+
+class ElectrodeIndex:
+    """
+    A KD-tree over the coordinates of the electrodes of every subject, for
+    batched radius queries (e.g. the recording electrodes near each
+    stimulation site).
+
+    Parameters
+    ----------
+    electrode_df : pd.DataFrame
+        The electrodes, with the columns subject, electrode and the
+        coordinates. Electrodes with missing coordinates are left out.
+    coords : list of str
+        The coordinate columns.
+    """
+
+    def __init__(self, electrode_df, coords=('x', 'y')):
+        coords = list(coords)
+        located = electrode_df[coords].notna().all(axis=1).values
+
+        self.coords = coords
+        self.electrode_df = electrode_df
+        self.rows = np.flatnonzero(located)
+        electrode_df = electrode_df.loc[located]
+        self.subjects = electrode_df.subject.values
+        self.electrodes = electrode_df.electrode.values
+        self.positions = electrode_df.index.values
+        self.tree = cKDTree(electrode_df[coords].values.astype(float))
+
+    def _pairs(self, points, radius, subjects=None):
+        """
+        The point and electrode (tree) indices of every electrode within
+        radius of every point, and their distances.
+        """
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+        hits = self.tree.query_ball_point(points, radius)
+
+        lengths = np.array([len(h) for h in hits], dtype=int)
+        point_idx = np.repeat(np.arange(len(points)), lengths)
+        tree_idx = np.concatenate(
+            [np.asarray(h, dtype=int) for h in hits] + [np.zeros(0, int)]
+        )
+
+        if subjects is not None:
+            same = self.subjects[tree_idx] == np.asarray(subjects)[point_idx]
+            point_idx, tree_idx = point_idx[same], tree_idx[same]
+
+        distance = np.linalg.norm(points[point_idx] -
+                                  self.tree.data[tree_idx], axis=1)
+        return point_idx, tree_idx, distance
+
+    def neighbors(self, points, radius, subjects=None):
+        """
+        Find the electrodes within radius of every point.
+
+        Parameters
+        ----------
+        points : 2d array
+            The points, of shape (points, coordinates) (e.g. the stimulation
+            site coordinates). Points with NaN coordinates have no
+            neighbors.
+        radius : float
+            The radius, in the units of the coordinates.
+        subjects : 1d array or None
+            The subject of each point, to keep only the electrodes of the
+            same subject. None keeps the electrodes of every subject.
+
+        Returns
+        -------
+        neighbors : pd.DataFrame
+            A row per point and electrode within the radius, with the
+            columns point (the row of the point), subject, electrode,
+            position (the electrode's index in electrode_df) and distance,
+            sorted by point and distance.
+        """
+        point_idx, tree_idx, distance = self._pairs(points, radius,
+                                                    subjects=subjects)
+        order = np.lexsort((distance, point_idx))
+
+        return pd.DataFrame({
+            'point'    : point_idx[order],
+            'subject'  : self.subjects[tree_idx[order]],
+            'electrode': self.electrodes[tree_idx[order]],
+            'position' : self.positions[tree_idx[order]],
+            'distance' : distance[order],
+        })
+
+    def counts(self, points, radius, weights=None, subjects=None):
+        """
+        Count (or sum the weights of) the electrodes within radius of every
+        point, for one or many weight vectors at once (e.g. the overlap of
+        sequence and reaction time electrodes around each stimulation site
+        or over a grid of points).
+
+        Parameters
+        ----------
+        points : 2d array
+            The points, of shape (points, coordinates).
+        radius : float
+            The radius, in the units of the coordinates.
+        weights : str, list of str, 1d or 2d array or None
+            The weights of the electrodes: the column(s) of electrode_df
+            holding them, or an array with a value for every row of
+            electrode_df (including the electrodes with missing
+            coordinates), of shape (electrodes,) or (weight vectors,
+            electrodes). None counts the electrodes.
+        subjects : 1d array or None
+            The subject of each point, to keep only the electrodes of the
+            same subject.
+
+        Returns
+        -------
+        counts : 1d or 2d array
+            The count or summed weights of every point, of shape (points,)
+            or (weight vectors, points).
+        """
+        n_points = len(np.atleast_2d(points))
+        point_idx, tree_idx, _ = self._pairs(points, radius,
+                                             subjects=subjects)
+
+        if weights is None:
+            return np.bincount(point_idx, minlength=n_points)
+
+        if isinstance(weights, str):
+            weights = self.electrode_df[weights].values
+        elif isinstance(weights, list) and all(isinstance(w, str)
+                                               for w in weights):
+            weights = self.electrode_df[weights].values.T
+        weights = np.asarray(weights, dtype=float)
+
+        if weights.shape[-1] != len(self.electrode_df):
+            raise ValueError(f'weights has {weights.shape[-1]} values per '
+                             f'vector, electrode_df has '
+                             f'{len(self.electrode_df)} rows.')
+
+        # The weights of the electrodes in the tree.
+        tree_weights = weights[..., self.rows[tree_idx]]
+        if weights.ndim == 1:
+            return np.bincount(point_idx, weights=tree_weights,
+                               minlength=n_points)
+        return np.stack([np.bincount(point_idx, weights=w,
+                                     minlength=n_points)
+                         for w in tree_weights])
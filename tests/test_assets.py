@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the brain image and ROI mask cache: decoding once, eviction, the
+memory-mapped copies and ROI lookups against per-electrode mask tests.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import os
+
+# Third party libraries
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+# Custom libraries
+from sylseq_paper import assets
+from sylseq_paper.assets import AssetCache, mni_img_name, mni_mask_name
+
+
+@pytest.fixture
+def img_dir(tmp_path):
+    """
+    An imaging directory with an MNI brain and two overlapping ROI masks
+    (black within the ROI, white outside).
+    """
+    os.makedirs(tmp_path / 'masks_and_rois')
+    plt.imsave(str(tmp_path / mni_img_name.format('lh', 'lateral')),
+               np.random.default_rng(0).uniform(size=(40, 60, 3)))
+
+    for roi, (rows, cols) in {'mprcg': (slice(5, 20), slice(10, 30)),
+                              'sma': (slice(15, 35), slice(25, 50))}.items():
+        mask = np.ones((40, 60, 3))
+        mask[rows, cols] = 0
+        plt.imsave(str(tmp_path / mni_mask_name.format('lh', 'lateral', roi)),
+                   mask)
+    return str(tmp_path)
+
+
+def test_images_are_decoded_once(img_dir, monkeypatch):
+    cache = AssetCache(img_dir, maxsize=2)
+    calls = []
+    imread = plt.imread
+    monkeypatch.setattr(assets.plt, 'imread',
+                        lambda path: calls.append(path) or imread(path))
+
+    img = cache.brain_image('lh', 'lateral')
+    assert cache.brain_image('lh', 'lateral') is img
+    assert len(calls) == 1
+    assert not img.flags.writeable
+
+    # The least recently used array is evicted beyond maxsize.
+    cache.roi_mask('lh', 'lateral', 'mprcg')
+    cache.roi_mask('lh', 'lateral', 'sma')
+    cache.brain_image('lh', 'lateral')
+    assert len(calls) == 4
+
+
+def test_memory_mapped_copies_match(img_dir, tmp_path):
+    mmap_dir = str(tmp_path / 'decoded')
+    img = AssetCache(img_dir, mmap_dir=mmap_dir).brain_image('lh', 'lateral')
+    again = AssetCache(img_dir, mmap_dir=mmap_dir).brain_image('lh',
+                                                                'lateral')
+
+    assert isinstance(again, np.memmap)
+    np.testing.assert_array_equal(
+        again, plt.imread(os.path.join(img_dir,
+                                       mni_img_name.format('lh', 'lateral')))
+    )
+    np.testing.assert_array_equal(img, again)
+
+
+def test_electrode_rois_match_mask_lookups(img_dir):
+    cache = AssetCache(img_dir)
+    assert cache.available_rois('lh', 'lateral') == ['mprcg', 'sma']
+
+    rng = np.random.default_rng(1)
+    x, y = rng.uniform(-5, 65, 500), rng.uniform(-5, 45, 500)
+    electrode_rois = cache.electrode_rois(x, y, 'lh', 'lateral')
+
+    for roi in ['mprcg', 'sma']:
+        mask = plt.imread(os.path.join(
+            img_dir, mni_mask_name.format('lh', 'lateral', roi)
+        ))[:, :, 0] != 1
+        expected = [0 <= r < 40 and 0 <= c < 60 and mask[r, c]
+                    for r, c in zip(np.rint(y).astype(int),
+                                    np.rint(x).astype(int))]
+        np.testing.assert_array_equal(
+            cache.in_roi(x, y, 'lh', 'lateral', roi), expected
+        )
+
+    # Overlapping pixels go to the first ROI, the rest to None.
+    in_mprcg = cache.in_roi(x, y, 'lh', 'lateral', 'mprcg')
+    in_sma = cache.in_roi(x, y, 'lh', 'lateral', 'sma')
+    assert (electrode_rois[in_mprcg] == 'mprcg').all()
+    assert (electrode_rois[in_sma & ~in_mprcg] == 'sma').all()
+    assert all(roi is None for roi in electrode_rois[~in_mprcg & ~in_sma])
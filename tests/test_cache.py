@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the disk cache: hits, invalidation and least recently used
+eviction.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import importlib
+import os
+import sys
+import time
+
+# Third party libraries
+import numpy as np
+import pytest
+
+# Custom libraries
+from sylseq_paper.cache import DiskCache, cache_key, cached
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DiskCache(str(tmp_path / 'cache'))
+
+
+def test_cached_hits_until_the_input_changes(cache, tmp_path):
+    path = tmp_path / 'values.txt'
+    path.write_text('1 2 3')
+    calls = []
+
+    @cached(file_args=['path'], cache=cache)
+    def load(path, scale=1):
+        calls.append(path)
+        return np.loadtxt(path) * scale
+
+    np.testing.assert_array_equal(load(str(path)), [1, 2, 3])
+    np.testing.assert_array_equal(load(str(path)), [1, 2, 3])
+    assert len(calls) == 1
+
+    # Other arguments and new file contents are misses.
+    np.testing.assert_array_equal(load(str(path), scale=2), [2, 4, 6])
+    path.write_text('4 5 6')
+    np.testing.assert_array_equal(load(str(path)), [4, 5, 6])
+    assert len(calls) == 3
+
+    load.invalidate(str(path))
+    load(str(path))
+    assert len(calls) == 4
+
+
+def test_depends_on_helpers_are_part_of_the_key(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    helper_path = tmp_path / 'cache_test_helpers.py'
+
+    def func(x):
+        return x
+
+    keys = []
+    for source in ['def scale(x):\n    return x\n',
+                   'def scale(x):\n    return 2 * x\n']:
+        helper_path.write_text(source)
+        sys.modules.pop('cache_test_helpers', None)
+        importlib.invalidate_caches()
+        helpers = importlib.import_module('cache_test_helpers')
+
+        keys.append((cache_key(func, (1,)),
+                     cache_key(func, (1,), depends_on=[helpers.scale])))
+    sys.modules.pop('cache_test_helpers', None)
+
+    # Undeclared helpers do not change the key, declared ones do.
+    assert keys[0][0] == keys[1][0]
+    assert keys[0][1] != keys[1][1]
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path / 'cache'), max_bytes=2500)
+    value = np.zeros(100)  # About 1 kB pickled.
+
+    cache.set('a', value)
+    cache.set('b', value)
+    # Make the modification times distinct, then use 'a' again.
+    for age, key in [(30, 'a'), (20, 'b')]:
+        mtime = time.time() - age
+        os.utime(cache._path(key), (mtime, mtime))
+    cache.get('a')
+
+    cache.set('c', value)
+    assert 'a' in cache and 'c' in cache
+    assert 'b' not in cache
+    assert cache.size() <= 2500
+
+
+def test_corrupt_entries_are_misses(cache):
+    cache.set('a', [1, 2, 3])
+    with open(cache._path('a'), 'r+b') as f:
+        f.truncate(5)
+
+    with pytest.raises(KeyError):
+        cache.get('a')
+    assert 'a' not in cache
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the tiled cluster distances and the binned rank-sum test against
+the full distance matrices and scipy.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Third party libraries
+import numpy as np
+import pytest
+from scipy import stats
+from scipy.spatial.distance import cdist, pdist
+
+# Custom libraries
+from sylseq_paper.cluster_separation import (DistanceHistogram,
+                                             _accumulate_distances,
+                                             cluster_separation)
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.mark.parametrize('block_size', [1, 16, 53, 2048])
+def test_tiled_distances_match_full_matrices(rng, block_size):
+    points_a = rng.normal(size=(53, 3))
+    points_b = rng.normal(size=(37, 3))
+
+    for args, upper, expected in [
+        ((points_a, points_a), True, pdist(points_a)),
+        ((points_a, points_b), False, cdist(points_a, points_b).ravel()),
+    ]:
+        histogram = DistanceHistogram(10, n_bins=100)
+        distances = []
+        _accumulate_distances(*args, histogram, block_size=block_size,
+                              upper=upper, distances=distances)
+
+        np.testing.assert_allclose(np.sort(np.concatenate(distances)),
+                                   np.sort(expected))
+        np.testing.assert_array_equal(
+            histogram.counts, np.histogram(expected, bins=histogram.edges)[0]
+        )
+        assert histogram.n == len(expected)
+        assert np.isclose(histogram.mean, expected.mean())
+
+
+def test_cluster_separation_matches_scipy(rng):
+    scores = rng.normal(size=(120, 4))
+    clusters = rng.integers(0, 4, size=120)
+    scores[clusters == 1] += 1.5
+
+    results = cluster_separation(scores, clusters, block_size=16,
+                                 return_distances=True)
+
+    members = [scores[clusters == c][:, 1:] for c in [1, 2, 0, 3]]
+    within = np.concatenate([pdist(m) for m in members])
+    between = np.concatenate([cdist(m, other).ravel()
+                              for k, m in enumerate(members)
+                              for other in members[k:]])
+    np.testing.assert_allclose(np.sort(results['within_distances']),
+                               np.sort(within))
+    np.testing.assert_allclose(np.sort(results['between_distances']),
+                               np.sort(between))
+
+    _, p_value = stats.mannwhitneyu(within, between, use_continuity=True,
+                                    alternative='two-sided',
+                                    method='asymptotic')
+    assert np.isclose(results['p_value'], p_value)
+
+    # The binned test is close to the exact one.
+    binned = cluster_separation(scores, clusters, block_size=16)
+    assert np.isclose(binned['z'], results['z'], rtol=1e-3)
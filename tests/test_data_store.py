@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the columnar data store against the HDF5 tables it replaces.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Third party libraries
+import numpy as np
+import pandas as pd
+import pytest
+
+# Custom libraries
+from sylseq_paper.data_store import (convert_data_dir, load_array,
+                                     read_table, write_table)
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+@pytest.fixture
+def electrodes():
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame({
+        'subject': rng.choice(['EC1', 'EC2', 'EC3', 'EC4'], size=n),
+        'alignment': rng.choice(['speech', 'pre_exec'], size=n),
+        'hemisphere': rng.choice(['lh', 'rh'], size=n),
+        'x': rng.normal(size=n),
+        'y': rng.normal(size=n),
+        'correlation': rng.uniform(size=n),
+    }, index=pd.Index([f'e{i}' for i in range(n)], name='subject_electrode'))
+    return df
+
+
+def _unfiltered(df, columns, filters):
+    """
+    Select rows and columns from the full table in memory.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for col, value in filters.items():
+        values = value if isinstance(value, list) else [value]
+        mask &= df[col].isin(values).values
+    return df.loc[mask, columns]
+
+
+@pytest.mark.parametrize('columns, filters', [
+    (None, {'subject': 'EC2'}),
+    (['x', 'y'], {'subject': 'EC3', 'hemisphere': 'lh'}),
+    (['correlation'], {'alignment': ['speech', 'pre_exec'],
+                       'subject': ['EC1', 'EC4']}),
+])
+def test_read_table_matches_unfiltered_read(electrodes, tmp_path, columns,
+                                            filters):
+    write_table(electrodes, str(tmp_path / 'electrodes.parquet'),
+                row_group_size=100)
+
+    df = read_table('electrodes', str(tmp_path), columns=columns,
+                    filters=filters)
+
+    expected = _unfiltered(electrodes, columns or list(electrodes.columns),
+                           filters)
+    pd.testing.assert_frame_equal(df.sort_index(), expected.sort_index(),
+                                  check_like=True)
+
+
+def test_write_table_sorts_row_groups_by_subject(electrodes, tmp_path):
+    path = str(tmp_path / 'electrodes.parquet')
+    write_table(electrodes, path, row_group_size=100)
+
+    # Each subject spans only its own row groups (and at most one shared
+    # at each end), so a subject filter skips the others.
+    metadata = pq.ParquetFile(path).metadata
+    subject = metadata.schema.to_arrow_schema().get_field_index('subject')
+    ranges = [(metadata.row_group(i).column(subject).statistics.min,
+               metadata.row_group(i).column(subject).statistics.max)
+              for i in range(metadata.num_row_groups)]
+    n_ec2 = sum(low <= 'EC2' <= high for low, high in ranges)
+    assert n_ec2 <= np.ceil((electrodes.subject == 'EC2').sum() / 100) + 1
+    assert n_ec2 < metadata.num_row_groups / 2
+
+
+def test_convert_data_dir(electrodes, tmp_path):
+    pytest.importorskip('tables')
+    data_dir, store_dir = tmp_path / 'data', tmp_path / 'store'
+    data_dir.mkdir()
+    electrodes.to_hdf(str(data_dir / 'all_anatomical_info.h5'), key='df')
+    hga = np.random.default_rng(1).normal(size=(10, 4, 50))
+    np.save(str(data_dir / 'hga.npy'), hga)
+
+    converted = convert_data_dir(str(data_dir), str(store_dir))
+    assert sorted(converted) == ['all_anatomical_info', 'hga']
+
+    df = read_table('all_anatomical_info', str(store_dir))
+    pd.testing.assert_frame_equal(df.sort_index(), electrodes.sort_index(),
+                                  check_like=True)
+
+    array = load_array('hga', str(store_dir))
+    assert isinstance(array, np.memmap)
+    np.testing.assert_array_equal(array[3], hga[3])
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the batched decoding against separate scikit-learn fits of each
+region, window, fold and regularization strength.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Third party libraries
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+# Custom libraries
+from sylseq_paper.decoding import (decode, probability_timecourse,
+                                   shared_folds, summarize_accuracy,
+                                   window_features)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    labels = np.repeat(['a', 'b', 'c'], 20)
+    times = np.arange(-0.5, 0.5, 0.01)
+    trials = rng.normal(size=(60, len(times), 10))
+    trials[:, 50:, :3] += (labels == 'a')[:, None, None]
+    regions = {'all_sig': np.arange(10), 'mPrCG': [0, 1, 5]}
+    windows = {'pre': (-0.5, 0), 'post': (0, 0.5)}
+    return trials, labels, times, regions, windows
+
+
+def test_decode_matches_separate_fits(data):
+    trials, labels, times, regions, windows = data
+    Cs = [0.01, 0.1, 1.0]
+
+    accuracy, probability = decode(trials, labels, times, regions, windows,
+                                   Cs=Cs, return_proba=True, random_seed=0)
+    assert len(accuracy) == len(regions) * len(windows) * 5 * len(Cs)
+
+    folds = shared_folds(labels, random_seed=0)
+    for (region, window), rows in accuracy.groupby(['area', 'period']):
+        X = window_features(trials, times, windows[window])[
+            :, np.asarray(regions[region])].reshape(60, -1)
+        for fold, (train, test) in enumerate(folds):
+            for C in Cs:
+                model = make_pipeline(
+                    StandardScaler(), LogisticRegression(C=C, max_iter=1000)
+                ).fit(X[train], labels[train])
+
+                proba = probability.loc[
+                    (probability.area == region) &
+                    (probability.period == window) &
+                    (probability.fold == fold) & (probability.C == C)
+                ].probability.values.reshape(len(test), -1)
+                expected = model.predict_proba(X[test])
+
+                # Warm starts converge to the same fit, within the solver's
+                # tolerance.
+                np.testing.assert_allclose(proba, expected, atol=2e-3)
+
+                # The accuracy is that of the probabilities, and agrees with
+                # the separate fit except for near ties.
+                predicted = model.classes_[np.argmax(proba, axis=1)]
+                row = rows.loc[(rows.fold == fold) & (rows.C == C)]
+                assert np.isclose(row.accuracy.item(),
+                                  np.mean(predicted == labels[test]))
+                top_two = np.sort(expected, axis=1)[:, -2:]
+                clear = np.diff(top_two, axis=1)[:, 0] > 5e-3
+                np.testing.assert_array_equal(
+                    predicted[clear], model.predict(X[test])[clear]
+                )
+
+def test_decode_summaries(data):
+    trials, labels, times, regions, windows = data
+    accuracy, probability = decode(trials, labels, times, regions, windows,
+                                   return_proba=True, random_seed=0)
+
+    # The seeded results do not depend on the workers.
+    parallel = decode(trials, labels, times, regions, windows,
+                      random_seed=0, n_jobs=2)
+    pd.testing.assert_frame_equal(parallel, accuracy)
+
+    summary = summarize_accuracy(accuracy)
+    expected = accuracy.groupby(['area', 'period']).accuracy.mean()
+    for _, row in summary.iterrows():
+        assert np.isclose(row.accuracy, expected[row.area, row.period])
+
+    timecourse = probability_timecourse(
+        probability.loc[probability.area == 'all_sig'], ['pre', 'post'],
+        label='a'
+    )
+    assert timecourse['tp_prob_ts_mean'].shape == (3, 2)
+    # Only the post window is informative.
+    mean = timecourse['tp_prob_ts_mean']
+    assert mean[0, 1] > mean[0, 0]
+    np.testing.assert_allclose(mean.sum(axis=0), 1)
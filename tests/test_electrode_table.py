@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the indexed ElectrodeTable lookups against the boolean-mask scans
+they replace.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Third party libraries
+import numpy as np
+import pandas as pd
+import pytest
+
+# Custom libraries
+from sylseq_paper.electrode_table import ElectrodeTable
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    n = 600
+    subject = rng.choice(['EC1', 'EC2', 'EC3'], size=n)
+    location = rng.choice(['vSMC', 'STG', 'IFG', None], size=n)
+    return pd.DataFrame({
+        'subject_electrode': [f'{s}_{e}' for s, e in
+                              zip(subject, rng.integers(0, 100, size=n))],
+        'subject': subject,
+        'alignment': rng.choice(['speech', 'target_presentation'], size=n),
+        'fancy_location': location,
+        'feature_type': rng.choice(['sequence', 'syllable'], size=n),
+        'significant': rng.uniform(size=n) < 0.3,
+    })
+
+
+def _scan(df, **criteria):
+    mask = np.ones(len(df), dtype=bool)
+    for col, value in criteria.items():
+        if isinstance(value, list):
+            mask &= df[col].isin(value).values
+        else:
+            mask &= (df[col] == value).values
+    return df.loc[mask]
+
+
+@pytest.mark.parametrize('criteria', [
+    {},
+    {'subject': 'EC2'},
+    {'subject': 'EC1', 'feature_type': 'sequence'},
+    {'subject': ['EC1', 'EC3'], 'alignment': 'speech',
+     'fancy_location': ['vSMC', 'IFG']},
+    {'subject': 'EC4'},
+])
+def test_get_matches_mask_scan(df, criteria):
+    table = ElectrodeTable(df)
+    pd.testing.assert_frame_equal(table.get(**criteria),
+                                  _scan(df, **criteria))
+
+
+def test_get_by_subject_electrode(df):
+    table = ElectrodeTable(df)
+    se = df.subject_electrode.iloc[17]
+    pd.testing.assert_frame_equal(
+        table.get(subject_electrode=se, feature_type='sequence'),
+        df.loc[(df.subject_electrode == se)
+               & (df.feature_type == 'sequence')]
+    )
+
+
+def test_groups_and_counts_match_groupby(df):
+    table = ElectrodeTable(df)
+
+    groups = dict(table.groups('subject', alignment='speech'))
+    speech = df.loc[df.alignment == 'speech']
+    assert sorted(groups) == sorted(speech.subject.unique())
+    for subject, rows in groups.items():
+        pd.testing.assert_frame_equal(rows,
+                                      speech.loc[speech.subject == subject])
+
+    pd.testing.assert_series_equal(
+        table.count('subject', feature_type='syllable'),
+        df.loc[df.feature_type == 'syllable'].groupby('subject').size()
+    )
+
+
+def test_summary_counts_flags(df):
+    table = ElectrodeTable(df)
+    summary = table.summary('fancy_location', flags=['significant'],
+                            alignment='speech').set_index('fancy_location')
+
+    speech = df.loc[df.alignment == 'speech']
+    for location, rows in speech.groupby('fancy_location', dropna=False):
+        row = summary.loc[location]
+        assert row.total == len(rows)
+        assert row.significant == rows.significant.sum()
+        assert np.isclose(row.significant_percent,
+                          100 * rows.significant.mean())
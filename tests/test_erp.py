@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Equivalence checks of the streaming condition ERPs against per-condition
+nanmean and SEM.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import os
+
+# Third party libraries
+import numpy as np
+import pytest
+from scipy import stats
+from scipy.ndimage import gaussian_filter1d
+
+# Custom libraries
+from sylseq_paper.erp import condition_erps
+
+
+@pytest.fixture
+def trials():
+    rng = np.random.default_rng(0)
+    # An offset far from 0 checks the running sums for cancellation.
+    data = 100 + rng.normal(size=(90, 40, 6))
+    data[rng.uniform(size=data.shape) < 0.05] = np.nan
+    data[:, :, 5] = np.nan
+    return data, rng.choice(['simple', 'complex', 'single'], size=90)
+
+
+def _expected(data, conditions, labels):
+    means = np.stack([np.nanmean(data[conditions == c], axis=0)
+                      for c in labels])
+    sems = np.stack([stats.sem(data[conditions == c], axis=0,
+                               nan_policy='omit') for c in labels])
+    return means, np.asarray(sems, dtype=float)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+@pytest.mark.parametrize('chunk_size', [7, 64, 200])
+def test_condition_erps_match_nanmean_and_sem(trials, chunk_size):
+    data, conditions = trials
+
+    erps = condition_erps(data, conditions, chunk_size=chunk_size)
+    means, sems = _expected(data, conditions, erps['conditions'])
+
+    assert erps['conditions'] == sorted(set(conditions))
+    np.testing.assert_allclose(erps['mean'], means, equal_nan=True)
+    # The last electrode has no data (stats.sem's result for it varies
+    # across scipy versions).
+    np.testing.assert_allclose(erps['sem'][..., :5], sems[..., :5],
+                               rtol=1e-6)
+    assert np.isnan(erps['sem'][..., 5]).all()
+    np.testing.assert_array_equal(
+        erps['n'][0], (~np.isnan(data[conditions == 'complex'])).sum(0)
+    )
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+def test_condition_erps_inputs(trials, tmp_path):
+    data, conditions = trials
+    erps = condition_erps(data, conditions, sigma=2)
+
+    # A memory-mapped .npy file.
+    path = os.path.join(tmp_path, 'trials.npy')
+    np.save(path, data)
+    from_file = condition_erps(path, conditions, sigma=2)
+    np.testing.assert_allclose(from_file['mean'], erps['mean'],
+                               equal_nan=True)
+
+    # A dictionary of trials by condition.
+    by_condition = condition_erps({c: data[conditions == c]
+                                   for c in erps['conditions']}, sigma=2)
+    np.testing.assert_allclose(by_condition['mean'], erps['mean'],
+                               equal_nan=True)
+
+    np.testing.assert_allclose(erps['smoothed'],
+                               gaussian_filter1d(erps['mean'], 2, axis=1),
+                               equal_nan=True)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of loadmat_fast against the loadmat it replaces, for v5 and v7.3
+.mat files.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Third party libraries
+import numpy as np
+import pytest
+import scipy.io as spio
+
+# Custom libraries
+from sylseq_paper.file_utils import loadmat, loadmat_fast, open_mat_hdf5
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+def _write_v73(filename, hga, pvals):
+    """
+    Write a minimal v7.3 .mat file: an HDF5 file behind MATLAB's 128-byte
+    header in a 512-byte user block.
+    """
+    h5py = pytest.importorskip('h5py')
+
+    with h5py.File(filename, 'w', userblock_size=512) as f:
+        # HDF5 stores MATLAB arrays transposed.
+        f.create_dataset('hga', data=hga.T)
+        f['hga'].attrs['MATLAB_class'] = np.bytes_('double')
+        stats = f.create_group('stats')
+        stats.attrs['MATLAB_class'] = np.bytes_('struct')
+        stats.create_dataset('pvals', data=pvals[None, :])
+        stats['pvals'].attrs['MATLAB_class'] = np.bytes_('double')
+        stats.create_dataset('label', data=np.array([[ord(c)] for c in 'vSMC'],
+                                                    dtype=np.uint16))
+        stats['label'].attrs['MATLAB_class'] = np.bytes_('char')
+
+    header = b'MATLAB 7.3 MAT-file'.ljust(116) + b'\x00' * 8 + b'\x00\x02IM'
+    with open(filename, 'r+b') as f:
+        f.write(header)
+
+
+def test_loadmat_fast_matches_loadmat(rng, tmp_path):
+    filename = str(tmp_path / 'results.mat')
+    hga = rng.normal(size=(5, 8))
+    pvals = rng.uniform(size=8)
+    spio.savemat(filename, {'hga': hga,
+                            'stats': {'pvals': pvals, 'label': 'vSMC'}})
+
+    expected = loadmat(filename)
+    data = loadmat_fast(filename)
+
+    np.testing.assert_array_equal(data['hga'], expected['hga'])
+    np.testing.assert_array_equal(data['stats']['pvals'],
+                                  expected['stats']['pvals'])
+    assert data['stats']['label'] == expected['stats']['label']
+
+    subset = loadmat_fast(filename, paths=['stats.pvals'])
+    np.testing.assert_array_equal(subset['stats.pvals'], pvals)
+
+
+def test_loadmat_fast_reads_v73(rng, tmp_path):
+    filename = str(tmp_path / 'results.mat')
+    hga = rng.normal(size=(5, 8))
+    pvals = rng.uniform(size=8)
+    _write_v73(filename, hga, pvals)
+
+    data = loadmat_fast(filename)
+    np.testing.assert_array_equal(data['hga'], hga)
+    np.testing.assert_array_equal(data['stats']['pvals'], pvals)
+    assert data['stats']['label'] == 'vSMC'
+
+    subset = loadmat_fast(filename, paths=['stats.pvals'])
+    assert list(subset) == ['stats.pvals']
+    np.testing.assert_array_equal(subset['stats.pvals'], pvals)
+
+    # Lazy reads index in the MATLAB dimension order.
+    with open_mat_hdf5(filename) as mat:
+        assert mat['hga'].shape == hga.shape
+        np.testing.assert_array_equal(mat['hga'][1:3], hga[1:3])
+        np.testing.assert_array_equal(mat['hga'][:, 2], hga[:, 2])
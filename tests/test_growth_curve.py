@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the resumable growth curve engine: the prepared folds against
+scikit-learn's cross-validation, and resumed or parallel runs against a
+single uninterrupted run.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import os
+
+# Third party libraries
+import numpy as np
+import pytest
+from sklearn.model_selection import StratifiedKFold
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+# Custom libraries
+from sylseq_paper.growth_curve import (default_classifier, growth_curves,
+                                       prepare_folds, subset_accuracy)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    labels = np.repeat([0, 1, 2], 20)
+    features = rng.normal(size=(60, 12, 2))
+    features[:, :4] += labels[:, None, None] * 0.8
+    groups = {'Sustained': np.arange(0, 6),
+              'Non-sustained': np.arange(6, 12)}
+    return features, labels, groups
+
+
+def test_subset_accuracy_matches_sklearn(data, tmp_path):
+    features, labels, _ = data
+    fold_paths = prepare_folds(features, labels, str(tmp_path),
+                               random_seed=0)
+    folds = [{name: np.load(path) for name, path in paths.items()}
+             for paths in fold_paths]
+    channels = np.array([1, 3, 7])
+
+    seed = np.random.default_rng(0).integers(2 ** 31)
+    splitter = StratifiedKFold(n_splits=5, shuffle=True, random_state=seed)
+    X = features[:, channels].reshape(60, -1)
+    expected = np.mean([
+        make_pipeline(StandardScaler(), default_classifier())
+        .fit(X[train], labels[train]).score(X[test], labels[test])
+        for train, test in splitter.split(X, labels)
+    ])
+
+    assert np.isclose(subset_accuracy(folds, channels, default_classifier()),
+                      expected)
+
+
+def test_growth_curves_resume_and_workers(data, tmp_path):
+    features, labels, groups = data
+    kwargs = dict(sizes=[1, 2, 5, 20], n_iter=4, n_draws=50, random_seed=0,
+                  log=lambda message: None)
+
+    gc_data = growth_curves(features, labels, groups,
+                            out_dir=str(tmp_path / 'run'), **kwargs)
+    assert gc_data['c_rate_iter'].shape == (2, 4, 4)
+    np.testing.assert_array_equal(gc_data['N_ch_actual'],
+                                  [[1, 2, 5, 6], [1, 2, 5, 6]])
+    np.testing.assert_array_equal(gc_data['c_rate_iter_draw_mean_sus'],
+                                  gc_data['c_rate_iter_draw_mean'][0])
+    # The informative electrodes are all in the first group.
+    assert gc_data['accuracy_ratio'][1] < gc_data['accuracy_ratio'][0]
+
+    # Interrupted runs resume with the missing results only.
+    os.remove(tmp_path / 'run' / 'group1_size2.npy')
+    messages = []
+    resumed = growth_curves(features, labels, groups,
+                            out_dir=str(tmp_path / 'run'),
+                            **{**kwargs, 'log': messages.append})
+    assert messages == ['7 of 8 growth curve points already computed.']
+    for key in ['c_rate_iter', 'c_rate_iter_draw_mean', 'accuracy_ratio']:
+        np.testing.assert_array_equal(resumed[key], gc_data[key])
+
+    # The seeded results do not depend on the workers.
+    parallel = growth_curves(features, labels, groups, n_jobs=2, **kwargs)
+    np.testing.assert_array_equal(parallel['c_rate_iter'],
+                                  gc_data['c_rate_iter'])
+
+    with pytest.raises(ValueError):
+        growth_curves(features, labels, groups,
+                      out_dir=str(tmp_path / 'run'),
+                      **{**kwargs, 'n_iter': 5})
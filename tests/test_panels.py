@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Smoke tests of the registered figure panels, built headlessly on synthetic
+inputs shaped like the data files.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import os
+import pickle
+
+# Third party libraries
+import matplotlib
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.io as spio
+
+# Custom libraries
+from sylseq_paper import panels
+from sylseq_paper.assets import mni_img_name
+from sylseq_paper.build import build, registry, task_order
+from sylseq_paper.stimulation_info import stim_site_table
+
+matplotlib.use('Agg')
+
+
+@pytest.fixture
+def data_dirs(tmp_path):
+    rng = np.random.default_rng(0)
+    data_dir, img_dir = tmp_path / 'data', tmp_path / 'imaging'
+    data_dir.mkdir()
+    img_dir.mkdir()
+
+    # Figure 1: significant electrodes in a few areas, their trial
+    # averages and NMF cluster weights.
+    areas = ['ventral PrCG', 'STG', 'SMA']
+    subjects = ['EC217', 'EC219']
+    rows = []
+    for subject in subjects:
+        for electrode in range(20):
+            for alignment in ['target_presentation', 'pre_exec']:
+                rows.append({
+                    'subject': subject,
+                    'electrode': electrode,
+                    'subject_electrode': f'{subject}_{electrode}',
+                    'alignment': alignment,
+                    'location': 'precentral',
+                    'fancy_location': areas[electrode % 3],
+                    'significant_above_baseline_anytime': electrode < 15,
+                    'pre_exec_speech_reaction_time': electrode / 10,
+                })
+    neural_df = pd.DataFrame(rows)
+    clustered_se = [f'{s}_{e}' for s in subjects for e in [0, 1, 3, 4, 6, 9]]
+    with open(data_dir / 'fig1_ndf_sustained_se.pkl', 'wb') as f:
+        pickle.dump({'neural_df': neural_df,
+                     'sustained_se': np.array(clustered_se)}, f)
+
+    windows = {'target_presentation_delay': 3.75, 'go_cue': 0.5,
+               'pre_exec_speech': 2.5}
+    trial_avgs = {alignment: {subject: rng.uniform(size=(int(100 * w), 20))
+                              for subject in subjects}
+                  for alignment, w in windows.items()}
+    with open(data_dir / 'fig1_trial_averages.pkl', 'wb') as f:
+        pickle.dump(trial_avgs, f)
+    spio.savemat(str(data_dir / 'fig1_nmf_clustering.mat'), {
+        'nmf_weights': rng.uniform(size=(len(clustered_se), 4)),
+        'clustered_se': np.array(clustered_se, dtype=object),
+    })
+
+    # Figure 5: electrode coordinates of the stimulated subjects and the
+    # overlap of sequence and reaction time electrodes.
+    sites = stim_site_table()
+    electrode_df = pd.DataFrame([
+        {'subject': subject, 'electrode': electrode,
+         'warp_x': rng.uniform(0, 60), 'warp_y': rng.uniform(0, 40)}
+        for subject in sites.subject.unique() for electrode in range(300)
+    ])
+    electrode_df.to_hdf(str(data_dir / 'all_anatomical_info.h5'), key='df')
+    cur_df = pd.DataFrame({'x': rng.uniform(0, 60, 200),
+                           'y': rng.uniform(0, 40, 200)})
+    with open(data_dir / 'rt_seq_overlap_density_dict.pkl', 'wb') as f:
+        pickle.dump({'cur_df': cur_df,
+                     'in_seq': rng.uniform(size=200) < 0.3,
+                     'in_rt': rng.uniform(size=200) < 0.3}, f)
+
+    matplotlib.pyplot.imsave(str(img_dir / mni_img_name.format('lh',
+                                                               'lateral')),
+                             rng.uniform(size=(40, 60, 3)))
+    return str(data_dir), str(img_dir)
+
+
+def test_raster_order(data_dirs):
+    data_dir, _ = data_dirs
+    ndf = panels.load_raster_data(data_dir)['ndf']
+
+    # Areas with more clustered electrodes first (SMA is renamed), and
+    # within each area the clustered electrodes first, by decreasing weight.
+    assert list(ndf.fancy_location.cat.categories) == ['ventral PrCG', 'STG',
+                                                       'medial SFG']
+    for _, area_df in ndf.loc[ndf.alignment == 'pre_exec'].groupby(
+            'fancy_location'):
+        weights = area_df.cluster_weight.values
+        assert (np.diff(weights) <= 0).all()
+        assert ((weights == -15) == (area_df.cluster_label == 'none')).all()
+
+
+def test_stim_site_categories():
+    sites = stim_site_table()
+    categories = panels.stim_site_categories(sites)
+
+    sequencing = sites.seq_deficit.astype(bool) & \
+        ~sites.inconsistent_seq_deficit.astype(bool) & \
+        ~sites.motor_deficit.astype(bool)
+    assert (categories[sequencing.values] == 'sequencing').all()
+    assert all(c is None for c in
+               categories[sites.inconsistent_seq_deficit.astype(bool)])
+
+
+def test_build_panels(data_dirs, tmp_path):
+    data_dir, img_dir = data_dirs
+    out_dir = str(tmp_path / 'build')
+    names = ['figure1_full_rasters', 'stim_recon']
+    assert set(names) <= set(task_order())
+
+    status = build([], data_dir, out_dir, img_dir=img_dir, names=names,
+                   n_jobs=1, log=lambda message: None)
+    assert status == {name: 'built' for name in names}
+    for name in names:
+        assert os.path.exists(os.path.join(out_dir, f'{name}.pdf'))
+
+    # Unchanged panels are skipped, and changing an input rebuilds them.
+    status = build([], data_dir, out_dir, img_dir=img_dir, names=names,
+                   n_jobs=1, log=lambda message: None)
+    assert status == {name: 'skipped' for name in names}
+
+    with open(os.path.join(data_dir, 'rt_seq_overlap_density_dict.pkl'),
+              'ab') as f:
+        f.write(b'\0')
+    status = build([], data_dir, out_dir, img_dir=img_dir, names=names,
+                   n_jobs=1, log=lambda message: None)
+    assert status == {'figure1_full_rasters': 'skipped',
+                      'stim_recon': 'built'}
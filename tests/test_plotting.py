@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Equivalence checks of the batched smoothed histograms against the
+np.histogram2d implementation they replace.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Third party libraries
+import numpy as np
+import pytest
+from scipy import ndimage
+
+# Custom libraries
+from sylseq_paper.plotting import (smoothed_weighted_histogram,
+                                   smoothed_weighted_histograms)
+
+
+def _histogram2d_baseline(x, y, weights, xlim, ylim, bins, smooth,
+                          baseline_norm):
+    hist_range = None if xlim is None and ylim is None else [xlim, ylim]
+    im, xedges, yedges = np.histogram2d(x, y, bins=bins, weights=weights,
+                                        range=hist_range)
+    if baseline_norm:
+        b_im, _, _ = np.histogram2d(x, y, bins=bins, range=hist_range)
+        im /= b_im + 1e-15
+    im = ndimage.gaussian_filter(im, sigma=(smooth, smooth), order=0)
+    return im / im.max(), xedges, yedges
+
+
+@pytest.fixture
+def coordinates():
+    rng = np.random.default_rng(0)
+    return (rng.uniform(0, 600, 800), rng.uniform(0, 500, 800),
+            rng.uniform(size=800))
+
+
+@pytest.mark.parametrize('baseline_norm', [False, True])
+@pytest.mark.parametrize('kwargs', [
+    dict(xlim=[0, 600], ylim=[0, 500], bins=100),
+    dict(xlim=[0, 600], ylim=[0, 500], bins=[40, 60]),
+    dict(xlim=None, ylim=None, bins=50),
+    dict(xlim=[100, 400], ylim=None, bins=30),
+    dict(xlim=None, ylim=None, bins=np.linspace(-10, 610, 41)),
+    dict(xlim=None, ylim=None, bins=[np.linspace(0, 600, 21), 35]),
+])
+def test_histogram_matches_histogram2d(coordinates, baseline_norm, kwargs):
+    x, y, weights = coordinates
+
+    result = smoothed_weighted_histogram(x, y, weights, smooth=2,
+                                         baseline_norm=baseline_norm,
+                                         **kwargs)
+    expected = _histogram2d_baseline(x, y, weights, smooth=2,
+                                     baseline_norm=baseline_norm, **kwargs)
+
+    for a, b in zip(result, expected):
+        np.testing.assert_allclose(a, b, atol=1e-12)
+
+
+def test_batched_fft_histograms_match_histogram2d(coordinates):
+    x, y, weights = coordinates
+    stacked = np.stack([weights, 1 - weights, np.ones_like(weights)])
+
+    ims, _, _ = smoothed_weighted_histograms(stacked, x=x, y=y,
+                                             xlim=[0, 600], ylim=[0, 500],
+                                             bins=120, smooth=10)
+
+    for im, w in zip(ims, stacked):
+        expected, _, _ = _histogram2d_baseline(x, y, w, [0, 600], [0, 500],
+                                               120, 10, False)
+        np.testing.assert_allclose(im, expected, atol=1e-10)
+
+
+def test_decreasing_bin_edges_raise(coordinates):
+    x, y, weights = coordinates
+    with pytest.raises(ValueError):
+        smoothed_weighted_histogram(x, y, weights, bins=[5, 3, 1, 0.5],
+                                    smooth=1)
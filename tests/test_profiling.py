@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the profiling records and their memory tracing.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import tracemalloc
+
+# Third party libraries
+import numpy as np
+import pytest
+
+# Custom libraries
+from sylseq_paper import profiling
+
+
+@profiling.profiled(name='allocate')
+def allocate(n):
+    return np.ones(n).sum()
+
+
+@pytest.fixture
+def profile():
+    profiling.reset()
+    yield
+    profiling.disable()
+    profiling.reset()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def test_records_calls_and_peak_memory(profile):
+    allocate(10)
+    assert profiling._events == []
+
+    profiling.enable(trace_memory=True)
+    allocate(10 ** 6)
+    profiling.disable()
+
+    event, = profiling._events
+    assert event['name'] == 'allocate'
+    assert event['inputs']['n'] == 10 ** 6
+    assert event['peak_memory'] >= 8 * 10 ** 6
+    assert not tracemalloc.is_tracing()
+
+
+def test_keeps_the_callers_tracing_and_peak(profile):
+    tracemalloc.start()
+    np.ones(4 * 10 ** 6).sum()  # A 32 MB peak before profiling.
+
+    profiling.enable(trace_memory=True)
+    allocate(1000)
+    profiling.disable()
+
+    # Profiling leaves the caller's tracing running, and its peak is kept.
+    assert tracemalloc.is_tracing()
+    _, peak = profiling.get_traced_memory()
+    assert peak >= 32 * 10 ** 6
+
+    # tracemalloc's own peak can only be reset from Python 3.9.
+    if profiling._has_reset_peak:
+        profiling.reset_peak()
+        _, peak = profiling.get_traced_memory()
+        assert peak < 32 * 10 ** 6
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the streaming state-space PCA against a PCA of the concatenated
+data, and of its per-region cache keys.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Standard libraries
+import os
+
+# Third party libraries
+import numpy as np
+import pytest
+
+# Custom libraries
+from sylseq_paper.state_space import StateSpace, phase_labels
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def data(rng):
+    mixing = rng.normal(size=(8, 8))
+    # An offset far from 0 checks the running sums for cancellation.
+    return 50 + rng.normal(size=(30, 20, 8)) @ mixing
+
+
+REGIONS = {'A': ['e0', 'e1', 'e2', 'e3', 'e4'], 'B': ['e5', 'e6', 'e7']}
+ELECTRODES = [f'e{i}' for i in range(8)]
+
+
+def reference_pca(rows, n_components):
+    """
+    PCA of the rows by the SVD of the centered data, with the largest
+    absolute coefficient of each component positive.
+    """
+    centered = rows - rows.mean(axis=0)
+    _, singular_values, components = np.linalg.svd(centered,
+                                                   full_matrices=False)
+    components = components[:n_components]
+    max_idx = np.argmax(np.abs(components), axis=1)
+    components *= np.sign(
+        components[np.arange(n_components), max_idx]
+    )[:, None]
+    variance = singular_values ** 2
+    return components, variance / variance.sum()
+
+
+def test_streaming_pca_matches_concatenated_data(data):
+    space = StateSpace(ELECTRODES, n_components=2)
+    assert sorted(space.fit(REGIONS, lambda: iter(np.split(data, 3)))) == \
+        ['A', 'B']
+
+    # Adding trials updates the sums as if fitted on all the trials.
+    more = data[:10] + 1
+    space.update(np.split(more, 2), data_key='v2')
+    rows = np.concatenate([data, more]).reshape(-1, 8)
+
+    for region in REGIONS:
+        columns = space.columns(region)
+        components, explained = reference_pca(rows[:, columns], 2)
+        np.testing.assert_allclose(space.pcas[region].components(2)[0],
+                                   components, atol=1e-8)
+        np.testing.assert_allclose(space.explained_variance(region),
+                                   explained, atol=1e-10)
+        np.testing.assert_allclose(
+            space.project(region, rows),
+            (rows[:, columns] - rows[:, columns].mean(axis=0)) @
+            components.T, atol=1e-6)
+
+
+def test_fit_reuses_cached_regions(data, tmp_path):
+    space = StateSpace(ELECTRODES, cache_dir=str(tmp_path), data_key='v1')
+    space.fit(REGIONS, lambda: [data])
+
+    calls = []
+    fresh = StateSpace(ELECTRODES, cache_dir=str(tmp_path), data_key='v1')
+    fitted = fresh.fit(dict(REGIONS, C=['e0', 'e7']),
+                       lambda: calls.append(1) or [data])
+    assert fitted == ['C'] and calls == [1]
+    for region in REGIONS:
+        np.testing.assert_allclose(fresh.pcas[region].sum_outer,
+                                   space.pcas[region].sum_outer)
+
+
+def test_partial_update_keeps_other_regions_keys(data, tmp_path):
+    space = StateSpace(ELECTRODES, cache_dir=str(tmp_path), data_key='v1')
+    space.fit(REGIONS, lambda: [data])
+    path_b = space._path('B')
+
+    space.update([data[:5]], data_key='v2', regions=['A'])
+    assert space.data_keys == {'A': 'v2', 'B': 'v1'}
+    assert space.data_key == 'v1'
+    assert space._path('B') == path_b and os.path.exists(path_b)
+    assert os.path.exists(space._path('A', data_key='v2'))
+
+    # A new state space of the v1 data still finds B's cached sums.
+    fresh = StateSpace(ELECTRODES, cache_dir=str(tmp_path), data_key='v1')
+    assert fresh.fit({'B': REGIONS['B']}, lambda: []) == []
+    np.testing.assert_allclose(fresh.pcas['B'].sum, space.pcas['B'].sum)
+
+    # Once every region is updated, new fits use the new data key.
+    space.update([data[:5]], data_key='v2', regions=['B'])
+    assert space.data_key == 'v2'
+
+
+def test_phase_labels():
+    times = np.arange(-1, 2, 0.5)
+    np.testing.assert_array_equal(
+        phase_labels(times, [(-0.5, 0.5), (0, 1.5)]), [0, 1, 1, 2, 2, 0])
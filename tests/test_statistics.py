@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+"""
+Equivalence checks of the batched statistics engines against the baseline
+per-test computations they replace.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Third party libraries
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+# Custom libraries
+from sylseq_paper.statistics import (PValueAccumulator, _bootstrap_block,
+                                     _bootstrap_counts, _correlation_block,
+                                     _permutation_chunks, _standardize_rows,
+                                     _weighted_median, bootstrap,
+                                     bootstrap_ci, cluster_permutation_test,
+                                     correlation_permutation,
+                                     correlation_permutation_matrix,
+                                     fdr_correction, fdr_grouped,
+                                     fdr_omitnans, p_value_calc,
+                                     sequential_correlation_permutation,
+                                     streaming_p_value)
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.mark.parametrize('corr', [stats.pearsonr, stats.spearmanr])
+def test_correlation_block_matches_loop(rng, corr):
+    groups = rng.normal(size=(4, 30))
+    target = rng.normal(size=30)
+    method = 'pearson' if corr is stats.pearsonr else 'spearman'
+
+    block = _correlation_block(
+        np.random.default_rng(1), 50,
+        _standardize_rows(groups, method=method),
+        _standardize_rows(target, method=method)[0]
+    )
+
+    perm_idx = next(_permutation_chunks(30, 50, np.random.default_rng(1)))
+    expected = np.array([[corr(target[idx], row)[0] for row in groups]
+                         for idx in perm_idx])
+    np.testing.assert_allclose(block, expected, atol=1e-12)
+
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman'])
+def test_standardize_rows_masks_nans(rng, method):
+    data = rng.normal(size=(3, 20))
+    data[1, 4] = np.nan
+    original = data.copy()
+
+    standardized = _standardize_rows(data, method=method)
+
+    assert np.isnan(standardized[1]).all()
+    assert not np.isnan(standardized[[0, 2]]).any()
+    np.testing.assert_array_equal(data, original)
+
+
+def test_standardize_rows_masks_nans_with_old_rankdata(rng, monkeypatch):
+    # scipy < 1.10 ranks NaN's as the largest values instead of returning
+    # NaN.
+    rankdata = stats.rankdata
+    monkeypatch.setattr(
+        stats, 'rankdata',
+        lambda a, axis=None: rankdata(np.where(np.isnan(a), np.inf, a),
+                                      axis=axis)
+    )
+    data = rng.normal(size=(3, 20))
+    data[1, 4] = np.nan
+
+    standardized = _standardize_rows(data, method='spearman')
+    assert np.isnan(standardized[1]).all()
+
+
+def test_correlation_permutation_engines_agree(rng):
+    group1 = rng.normal(size=40)
+    group2 = 0.3 * group1 + rng.normal(size=40)
+
+    loop_corr, loop_p = correlation_permutation(group1, group2,
+                                                n_permute=4000,
+                                                random_seed=0)
+    batch_corr, batch_p = correlation_permutation(group1, group2,
+                                                  n_permute=4000,
+                                                  random_seed=0,
+                                                  engine='batch')
+
+    assert np.isclose(loop_corr, batch_corr)
+    # Different random streams, within Monte Carlo error (the standard
+    # error of the difference is about 0.01).
+    assert abs(loop_p - batch_p) < 0.05
+
+
+def test_correlation_permutation_matrix_matches_rows(rng):
+    groups = rng.normal(size=(6, 25))
+    target = groups[0] + rng.normal(size=25)
+    groups[3] = np.nan
+
+    test_corr, p_values, dist = correlation_permutation_matrix(
+        groups, target, n_permute=2500, random_seed=0, return_dist=True
+    )
+
+    for row in [0, 1, 2]:
+        expected_corr, _ = stats.pearsonr(groups[row], target)
+        assert np.isclose(test_corr[row], expected_corr)
+        assert np.isclose(p_values[row],
+                          p_value_calc(dist[row],
+                                       test_statistic=test_corr[row]))
+    assert np.isnan(test_corr[3]) and np.isnan(p_values[3])
+
+
+@pytest.mark.parametrize('corr', ['pearson', 'spearman'])
+def test_streamed_p_values_match_distribution(rng, corr):
+    groups = rng.normal(size=(20, 30))
+    target = rng.normal(size=30)
+    groups[:5] += target
+    groups[7, 3] = np.nan
+
+    _, p_values, _ = correlation_permutation_matrix(
+        groups, target, n_permute=2500, corr=corr, random_seed=0,
+        return_dist=True
+    )
+
+    # The seeded result does not depend on the chunks or workers.
+    for chunk_size, n_jobs in [(1000, None), (37, 2)]:
+        _, streamed = correlation_permutation_matrix(
+            groups, target, n_permute=2500, corr=corr, random_seed=0,
+            chunk_size=chunk_size, n_jobs=n_jobs
+        )
+        np.testing.assert_allclose(streamed, p_values, equal_nan=True)
+
+
+@pytest.mark.parametrize('axis', [0, 1])
+def test_p_value_accumulator_matches_p_value_calc(rng, axis):
+    iterations_first = rng.normal(0.2, 1, size=(1000, 7))
+    test_statistic = rng.normal(size=7)
+    expected = p_value_calc(iterations_first, test_statistic=test_statistic)
+
+    data = np.moveaxis(iterations_first, 0, axis)
+
+    def chunks():
+        for start in range(0, 1000, 128):
+            yield np.take(data, np.arange(start, min(start + 128, 1000)),
+                          axis=axis)
+
+    np.testing.assert_allclose(
+        streaming_p_value(chunks, test_statistic=test_statistic, axis=axis),
+        expected
+    )
+
+    # A known center counts in a single pass.
+    accumulator = PValueAccumulator(test_statistic,
+                                    center=data.mean(axis=axis), axis=axis)
+    for chunk in chunks():
+        accumulator.update(chunk)
+    np.testing.assert_allclose(accumulator.p_value(), expected)
+
+
+def test_p_value_accumulator_checks_passes(rng):
+    accumulator = PValueAccumulator(0.5)
+    with pytest.raises(ValueError):
+        accumulator.update(rng.normal(size=10))
+
+    accumulator.update_mean(rng.normal(size=10))
+    accumulator.update(rng.normal(size=5))
+    with pytest.raises(ValueError):
+        accumulator.p_value()
+
+
+@pytest.mark.parametrize('batch_size', [1, 100])
+def test_besag_clifford_null_is_uniform(rng, batch_size):
+    groups = rng.normal(size=(200, 40))
+    target = rng.normal(size=40)
+
+    _, p_values, _ = sequential_correlation_permutation(
+        groups, target, max_permute=2000, rule='besag_clifford',
+        batch_size=batch_size, random_seed=0
+    )
+
+    assert abs(p_values.mean() - 0.5) < 0.06
+    assert abs(np.mean(p_values < 0.2) - 0.2) < 0.07
+
+
+def test_besag_clifford_does_not_depend_on_batch_size(rng):
+    groups = rng.normal(size=(50, 30))
+    target = rng.normal(size=30)
+
+    results = [sequential_correlation_permutation(
+        groups, target, max_permute=1000, rule='besag_clifford',
+        batch_size=batch_size, random_seed=0
+    ) for batch_size in [1, 64, 1000]]
+
+    for _, p_values, n_permutations in results[1:]:
+        np.testing.assert_array_equal(p_values, results[0][1])
+        np.testing.assert_array_equal(n_permutations, results[0][2])
+
+
+def test_binomial_rule_matches_full_permutations(rng):
+    groups = rng.normal(size=(40, 50))
+    target = rng.normal(size=50)
+    groups[:10] += 0.8 * target
+
+    _, full_p = correlation_permutation_matrix(groups, target,
+                                               n_permute=5000,
+                                               random_seed=0)
+    with np.errstate(all='raise'):
+        _, seq_p, n_permutations = sequential_correlation_permutation(
+            groups, target, max_permute=5000, rule='binomial',
+            random_seed=0
+        )
+
+    # Rows far from alpha are decided on the same side, and early.
+    clear = np.abs(full_p - 0.05) > 0.03
+    np.testing.assert_array_equal((seq_p < 0.05)[clear],
+                                  (full_p < 0.05)[clear])
+    assert n_permutations[clear].mean() < 5000
+
+
+@pytest.mark.parametrize('method', ['indep', 'negcorr'])
+@pytest.mark.parametrize('axis', [0, 1, -1])
+def test_fdr_correction_matches_fdr_omitnans(rng, method, axis):
+    pvals = rng.uniform(size=(20, 30, 4)) ** 2
+    pvals[rng.uniform(size=pvals.shape) < 0.1] = np.nan
+
+    corrected = fdr_correction(pvals, method=method, axis=axis)
+
+    moved = np.moveaxis(pvals, axis, -1).reshape(-1, pvals.shape[axis])
+    expected = np.array([fdr_omitnans(row, method=method) for row in moved])
+    expected = np.moveaxis(
+        expected.reshape(np.moveaxis(pvals, axis, -1).shape), -1, axis
+    )
+    np.testing.assert_allclose(corrected, expected, equal_nan=True)
+
+
+def test_fdr_correction_all_pvalues(rng):
+    pvals = rng.uniform(size=(10, 10))
+    np.testing.assert_allclose(
+        fdr_correction(pvals, axis=None),
+        fdr_omitnans(pvals.ravel()).reshape(pvals.shape)
+    )
+
+
+@pytest.mark.parametrize('method', ['indep', 'negcorr'])
+def test_fdr_grouped_matches_per_group(rng, method):
+    df = pd.DataFrame({
+        'pval'        : rng.uniform(size=500) ** 3,
+        'alignment'   : rng.choice(['cue', 'go', 'speech'], size=500),
+        'feature_type': rng.choice(['hga', 'beta'], size=500),
+    })
+    df.loc[rng.uniform(size=500) < 0.1, 'pval'] = np.nan
+
+    corrected = fdr_grouped(df.pval, [df.alignment, df.feature_type],
+                            method=method)
+
+    expected = pd.Series(np.nan, index=df.index)
+    for _, group in df.groupby(['alignment', 'feature_type']):
+        expected[group.index] = fdr_omitnans(group.pval.values,
+                                             method=method)
+    pd.testing.assert_series_equal(corrected, expected, check_names=False)
+
+
+def test_fdr_grouped_accepts_tables_and_tuple_keys(rng):
+    df = pd.DataFrame({
+        'pval'        : rng.uniform(size=300) ** 3,
+        'alignment'   : rng.choice(['cue', 'go', 'speech'], size=300),
+        'feature_type': rng.choice(['hga', 'beta'], size=300),
+    })
+    df.loc[rng.uniform(size=300) < 0.1, 'pval'] = np.nan
+    expected = fdr_grouped(df.pval, [df.alignment, df.feature_type])
+
+    keys = ['alignment', 'feature_type']
+    for corrected in [
+        fdr_grouped(df.pval, df[keys]),
+        fdr_grouped('pval', keys, data=df),
+        fdr_grouped(df.pval, list(zip(df.alignment, df.feature_type))),
+        fdr_grouped(df.pval, df[keys].apply(tuple, axis=1)),
+    ]:
+        pd.testing.assert_series_equal(corrected, expected)
+
+    # A single key, as a column name or a list of labels.
+    pd.testing.assert_series_equal(
+        fdr_grouped('pval', 'alignment', data=df),
+        fdr_grouped(df.pval, df.alignment)
+    )
+    np.testing.assert_allclose(
+        fdr_grouped(df.pval.values, list(df.alignment)),
+        fdr_grouped(df.pval, df.alignment).values
+    )
+
+
+def test_cluster_permutation_test_matches_mne(rng):
+    mne_stats = pytest.importorskip('mne.stats')
+
+    n_times = 60
+    effect = np.zeros((3, n_times))
+    effect[0, 10:25] = 1.5
+    effect[1, 30:50] = 0.6
+    data1 = rng.normal(size=(20, 3, n_times)) + effect
+    data2 = rng.normal(size=(25, 3, n_times))
+
+    clusters = cluster_permutation_test(data1, data2, n_permute=1000,
+                                        random_seed=0)
+    threshold = stats.f.ppf(0.95, 1, 43)
+
+    for electrode in range(3):
+        _, mne_clusters, mne_p, _ = mne_stats.permutation_cluster_test(
+            [data1[:, electrode], data2[:, electrode]],
+            n_permutations=1000, threshold=threshold, tail=1,
+            out_type='mask', seed=0, verbose=False
+        )
+        ours = clusters.loc[clusters.electrode == electrode]
+
+        # The same clusters, with p-values within Monte Carlo error.
+        assert len(ours) == len(mne_clusters)
+        for cluster, p in zip(mne_clusters, mne_p):
+            # MNE returns slices for 1d data.
+            mask = np.zeros(n_times, dtype=bool)
+            mask[cluster] = True
+            match = [np.array_equal(m, mask) for m in ours['mask']]
+            assert sum(match) == 1
+            ours_p = ours.p_value.values[np.argmax(match)]
+            assert ours_p > 0
+            assert abs(ours_p - p) < 0.05
+
+    # The strong cluster beats every permutation in both.
+    strongest = clusters.loc[clusters.mass.idxmax()]
+    assert strongest.p_value == 1 / 1001
+
+
+def test_weighted_median_matches_repeated_values(rng):
+    counts = rng.integers(0, 4, size=(12, 30))
+    counts[5] = 0
+    values = rng.normal(size=(30, 3, 2))
+
+    medians = _weighted_median(counts, values, max_elements=50)
+
+    for row, row_counts in enumerate(counts):
+        if row_counts.sum() == 0:
+            assert np.isnan(medians[row]).all()
+            continue
+        expected = np.median(np.repeat(values, row_counts, axis=0), axis=0)
+        np.testing.assert_allclose(medians[row], expected)
+
+
+@pytest.mark.parametrize('statistic', ['mean', 'median'])
+def test_bootstrap_block_matches_resampled_groups(rng, statistic):
+    values = rng.normal(size=(60, 5))
+    groups = rng.integers(0, 3, size=60)
+    positions = [np.flatnonzero(groups == g) for g in range(3)]
+
+    dist = _bootstrap_block(np.random.default_rng(1), 20, values, positions,
+                            positions, None, statistic)
+
+    counts = _bootstrap_counts(np.random.default_rng(1), 20, 60, positions)
+    func = np.mean if statistic == 'mean' else np.median
+    for b in range(20):
+        for g, group_positions in enumerate(positions):
+            resampled = np.repeat(values[group_positions],
+                                  counts[b, group_positions], axis=0)
+            np.testing.assert_allclose(dist[b, g], func(resampled, axis=0))
+
+
+def test_bootstrap_estimates_and_clusters(rng):
+    df = pd.DataFrame({
+        'value'  : rng.normal(size=200),
+        'region' : rng.choice(['IFG', 'mPrCG', 'vPrCG'], size=200),
+        'subject': rng.choice([f'EC{i}' for i in range(8)], size=200),
+    })
+
+    estimates, dist, labels = bootstrap(df.value.values, df.region.values,
+                                        clusters=df.subject.values,
+                                        n_boot=300, random_seed=0,
+                                        block_size=64)
+    np.testing.assert_allclose(estimates,
+                               df.groupby('region').value.mean()[labels])
+
+    # The seeded distribution does not depend on the workers.
+    _, blocked, _ = bootstrap(df.value.values, df.region.values,
+                              clusters=df.subject.values, n_boot=300,
+                              random_seed=0, block_size=64, n_jobs=2)
+    np.testing.assert_allclose(blocked, dist)
+
+    ci_low, ci_high = bootstrap_ci(dist)
+    np.testing.assert_allclose(ci_low, np.percentile(dist, 2.5, axis=0))
+    assert np.all((ci_low < estimates) & (estimates < ci_high))
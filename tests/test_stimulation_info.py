@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the stimulation site coordinates and the KD-tree radius queries
+against a brute-force search over all pairwise distances.
+
+:Author: Jessie R. Liu
+:Copyright: Copyright (c) 2025, Jessie R. Liu, All rights reserved.
+"""
+
+# Third party libraries
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.spatial.distance import cdist
+
+# Custom libraries
+from sylseq_paper.stimulation_info import (ElectrodeIndex,
+                                           stim_site_coordinates,
+                                           stim_site_table)
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def electrode_df(rng):
+    n = 300
+    df = pd.DataFrame({
+        'subject'  : rng.choice(['EC1', 'EC2', 'EC3'], size=n),
+        'electrode': np.arange(n),
+        'x'        : rng.uniform(0, 100, size=n),
+        'y'        : rng.uniform(0, 100, size=n),
+        'weight'   : rng.uniform(size=n),
+        'other'    : rng.uniform(size=n),
+    }, index=np.arange(n) * 2 + 1)
+    df.loc[df.index[rng.uniform(size=n) < 0.1], 'x'] = np.nan
+    return df
+
+
+def brute_force(electrode_df, points, radius, subjects=None):
+    """
+    The within-radius mask of every point and electrode (row of
+    electrode_df), and their distances.
+    """
+    distance = cdist(points, electrode_df[['x', 'y']].values)
+    within = distance <= radius
+    if subjects is not None:
+        within &= np.asarray(subjects)[:, None] == \
+            electrode_df.subject.values[None, :]
+    return within, distance
+
+
+@pytest.mark.parametrize('by_subject', [False, True])
+def test_neighbors_match_brute_force(rng, electrode_df, by_subject):
+    points = rng.uniform(0, 100, size=(40, 2))
+    points[3] = np.nan
+    subjects = rng.choice(['EC1', 'EC2', 'EC3'], size=40) if by_subject \
+        else None
+
+    index = ElectrodeIndex(electrode_df)
+    near = index.neighbors(points, radius=15, subjects=subjects)
+    within, distance = brute_force(electrode_df, points, 15, subjects)
+
+    point_idx, row_idx = np.nonzero(within)
+    expected = pd.DataFrame({
+        'point'    : point_idx,
+        'position' : electrode_df.index.values[row_idx],
+        'distance' : distance[point_idx, row_idx],
+    }).sort_values(['point', 'distance'], ignore_index=True)
+
+    assert len(near) == len(expected) > 0
+    assert not (near.point == 3).any()
+    np.testing.assert_array_equal(near.point, expected.point)
+    np.testing.assert_array_equal(near.position, expected.position)
+    np.testing.assert_allclose(near.distance, expected.distance)
+    np.testing.assert_array_equal(
+        near.electrode, electrode_df.loc[near.position, 'electrode'])
+    if by_subject:
+        np.testing.assert_array_equal(near.subject,
+                                      subjects[near.point.values])
+
+
+def test_counts_align_weights_with_electrode_df(rng, electrode_df):
+    points = rng.uniform(0, 100, size=(25, 2))
+    subjects = rng.choice(['EC1', 'EC2', 'EC3'], size=25)
+
+    index = ElectrodeIndex(electrode_df)
+    within, _ = brute_force(electrode_df, points, 20, subjects)
+    weights = electrode_df[['weight', 'other']].values.T
+
+    np.testing.assert_array_equal(
+        index.counts(points, 20, subjects=subjects), within.sum(axis=1))
+    np.testing.assert_allclose(
+        index.counts(points, 20, weights=weights[0], subjects=subjects),
+        within @ weights[0])
+    np.testing.assert_allclose(
+        index.counts(points, 20, weights=weights, subjects=subjects),
+        weights @ within.T)
+
+    # Column names give the same sums as the arrays.
+    np.testing.assert_allclose(
+        index.counts(points, 20, weights='weight', subjects=subjects),
+        within @ weights[0])
+    np.testing.assert_allclose(
+        index.counts(points, 20, weights=['weight', 'other'],
+                     subjects=subjects), weights @ within.T)
+
+    # Weights of only the electrodes with coordinates are rejected.
+    located = electrode_df.dropna(subset=['x', 'y'])
+    with pytest.raises(ValueError):
+        index.counts(points, 20, weights=located.weight.values)
+
+
+def test_stim_site_coordinates():
+    sites = stim_site_table()
+    subject = sites.subject.iloc[0]
+    n = max(sites.elec1.max(), sites.elec2.max(), sites.center.max()) + 1
+    electrode_df = pd.DataFrame({
+        'subject'  : subject,
+        'electrode': np.arange(n),
+        'x'        : np.arange(n, dtype=float),
+        'y'        : -np.arange(n, dtype=float),
+    })
+
+    located = stim_site_coordinates(electrode_df, sites=sites)
+    own = (sites.subject == subject).values
+    interpolated = sites.is_interpolated.values.astype(bool)
+
+    expected = np.where(interpolated, (sites.elec1 + sites.elec2) / 2,
+                        sites.center).astype(float)
+    np.testing.assert_allclose(located.x.values[own], expected[own])
+    np.testing.assert_allclose(located.y.values[own], -expected[own])
+    assert located.loc[~own, ['x', 'y']].isna().all().all()